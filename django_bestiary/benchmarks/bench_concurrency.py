@@ -0,0 +1,198 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+""" Benchmark the editor reads while an import is running with sqlite
+
+For each sqlite configuration a new database is created, and while an
+import of a generated projects file is running in other process, the
+reads done by the editor are done in several reader processes. The
+latency of the reads and the failed ones are reported, and compared
+with the reads done without the import. Sample:
+
+    python3 bench_concurrency.py --projects 50 --repos 10 --readers 4
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from time import sleep, time
+
+
+BESTIARY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# sqlite defaults, and the ones in settings
+CONFIGS = {
+    'default': {'BESTIARY_SQLITE_JOURNAL_MODE': 'delete', 'BESTIARY_SQLITE_SYNCHRONOUS': 'full',
+                'BESTIARY_SQLITE_MMAP_SIZE': '', 'BESTIARY_SQLITE_CACHE_SIZE': '',
+                'BESTIARY_SQLITE_BUSY_TIMEOUT': ''},
+    'tuned': {}
+}
+
+READER = """
+import json, os, sys, time
+import django
+django.setup()
+from django.db import connection
+from projects.models import Project
+
+latencies = []
+errors = 0
+project_names = list(Project.objects.filter(ecosystem__name='base').values_list('name', flat=True))
+print('ready', flush=True)
+while not os.path.exists(sys.argv[1]):
+    read_init = time.time()
+    try:
+        project = Project.objects.get(name=project_names[len(latencies) %% len(project_names)])
+        list(project.repository_views.select_related('repository__data_source'))
+        latencies.append(time.time() - read_init)
+    except Exception:
+        errors += 1
+        connection.close()
+    time.sleep(%f)
+print(json.dumps({'latencies': latencies, 'errors': errors}))
+"""
+
+
+def get_params():
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Benchmark the editor reads while an import is running")
+
+    parser.add_argument('-c', '--configs', nargs='+', choices=sorted(CONFIGS), default=sorted(CONFIGS))
+    parser.add_argument('--projects', type=int, default=20, help="Projects in the imported file")
+    parser.add_argument('--repos', type=int, default=10, help="Repositories in each imported project")
+    parser.add_argument('--readers', type=int, default=4, help="Reader processes")
+    parser.add_argument('--think-time', type=float, default=0.01, help="Seconds between the reads")
+    parser.add_argument('--idle', type=float, default=3, help="Seconds reading without the import")
+    parser.add_argument('--json', help="File to write the results")
+
+    return parser.parse_args()
+
+
+def write_projects(projects_file, nprojects, nrepos, prefix):
+    projects = {}
+    for nproject in range(nprojects):
+        repos = ['https://github.com/%s/project%i-repo%i' % (prefix, nproject, nrepo) for nrepo in range(nrepos)]
+        projects['%s-project%i' % (prefix, nproject)] = {'git': repos, 'github': repos}
+
+    with open(projects_file, 'w') as fprojects:
+        json.dump(projects, fprojects)
+
+
+def manage(env, *args):
+    return subprocess.Popen([sys.executable, 'manage.py'] + list(args), cwd=BESTIARY_DIR, env=env,
+                            stdout=subprocess.DEVNULL)
+
+
+def read_while(env, args, stop_file, work):
+    """ Start the readers, run work() and collect the readers stats """
+
+    code = READER % args.think_time
+    readers = [subprocess.Popen([sys.executable, '-c', code, stop_file], cwd=BESTIARY_DIR, env=env,
+                                stdout=subprocess.PIPE, universal_newlines=True)
+               for _ in range(args.readers)]
+    for reader in readers:
+        reader.stdout.readline()
+
+    work_init = time()
+    work()
+    elapsed = time() - work_init
+
+    open(stop_file, 'w').close()
+    latencies = []
+    errors = 0
+    for reader in readers:
+        stats = json.loads(reader.communicate()[0])
+        latencies += stats['latencies']
+        errors += stats['errors']
+    os.remove(stop_file)
+
+    latencies.sort()
+    return {
+        'seconds': elapsed,
+        'reads': len(latencies),
+        'errors': errors,
+        'median_ms': statistics.median(latencies) * 1000 if latencies else 0,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+        'max_ms': latencies[-1] * 1000 if latencies else 0
+    }
+
+
+def bench_config(config, args, tmp_dir):
+    env = dict(os.environ)
+    env.update(CONFIGS[config])
+    env['BESTIARY_DB_NAME'] = os.path.join(tmp_dir, '%s.sqlite3' % config)
+    env['DJANGO_SETTINGS_MODULE'] = 'django_bestiary.settings'
+    env['PYTHONPATH'] = BESTIARY_DIR
+
+    base_file = os.path.join(tmp_dir, 'base.json')
+    import_file = os.path.join(tmp_dir, 'import.json')
+    write_projects(base_file, 20, 10, 'base')
+    write_projects(import_file, args.projects, args.repos, 'import')
+
+    manage(env, 'migrate').wait()
+    manage(env, 'import_projects', '--item', base_file, 'base').wait()
+
+    stop_file = os.path.join(tmp_dir, 'stop')
+    idle = read_while(env, args, stop_file, lambda: sleep(args.idle))
+    importing = read_while(env, args, stop_file,
+                           lambda: manage(env, 'import_projects', '--item', import_file, 'import').wait())
+
+    return {'config': config, 'idle': idle, 'importing': importing}
+
+
+def main():
+    args = get_params()
+
+    results = []
+    for config in args.configs:
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            results.append(bench_config(config, args, tmp_dir))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    print("%-10s %-10s %8s %8s %8s %12s %12s %12s" % ("Config", "Import", "Seconds", "Reads", "Errors",
+                                                      "Median (ms)", "p95 (ms)", "Max (ms)"))
+    for result in results:
+        for phase in ['idle', 'importing']:
+            stats = result[phase]
+            print("%-10s %-10s %8.2f %8i %8i %12.2f %12.2f %12.2f" % (result['config'], phase, stats['seconds'],
+                                                                      stats['reads'], stats['errors'],
+                                                                      stats['median_ms'], stats['p95_ms'],
+                                                                      stats['max_ms']))
+
+    if args.json:
+        with open(args.json, "w") as fjson:
+            json.dump(results, fjson, indent=4, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+""" Benchmark the size and throughput of the projects file formats
+
+The projects of a file, or generated ones, are written and read in each
+of the formats in projects.formats. Sample:
+
+    python3 bench_formats.py --projects 1000 --repos 50
+    python3 bench_formats.py --file projects.json
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'projects'))
+
+import formats
+
+
+def get_params():
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Benchmark the projects file formats")
+
+    parser.add_argument('-f', '--file', help="Projects file. Generated projects if not given")
+    parser.add_argument('--projects', type=int, default=500, help="Generated projects")
+    parser.add_argument('--repos', type=int, default=50, help="Repositories of each generated project")
+    parser.add_argument('--formats', nargs='+', choices=formats.all_formats(), default=formats.all_formats())
+    parser.add_argument('--json', help="File to write the results")
+
+    return parser.parse_args()
+
+
+def generate_projects(nprojects, nrepos):
+    projects = {}
+    for nproject in range(nprojects):
+        repos = ['https://github.com/org%i/project%i-repo%i' % (nproject % 10, nproject, nrepo)
+                 for nrepo in range(nrepos)]
+        projects['project%i' % nproject] = {
+            'meta': {'title': 'Project %i' % nproject},
+            'git': repos,
+            'github': repos,
+            'gerrit': ['gerrit.example.org_project%i' % nproject]
+        }
+    return projects
+
+
+def main():
+    args = get_params()
+
+    if args.file:
+        projects = dict(formats.read_projects(args.file))
+    else:
+        projects = generate_projects(args.projects, args.repos)
+
+    results = []
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for file_format in args.formats:
+            projects_file = os.path.join(tmp_dir, 'projects' + formats.file_extension(file_format))
+
+            task_init = time()
+            formats.write_projects(projects_file, projects, file_format)
+            write_time = time() - task_init
+
+            task_init = time()
+            nprojects = sum(1 for _ in formats.read_projects(projects_file))
+            read_time = time() - task_init
+
+            results.append({'format': file_format, 'bytes': os.path.getsize(projects_file),
+                            'write_seconds': write_time, 'read_seconds': read_time, 'projects': nprojects})
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    json_size = [result['bytes'] for result in results if result['format'] == 'json']
+    print("%-12s %10s %8s %12s %12s %14s" % ("Format", "Size (MB)", "Ratio", "Write (s)", "Read (s)",
+                                             "Read proj/s"))
+    for result in results:
+        ratio = result['bytes'] / json_size[0] if json_size else 1
+        speed = result['projects'] / max(result['read_seconds'], 1e-9)
+        print("%-12s %10.2f %8.2f %12.3f %12.3f %14.1f" % (result['format'], result['bytes'] / 1024 / 1024, ratio,
+                                                           result['write_seconds'], result['read_seconds'], speed))
+
+    if args.json:
+        with open(args.json, "w") as fjson:
+            json.dump(results, fjson, indent=4, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
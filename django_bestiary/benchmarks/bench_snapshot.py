@@ -0,0 +1,166 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+""" Benchmark the memory and time used to load an ecosystem
+
+The repository views of an ecosystem in the current database (or the one
+in BESTIARY_DB_NAME) are loaded as model instances and as an
+EcosystemSnapshot, and the memory kept and the time used are compared.
+The time to read one project from the JSON export and from the binary
+snapshot file is compared too. Sample:
+
+    python3 bench_snapshot.py --ecosystem Chaoss --recursive
+"""
+
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_bestiary.settings')
+
+import django
+django.setup()
+
+from projects.bestiary_export import export_projects, export_snapshot, snapshot_projects
+from projects.hierarchy import effective_projects
+from projects.models import Ecosystem
+from projects.snapshot import EcosystemSnapshot
+from projects.snapshot_file import SnapshotReader
+
+
+def get_params():
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Benchmark the memory and time used to load an ecosystem")
+
+    parser.add_argument('-e', '--ecosystem', help="Ecosystem to be loaded. The largest one if not given")
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help="Include the projects of the sub-ecosystems and the sub-projects")
+    parser.add_argument('--json', help="File to write the results")
+
+    return parser.parse_args()
+
+
+def load_models(ecosystem, recursive):
+    projects = effective_projects(ecosystem) if recursive else ecosystem.projects.all()
+    return [(project, list(project.repository_views.select_related('repository__data_source')))
+            for project in projects]
+
+
+def measure(load):
+    """ Memory kept by the object returned by load, and the time to load it """
+
+    gc.collect()
+    tracemalloc.start()
+    task_init = time()
+    loaded = load()
+    elapsed = time() - task_init
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return loaded, size, elapsed
+
+
+def read_files(ecosystem, recursive, tmp_dir):
+    """ Time to read the last project from the JSON and the binary snapshot files """
+
+    json_file = os.path.join(tmp_dir, 'projects.json')
+    snapshot_file = os.path.join(tmp_dir, 'projects.bsnp')
+    export_projects(json_file, ecosystem, recursive)
+    export_snapshot(snapshot_file, ecosystem, recursive)
+
+    task_init = time()
+    with open(json_file) as fjson:
+        project = sorted(json.load(fjson))[-1]
+    json_time = time() - task_init
+
+    task_init = time()
+    with SnapshotReader(snapshot_file) as reader:
+        reader[project]
+    snapshot_time = time() - task_init
+
+    return {
+        'json': {'bytes': os.path.getsize(json_file), 'seconds': json_time},
+        'binary': {'bytes': os.path.getsize(snapshot_file), 'seconds': snapshot_time}
+    }
+
+
+def main():
+    args = get_params()
+
+    if args.ecosystem:
+        ecosystem = Ecosystem.objects.get(name=args.ecosystem)
+    else:
+        ecosystem = max(Ecosystem.objects.all(), key=lambda eco: eco.projects.count())
+
+    models, models_size, models_time = measure(lambda: load_models(ecosystem, args.recursive))
+    nviews = sum(len(views) for _, views in models)
+    del models
+
+    snapshot, snapshot_size, snapshot_time = measure(lambda: EcosystemSnapshot.build(ecosystem, args.recursive))
+    task_init = time()
+    snapshot_projects(snapshot)
+    export_time = time() - task_init
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        files = read_files(ecosystem.name, args.recursive, tmp_dir)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    results = {
+        'ecosystem': ecosystem.name,
+        'views': nviews,
+        'models': {'bytes': models_size, 'seconds': models_time},
+        'snapshot': {'bytes': snapshot_size, 'seconds': snapshot_time, 'export_seconds': export_time},
+        'files': files
+    }
+
+    print("Ecosystem %s: %i repository views" % (ecosystem.name, nviews))
+    print("%-10s %12s %14s %10s" % ("Load", "Memory (MB)", "Bytes/view", "Seconds"))
+    for load in ['models', 'snapshot']:
+        print("%-10s %12.2f %14.1f %10.2f" % (load, results[load]['bytes'] / 1024 / 1024,
+                                              results[load]['bytes'] / max(nviews, 1), results[load]['seconds']))
+    print("Projects built from the snapshot in %.2f sec" % export_time)
+    print("%-10s %12s %14s" % ("File", "Size (MB)", "Project (ms)"))
+    for file_format in ['json', 'binary']:
+        print("%-10s %12.2f %14.2f" % (file_format, files[file_format]['bytes'] / 1024 / 1024,
+                                       files[file_format]['seconds'] * 1000))
+
+    if args.json:
+        with open(args.json, "w") as fjson:
+            json.dump(results, fjson, indent=4, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+""" Benchmark the cold start of the web app and the command line tools
+
+Each target is started several times in a new python process and the
+wall time until it is ready is measured. With --profile the imports of
+each target are profiled with "python -X importtime" (python >= 3.7)
+and the packages which took longer to import are reported. Sample:
+
+    python3 bench_startup.py --runs 10 --profile
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from collections import OrderedDict, defaultdict
+from time import time
+
+
+BESTIARY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# What a web worker does until it can serve the first request
+WEB_STARTUP = """
+import os
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_bestiary.settings')
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+"""
+
+TARGETS = OrderedDict([
+    ('web', ['-c', WEB_STARTUP]),
+    ('manage', ['manage.py', 'help']),
+    ('import-cli', [os.path.join('projects', 'bestiary_import.py'), '--help']),
+    ('export-cli', [os.path.join('projects', 'bestiary_export.py'), '--help'])
+])
+
+# Modules which should be imported only when they are used
+LAZY_MODULES = ['grimoire_elk', 'perceval', 'django.test']
+
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+def get_params():
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Benchmark the start of the web app and the command line tools")
+
+    parser.add_argument('-t', '--targets', nargs='+', choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument('-r', '--runs', type=int, default=5, help="Starts measured for each target")
+    parser.add_argument('--profile', action='store_true', help="Profile the imports of each target")
+    parser.add_argument('--top', type=int, default=10, help="Packages shown in the imports profile")
+    parser.add_argument('--json', help="File to write the results")
+
+    return parser.parse_args()
+
+
+def run_target(target, importtime=False):
+    """ Start target in a new python process and wait until it finishes """
+
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ['-X', 'importtime']
+    cmd += TARGETS[target]
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([BESTIARY_DIR] + [path for path in [env.get('PYTHONPATH')] if path])
+    env['DJANGO_SETTINGS_MODULE'] = 'django_bestiary.settings'
+
+    task_init = time()
+    proc = subprocess.run(cmd, cwd=BESTIARY_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True)
+    elapsed = time() - task_init
+
+    if proc.returncode != 0:
+        raise RuntimeError("%s failed:\n%s" % (target, proc.stderr))
+
+    return elapsed, proc.stderr
+
+
+def profile_target(target, top):
+    """ Import time profile of target, aggregated by top level package """
+
+    _, output = run_target(target, importtime=True)
+
+    packages = defaultdict(int)
+    modules = set()
+    total = 0
+    for line in output.splitlines():
+        match = IMPORT_TIME.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        packages[module.split('.')[0]] += int(self_us)
+        modules.add(module)
+        if not indent:
+            total += int(cumulative_us)
+
+    return {
+        'imports': len(modules),
+        'import_time': total / 1000000,
+        'packages': sorted(packages.items(), key=lambda package: -package[1])[:top],
+        'lazy_loaded': [module for module in LAZY_MODULES if module in modules]
+    }
+
+
+def main():
+    args = get_params()
+
+    results = []
+    for target in args.targets:
+        # The first start warms the file system caches
+        run_target(target)
+        times = [run_target(target)[0] for _ in range(args.runs)]
+        result = {
+            'target': target,
+            'runs': args.runs,
+            'min': min(times),
+            'median': statistics.median(times),
+            'max': max(times)
+        }
+        if args.profile:
+            result['profile'] = profile_target(target, args.top)
+        results.append(result)
+
+    print("%-12s %6s %10s %10s %10s" % ("Target", "Runs", "Min (s)", "Median (s)", "Max (s)"))
+    for result in results:
+        print("%-12s %6i %10.3f %10.3f %10.3f" % (result['target'], result['runs'], result['min'],
+                                                  result['median'], result['max']))
+
+    for result in results:
+        if 'profile' not in result:
+            continue
+        profile = result['profile']
+        if not profile['imports']:
+            print("\nImports of %s not profiled: python -X importtime needs python >= 3.7" % result['target'])
+            continue
+        print("\n%s: %i modules imported in %.3f s" % (result['target'], profile['imports'], profile['import_time']))
+        for package, self_us in profile['packages']:
+            print("    %-30s %10.1f ms" % (package, self_us / 1000))
+        if profile['lazy_loaded']:
+            print("    Imported at start: %s" % ", ".join(profile['lazy_loaded']))
+
+    if args.json:
+        with open(args.json, "w") as fjson:
+            json.dump(results, fjson, indent=4, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
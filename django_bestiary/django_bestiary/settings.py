@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'projects.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,13 +75,56 @@ WSGI_APPLICATION = 'django_bestiary.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/1.11/ref/settings/#databases
 
+# PRAGMAs run on each new sqlite connection. They are changed with the
+# BESTIARY_SQLITE_<PRAGMA> environment variables, empty to not run them.
+# With the WAL journal the readers are not blocked by an import running.
+SQLITE_PRAGMAS = [
+    ('busy_timeout', '5000'),  # ms waiting for a lock before failing
+    ('journal_mode', 'wal'),
+    ('synchronous', 'normal'),  # safe with WAL, synced in the checkpoints
+    ('mmap_size', '268435456'),  # 256 MB
+    ('cache_size', '-65536')  # 64 MB
+]
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': 'django_bestiary.sqlite3',
+        'NAME': os.environ.get('BESTIARY_DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        # Seconds a connection is reused between requests
+        'CONN_MAX_AGE': int(os.environ.get('BESTIARY_CONN_MAX_AGE', 600)),
+        'OPTIONS': {
+            'pragmas': [(pragma, os.environ.get('BESTIARY_SQLITE_' + pragma.upper(), value))
+                        for pragma, value in SQLITE_PRAGMAS
+                        if os.environ.get('BESTIARY_SQLITE_' + pragma.upper(), value)]
+        }
     }
 }
 
+# Read replicas: sqlite snapshots of the primary database refreshed with
+# "manage.py snapshot_replicas". Their files are in BESTIARY_DB_REPLICAS,
+# separated by commas. See projects.routers and projects.middleware.
+REPLICA_DATABASES = []
+
+for nreplica, replica_name in enumerate(filter(None, os.environ.get('BESTIARY_DB_REPLICAS', '').split(','))):
+    REPLICA_DATABASES.append('replica%i' % nreplica)
+    DATABASES['replica%i' % nreplica] = {
+        'ENGINE': 'django_bestiary.sqlite3',
+        'NAME': replica_name,
+        # Each request reads the last snapshot
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'pragmas': [(pragma, value) for pragma, value in DATABASES['default']['OPTIONS']['pragmas']
+                        if pragma in ['busy_timeout', 'mmap_size', 'cache_size']]
+        },
+        'TEST': {'MIRROR': 'default'}
+    }
+
+DATABASE_ROUTERS = ['projects.routers.ReplicaRouter']
+
+# Seconds a client reads from the primary after writing, longer than the
+# time between the replicas snapshots
+REPLICA_STICKY_SECONDS = int(os.environ.get('BESTIARY_REPLICA_STICKY_SECONDS', 60))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
@@ -119,3 +163,16 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/1.11/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Seconds the data sources are cached in each process (see projects.catalog)
+
+DATA_SOURCES_CACHE_TTL = 300
+
+
+# Change feed of the ecosystems (see projects.changes): changes returned in
+# each request by default and at most, and days the changes are kept
+
+CHANGES_PAGE_SIZE = 1000
+CHANGES_MAX_PAGE_SIZE = 10000
+CHANGES_MAX_AGE_DAYS = int(os.environ.get('BESTIARY_CHANGES_MAX_AGE_DAYS', 30))
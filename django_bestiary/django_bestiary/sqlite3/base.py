@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+""" sqlite backend running PRAGMAs on each new connection
+
+They are configured with a list of (pragma, value) in the "pragmas"
+entry of the database OPTIONS, for example:
+
+    'ENGINE': 'django_bestiary.sqlite3',
+    'OPTIONS': {'pragmas': [('journal_mode', 'wal'), ('synchronous', 'normal')]}
+"""
+
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+
+PRAGMA = re.compile(r'^\w+$')
+PRAGMA_VALUE = re.compile(r'^-?\w+$')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_pragmas(self):
+        pragmas = self.settings_dict['OPTIONS'].get('pragmas', [])
+
+        for pragma, value in pragmas:
+            if not PRAGMA.match(pragma) or not PRAGMA_VALUE.match(str(value)):
+                raise ImproperlyConfigured("Wrong sqlite pragma %s = %s" % (pragma, value))
+
+        return pragmas
+
+    def get_connection_params(self):
+        conn_params = super().get_connection_params()
+        # It is not a sqlite3.connect() param
+        conn_params.pop('pragmas', None)
+        return conn_params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+
+        for pragma, value in self.get_pragmas():
+            conn.execute('PRAGMA %s = %s' % (pragma, value))
+
+        return conn
@@ -1,16 +1,49 @@
+from django import forms
 from django.contrib import admin
+
 from . import models
+from .hierarchy import creates_cycle
 
 
 class RepositoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'data_source',)
     list_filter = ('data_source',)
 
+
+class HierarchyForm(forms.ModelForm):
+    """ Sub-ecosystems or sub-projects which do not create cycles """
+
+    children_field = None
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.instance.id:
+            for child in cleaned_data.get(self.children_field, []):
+                if creates_cycle(self.instance, child):
+                    self.add_error(self.children_field, '"%s" includes "%s"' % (child, self.instance))
+        return cleaned_data
+
+
+class EcosystemForm(HierarchyForm):
+    children_field = 'subecos'
+
+
+class ProjectForm(HierarchyForm):
+    children_field = 'subprojects'
+
+
+class EcosystemAdmin(admin.ModelAdmin):
+    form = EcosystemForm
+
+
+class ProjectAdmin(admin.ModelAdmin):
+    form = ProjectForm
+
 # Register your models here.
 
 
-admin.site.register(models.Ecosystem)
-admin.site.register(models.Project)
+admin.site.register(models.Ecosystem, EcosystemAdmin)
+admin.site.register(models.Project, ProjectAdmin)
 admin.site.register(models.Repository, RepositoryAdmin)
 admin.site.register(models.RepositoryView)
 admin.site.register(models.DataSource)
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class ProjectsConfig(AppConfig):
     name = 'projects'
+
+    def ready(self):
+        # Keep the Membership table up to date
+        from projects import signals
+        signals.connect()
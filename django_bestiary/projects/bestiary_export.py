@@ -24,7 +24,6 @@
 #
 
 import argparse
-import json
 import logging
 import os
 
@@ -32,11 +31,17 @@ from time import time
 
 
 import django
-# settings.configure()
-os.environ['DJANGO_SETTINGS_MODULE'] = 'django_bestiary.settings'
-django.setup()
+from django.apps import apps
 
+if not apps.ready:
+    # Used as a script and not from the app or the management commands
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'django_bestiary.settings'
+    django.setup()
+
+from projects.formats import all_formats, detect_format, write_projects
 from projects.models import Ecosystem
+from projects.snapshot import EcosystemSnapshot
+from projects.snapshot_file import write_snapshot
 
 
 def get_params():
@@ -46,20 +51,23 @@ def get_params():
     parser.add_argument('-g', '--debug', action='store_true')
     parser.add_argument('-o', '--ecosystem', required=True,
                         help='Ecosystem to be exported. ')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='Include the projects of the sub-ecosystems and the sub-projects')
+    parser.add_argument('--format', choices=all_formats(),
+                        help='Format of the projects file. Found from its extension by default')
+    parser.add_argument('-b', '--binary', action='store_true',
+                        help='Export to a binary snapshot file (see projects/snapshot_file.py)')
 
     return parser.parse_args()
 
 
-def find_project_repo_line(repository_view):
-    """ Given a RepositoryView build the complete repository
-    string tp be included in the JSON project file to collect the data"""
+def find_project_repo_line(data_source, repo, params):
+    """ Given the data source, repository and params of a repository view
+    build the complete repository string tp be included in the JSON
+    project file to collect the data"""
 
     repo_line = None
 
-    params = repository_view.params
-    repo = repository_view.repository.name
-    data_source = str(repository_view.repository.data_source)
-
     # First complete the repository for filtering
     if data_source in ['askbot', 'functest', 'hyperkitty', 'jenkins', 'mediawiki',
                        'mozillaclub', 'phabricator', 'pipermail',
@@ -87,11 +95,9 @@ def find_project_repo_line(repository_view):
     return repo_line
 
 
-def find_project_params_line(repository_view):
+def find_project_params_line(data_source, params):
 
     repo_line_params = None
-    data_source = str(repository_view.repository.data_source)
-    params = repository_view.params
 
     # And now add the params to the repository url for JSON file
     if data_source in ['askbot', 'crates', 'functest',
@@ -117,51 +123,61 @@ def find_project_params_line(repository_view):
     return repo_line_params
 
 
-def build_project_repository_view(repository_view):
-    """ Given a RepositoryView build the complete repository
-    string tp be included in the JSON project file to collect the data"""
-
-    repo_line = None
+def build_repository_line(data_source, repo, params):
+    """ Given the data source, repository and params of a repository view
+    build the complete repository string tp be included in the JSON
+    project file to collect the data"""
 
-    params = repository_view.params
-    repo_line = find_project_repo_line(repository_view)
+    repo_line = find_project_repo_line(data_source, repo, params)
 
     if params:
-        repo_line += find_project_params_line(repository_view)
+        repo_line += find_project_params_line(data_source, params)
 
     return repo_line
 
 
-def fetch_projects(ecosystem):
+def fetch_projects(ecosystem, recursive=False):
+    """ Build the projects of an ecosystem. With recursive, the projects of
+    the sub-ecosystems and all the sub-projects are included, flattened """
+
     try:
-        eco_orm = Ecosystem.objects.get(name=ecosystem)
+        snapshot = EcosystemSnapshot.build(ecosystem, recursive)
     except Ecosystem.DoesNotExist:
         logging.error("Can not find ecosystem %s", ecosystem)
         raise Ecosystem.DoesNotExist
 
-    projects_orm = eco_orm.projects.all()
+    return snapshot_projects(snapshot)
+
+
+def iter_snapshot_projects(snapshot):
+    """ Build the projects of an ecosystem snapshot one by one, as (name, data) """
 
-    beasts = {}
+    for nproject, (project, meta_title) in enumerate(snapshot.projects()):
+        beast = {}
+        if meta_title:
+            beast["meta"] = {"title": meta_title}
 
-    for project in projects_orm:
-        beasts[project.name] = {}
-        if project.meta_title:
-            beasts[project.name]["meta"] = {"title": project.meta_title}
+        for view in snapshot.project_views(nproject):
+            if view.data_source not in beast:
+                beast[view.data_source] = []
+            repo_proj_line = build_repository_line(view.data_source, view.repository, view.params)
+            beast[view.data_source].append(repo_proj_line)
 
-        for repository_view_orm in project.repository_views.all():
-            data_source = repository_view_orm.repository.data_source.name
-            if data_source not in beasts[project.name]:
-                beasts[project.name][data_source] = []
-            repo_proj_line = build_project_repository_view(repository_view_orm)
-            beasts[project.name][data_source].append(repo_proj_line)
+        yield project, beast
 
-    return beasts
 
+def snapshot_projects(snapshot):
+    """ Build the projects of an ecosystem snapshot """
 
-def export_projects(projects_file, ecosystem):
+    return dict(iter_snapshot_projects(snapshot))
+
+
+def export_projects(projects_file, ecosystem, recursive=False, file_format=None):
+    """ Export the projects to a file in any of the projects.formats, found
+    from its extension if file_format is not given """
 
     nrepository_views = 0
-    projects = fetch_projects(ecosystem)
+    projects = fetch_projects(ecosystem, recursive)
     nprojects = len(list(projects.keys()))
 
     for project in projects:
@@ -169,12 +185,17 @@ def export_projects(projects_file, ecosystem):
             if ds != 'meta':
                 nrepository_views += len(projects[project][ds])
 
-    with open(projects_file, "w") as pfile:
-        json.dump(projects, pfile, indent=True, sort_keys=True)
+    write_projects(projects_file, projects, file_format or detect_format(projects_file))
 
     return (nprojects, nrepository_views)
 
 
+def export_snapshot(snapshot_file, ecosystem, recursive=False):
+    """ Export the projects to a binary snapshot file """
+
+    return write_snapshot(snapshot_file, ecosystem, fetch_projects(ecosystem, recursive))
+
+
 if __name__ == '__main__':
 
     task_init = time()
@@ -189,7 +210,10 @@ if __name__ == '__main__':
     logging.getLogger("urllib3").setLevel(logging.WARNING)
     logging.getLogger("requests").setLevel(logging.WARNING)
 
-    (nprojects, nrepos) = export_projects(args.file, args.ecosystem)
+    if args.binary:
+        (nprojects, nrepos) = export_snapshot(args.file, args.ecosystem, args.recursive)
+    else:
+        (nprojects, nrepos) = export_projects(args.file, args.ecosystem, args.recursive, args.format)
 
     logging.debug("Total exporting time ... %.2f sec", time() - task_init)
     print("Projects exported", nprojects)
@@ -24,34 +24,83 @@
 #
 
 import argparse
+import hashlib
+import itertools
 import json
 import logging
 import os
-import tempfile
+import sys
 
+from collections import namedtuple
 from time import time
 
 
-from django.test import TestCase
-
 import django
-# settings.configure()
-os.environ['DJANGO_SETTINGS_MODULE'] = 'django_bestiary.settings'
-django.setup()
+from django.apps import apps
+
+if not apps.ready:
+    # Used as a script and not from the app or the management commands
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'django_bestiary.settings'
+    django.setup()
+
+from django.db import transaction
+
+from projects.models import Ecosystem, ImportCheckpoint, Project, Repository, RepositoryView
+from projects.bestiary_export import iter_snapshot_projects
+from projects import membership
+from projects.catalog import catalog
+from projects.formats import all_formats, read_projects
+from projects.ingest import batches
+from projects.merkle import canonical_project, project_hash
+from projects.snapshot import EcosystemSnapshot
+
+
+# Projects imported in each transaction
+BATCH_PROJECTS = 100
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Projects diffed and repository lines shown of each data source by check_projects
+MAX_DIFFS = 10
+MAX_DIFF_LINES = 5
+
+
+class CheckResult(namedtuple('CheckResult', ['nprojects', 'missing', 'extra', 'changed', 'diffs'])):
+    """ Projects of a file missing in the ecosystem, only in the ecosystem and
+    different in both, and the diffs of some of the different ones """
+
+    @property
+    def ok(self):
+        return not (self.missing or self.extra or self.changed)
 
-from projects.models import Ecosystem, Project, Repository, RepositoryView, DataSource
-from projects.bestiary_export import export_projects
+    def report(self):
+        """ Lines summarizing the differences """
+
+        lines = ["%i projects checked: %i missing, %i not in the file, %i different" %
+                 (self.nprojects, len(self.missing), len(self.extra), len(self.changed))]
+        for title, names in [('Missing', self.missing), ('Not in the file', self.extra), ('Different', self.changed)]:
+            if names:
+                lines.append("%s: %s%s" % (title, ", ".join(names[:MAX_DIFFS]),
+                                           " ... %i more" % (len(names) - MAX_DIFFS) if len(names) > MAX_DIFFS else ""))
+        return lines + self.diffs
 
 
 def get_params():
     parser = argparse.ArgumentParser(usage="usage: beasts_feeder.py [options]",
                                      description="Feed beastiary with projects")
     parser.add_argument("-f", "--file", required=True, help="JSON projects file")
+    parser.add_argument('--format', choices=all_formats(),
+                        help='Format of the projects file. Found from its extension by default')
     parser.add_argument('-g', '--debug', action='store_true')
     parser.add_argument('-o', '--ecosystem', required='True',
                         help='Ecosystem for the projects')
     parser.add_argument('-c', '--check', action='store_true',
-                        help='Export the data and compare it with the imported')
+                        help='Compare the projects of the file with the ones of the ecosystem')
+    parser.add_argument('-n', '--dry-run', action='store_true',
+                        help='Show the changes of the import without doing it')
+    parser.add_argument('--plan', help='JSON file to write the changes of the dry run')
+    parser.add_argument('--batch-size', type=int, default=BATCH_PROJECTS,
+                        help='Projects imported in each transaction. 0 to import all of them in one')
 
     return parser.parse_args()
 
@@ -134,11 +183,17 @@ def add(cls_orm, **params):
     except cls_orm.DoesNotExist:
         obj_orm = cls_orm(**params)
         try:
-            obj_orm.save()
+            # In a savepoint, so the transaction of the import can go on
+            with transaction.atomic():
+                obj_orm.save()
             logging.debug('Added %s: %s', cls_orm.__name__, params)
         except django.db.utils.IntegrityError as ex:
-            logging.error("Can't add %s: %s", cls_orm.__name__, params)
-            logging.error(ex)
+            try:
+                # Added by other import running in parallel
+                obj_orm = cls_orm.objects.get(**params)
+            except cls_orm.DoesNotExist:
+                logging.error("Can't add %s: %s", cls_orm.__name__, params)
+                logging.error(ex)
 
     return obj_orm
 
@@ -147,53 +202,110 @@ def list_not_ds_fields():
     return ['meta']
 
 
-def load_projects(projects_file, ecosystem):
+def file_hash(projects_file):
+    """ sha256 of the content of a file """
+
+    digest = hashlib.sha256()
+    with open(projects_file, 'rb') as pfile:
+        for chunk in iter(lambda: pfile.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_project(eco_orm, project, project_data):
+    """ Load a project into the ecosystem eco_orm.
+
+    :returns: the number of repository views of the project
+    """
 
     # fields in project that are not a data source
     no_ds = list_not_ds_fields()
 
-    eco_orm = add(Ecosystem, **{"name": ecosystem})
-
-    projects = None
-    nprojects = 0
     nrepos = 0
+    views = []
+
+    pparams = {"name": project}
+    if 'meta' in project_data.keys():
+        if isinstance(project_data['meta'], str):
+            # In Mozilla the meta is the title directly
+            pparams.update({"meta_title": project_data['meta']})
+        else:
+            pparams.update({"meta_title": project_data['meta']['title']})
+    project_orm = add(Project, **pparams)
+    eco_orm.projects.add(project_orm)
+
+    for data_source in project_data:
+        if data_source in no_ds:
+            continue
+
+        ds_type_obj, _ = catalog.get_or_create(data_source)
+
+        for repository_view_str in project_data[data_source]:
+            repo_name = find_repo_name(repository_view_str, data_source)
+            if repo_name is None:
+                logging.error('Can not find repository for %s %s', data_source, repository_view_str)
+                continue
 
-    with open(projects_file) as pfile:
-        projects = json.load(pfile)
+            repo_obj = add(Repository, **{"name": repo_name, "data_source": ds_type_obj})
+            nrepos += 1
+            repo_params = find_params(repository_view_str, data_source)
+            views.append(add(RepositoryView, **{"params": repo_params, "repository": repo_obj}))
 
-    for project in projects.keys():
-        pparams = {"name": project}
-        if 'meta' in projects[project].keys():
-            if isinstance(projects[project]['meta'], str):
-                # In Mozilla the meta is the title directly
-                pparams.update({"meta_title": projects[project]['meta']})
-            else:
-                pparams.update({"meta_title": projects[project]['meta']['title']})
-        project_orm = add(Project, **pparams)
-        eco_orm.projects.add(project_orm)
+    # Linked at once, so the signals update the memberships and the change feed once
+    project_orm.repository_views.add(*views)
 
-        nprojects += 1
+    # Register all the repo views added
+    project_orm.save()
+
+    return nrepos
 
-        for data_source in projects[project]:
-            if data_source in no_ds:
-                continue
 
-            ds_type_obj = add(DataSource, **{"name": data_source})
+def load_projects(projects_file, ecosystem, file_format=None, batch_size=BATCH_PROJECTS):
+    """ Load the projects file, in any of the projects.formats, found from
+    its extension if file_format is not given. It is read project by project.
 
-            for repository_view_str in projects[project][data_source]:
-                repo_name = find_repo_name(repository_view_str, data_source)
-                if repo_name is None:
-                    logging.error('Can not find repository for %s %s', data_source, repository_view_str)
-                    continue
+    The projects are imported in batches of batch_size projects, each of
+    them in a transaction which also saves the progress of the import in
+    an ImportCheckpoint. If the import is interrupted the projects of the
+    batches committed are kept, and importing the same file (with the same
+    content) into the same ecosystem again resumes it after them, without
+    reading them again from the database. With batch_size 0 the whole
+    import is done in one transaction, so it is imported completely or
+    not at all, and it starts from the beginning if it is interrupted.
+    """
 
-                repo_obj = add(Repository, **{"name": repo_name, "data_source": ds_type_obj})
-                nrepos += 1
-                repo_params = find_params(repository_view_str, data_source)
-                data_source_orm = add(RepositoryView, **{"params": repo_params, "repository": repo_obj})
-                project_orm.repository_views.add(data_source_orm)
+    if not batch_size:
+        with transaction.atomic():
+            return _load_batches(projects_file, ecosystem, file_format, None)
 
-        # Register all the repo views added
-        project_orm.save()
+    return _load_batches(projects_file, ecosystem, file_format, batch_size)
+
+
+def _load_batches(projects_file, ecosystem, file_format, batch_size):
+    eco_orm = add(Ecosystem, **{"name": ecosystem})
+    checkpoint, _ = ImportCheckpoint.objects.get_or_create(file_hash=file_hash(projects_file), ecosystem=eco_orm)
+    if checkpoint.nprojects:
+        logging.info("Resuming the import into %s after %i projects", ecosystem, checkpoint.nprojects)
+
+    nprojects = checkpoint.nprojects
+    nrepos = checkpoint.nrepository_views
+
+    projects = itertools.islice(read_projects(projects_file, file_format), checkpoint.nprojects, None)
+    for batch in batches(projects, batch_size):
+        # The data sources are not cached inside the transactions
+        catalog.names()
+
+        # The sub-ecosystems are not changed by the import
+        with transaction.atomic(), membership.cache_ancestors():
+            for project, project_data in batch:
+                nrepos += load_project(eco_orm, project, project_data)
+            nprojects += len(batch)
+
+            checkpoint.nprojects = nprojects
+            checkpoint.nrepository_views = nrepos
+            checkpoint.save()
+
+    checkpoint.delete()
 
     # Register all the projects added
     eco_orm.save()
@@ -201,14 +313,56 @@ def load_projects(projects_file, ecosystem):
     return (nprojects, nrepos)
 
 
-def compare_projects_files(orig_file, new_file):
-    with open(orig_file) as orig:
-        orig_json = json.load(orig)
-        with open(new_file) as exported:
-            exported_json = json.load(exported)
-            test = TestCase()
-            test.maxDiff = None
-            test.assertDictEqual(orig_json, exported_json)
+def project_diff(name, expected, exported, max_lines=MAX_DIFF_LINES):
+    """ Differences between the data of a project in a file and exported,
+    as text lines, with up to max_lines repository lines of each data source """
+
+    expected = canonical_project(expected)
+    exported = canonical_project(exported)
+    diff = []
+
+    if expected.get('meta') != exported.get('meta'):
+        diff.append("%s meta: %s != %s" % (name, expected.get('meta'), exported.get('meta')))
+
+    for data_source in sorted((set(expected) | set(exported)) - set(list_not_ds_fields())):
+        expected_lines = set(expected.get(data_source, []))
+        exported_lines = set(exported.get(data_source, []))
+        for sign, lines in [('-', sorted(expected_lines - exported_lines)), ('+', sorted(exported_lines - expected_lines))]:
+            diff.extend("%s %s %s %s" % (sign, name, data_source, line) for line in lines[:max_lines])
+            if len(lines) > max_lines:
+                diff.append("%s %s %s ... %i more" % (sign, name, data_source, len(lines) - max_lines))
+
+    return diff
+
+
+def check_projects(projects_file, ecosystem, file_format=None, max_diffs=MAX_DIFFS):
+    """ Compare the projects of a file with the ones of the ecosystem as
+    exported, using the hashes of their canonical content, so the order
+    of the repository lines does not matter. The file is read project by
+    project and the ecosystem from a snapshot, and only the hashes are
+    kept. The projects which differ are read again to diff up to
+    max_diffs of them.
+
+    :returns: a CheckResult
+    """
+
+    file_hashes = {name: project_hash(name, data) for name, data in read_projects(projects_file, file_format)}
+    snapshot = EcosystemSnapshot.build(ecosystem)
+    ecosystem_hashes = {name: project_hash(name, data) for name, data in iter_snapshot_projects(snapshot)}
+
+    changed = sorted(name for name, file_hash in file_hashes.items()
+                     if name in ecosystem_hashes and ecosystem_hashes[name] != file_hash)
+
+    diffs = []
+    if changed:
+        names = set(changed[:max_diffs])
+        expected = {name: data for name, data in read_projects(projects_file, file_format) if name in names}
+        exported = {name: data for name, data in iter_snapshot_projects(snapshot) if name in names}
+        for name in sorted(names):
+            diffs.extend(project_diff(name, expected[name], exported[name]))
+
+    return CheckResult(len(file_hashes), sorted(set(file_hashes) - set(ecosystem_hashes)),
+                       sorted(set(ecosystem_hashes) - set(file_hashes)), changed, diffs)
 
 
 if __name__ == '__main__':
@@ -225,7 +379,20 @@ if __name__ == '__main__':
     logging.getLogger("urllib3").setLevel(logging.WARNING)
     logging.getLogger("requests").setLevel(logging.WARNING)
 
-    (nprojects, nrepos) = load_projects(args.file, args.ecosystem)
+    if args.dry_run:
+        # Imported here as the planner uses this module
+        from projects.planner import plan_import
+
+        plan = plan_import(args.file, args.ecosystem, args.format, batch_size=args.batch_size)
+        for line in plan.report():
+            print(line)
+        if args.plan:
+            with open(args.plan, 'w') as fplan:
+                json.dump(plan.to_dict(), fplan, indent=True, sort_keys=True)
+        logging.debug("Total planning time ... %.2f sec", time() - task_init)
+        sys.exit(1 if plan.errors else 0)
+
+    (nprojects, nrepos) = load_projects(args.file, args.ecosystem, args.format, args.batch_size)
 
     logging.debug("Total loading time ... %.2f sec", time() - task_init)
     print("Projects loaded", nprojects)
@@ -233,6 +400,8 @@ if __name__ == '__main__':
 
     if args.check:
         logging.info('Checking data ...')
-        with tempfile.NamedTemporaryFile() as temp:
-            export_projects(temp.name, args.ecosystem)
-            compare_projects_files(args.file, temp.name)
+        result = check_projects(args.file, args.ecosystem, args.format)
+        for line in result.report():
+            print(line)
+        if not result.ok:
+            sys.exit(1)
@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+""" Process local cache of the data sources
+
+DataSource is a small table read in most of the requests and imports,
+so it is loaded once and kept in memory. It is invalidated when a data
+source is saved or deleted in this process (see projects.signals) and
+reloaded after settings.DATA_SOURCES_CACHE_TTL seconds, for the changes
+done by other processes.
+
+The cache is not loaded nor updated inside transactions, as their rows
+could be rolled back. Lookups inside them hit the cache if it is already
+loaded, or the database. The data sources are always read from the
+primary database, and not from the replicas which could be outdated.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from projects.models import DataSource
+
+
+CACHE_TTL = 300  # seconds, if DATA_SOURCES_CACHE_TTL is not in settings
+
+
+class DataSourceCatalog():
+    """ Data sources by name and by id """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._by_name = {}
+        self._by_id = {}
+        self._loaded_at = None
+
+    def get_ttl(self):
+        if self.ttl is not None:
+            return self.ttl
+        return getattr(settings, 'DATA_SOURCES_CACHE_TTL', CACHE_TTL)
+
+    @staticmethod
+    def cacheable():
+        return not transaction.get_connection().in_atomic_block
+
+    def __load(self):
+        """ Load all the data sources if the cache is empty or too old """
+
+        with self._lock:
+            if self._loaded_at and time.time() - self._loaded_at < self.get_ttl():
+                return
+            if not self.cacheable():
+                return
+
+            data_sources = list(DataSource.objects.using(DEFAULT_DB_ALIAS))
+            self._by_name = {data_source.name: data_source for data_source in data_sources}
+            self._by_id = {data_source.id: data_source for data_source in data_sources}
+            self._loaded_at = time.time()
+
+    def __add(self, data_source):
+        if not self.cacheable():
+            return
+
+        with self._lock:
+            self._by_name[data_source.name] = data_source
+            self._by_id[data_source.id] = data_source
+
+    def get(self, name):
+        """ Data source with name. Raises DataSource.DoesNotExist if missing """
+
+        self.__load()
+        data_source = self._by_name.get(name)
+
+        if not data_source:
+            # Could be added by other process
+            data_source = DataSource.objects.using(DEFAULT_DB_ALIAS).get(name=name)
+            self.__add(data_source)
+
+        return data_source
+
+    def get_by_id(self, data_source_id):
+        self.__load()
+        data_source = self._by_id.get(data_source_id)
+
+        if not data_source:
+            data_source = DataSource.objects.using(DEFAULT_DB_ALIAS).get(id=data_source_id)
+            self.__add(data_source)
+
+        return data_source
+
+    def get_or_create(self, name):
+        """ Data source with name, created if missing.
+
+        :returns: the data source and whether it was created
+        """
+
+        try:
+            return self.get(name), False
+        except DataSource.DoesNotExist:
+            data_source, created = DataSource.objects.get_or_create(name=name)
+            self.__add(data_source)
+            return data_source, created
+
+    def names(self):
+        self.__load()
+        if self._loaded_at:
+            return sorted(self._by_name)
+        return list(DataSource.objects.using(DEFAULT_DB_ALIAS).order_by('name').values_list('name', flat=True))
+
+    def invalidate(self):
+        with self._lock:
+            self._by_name = {}
+            self._by_id = {}
+            self._loaded_at = None
+
+
+catalog = DataSourceCatalog()
@@ -0,0 +1,207 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+""" Change feed of the ecosystems, for the consumers syncing deltas
+
+The signal handlers (see projects.signals) add a Change entry for each
+ecosystem including, directly or not, a project whose name, meta title,
+repository views or membership changed. The entries of an ecosystem are
+ordered by seq, which only grows.
+
+A consumer keeps the ecosystem projects, in the projects.json shape of
+a recursive export, asking for the changes after the last seq applied.
+The feed returns the entries and the current data of the projects in
+them, or None for the ones no longer in the ecosystem, so applying it
+is idempotent and the intermediate states are not needed. That is why
+the entries superseded by a later one of the same project are dropped
+by the compaction without losing anything. The entries older than
+settings.CHANGES_MAX_AGE_DAYS are dropped too, and the consumers behind
+them must start again from a full export.
+
+With databases which can commit the entries in a different order than
+their seq (concurrent writers in PostgreSQL) a consumer could skip one,
+so the writes of an ecosystem should not run in parallel there.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from projects import membership
+from projects.models import Change, ChangeCompaction, Ecosystem, Membership, RepositoryView
+from projects.snapshot import EcosystemSnapshot
+
+
+class ChangesCompacted(Exception):
+    """ The changes after the seq asked were dropped by the compaction """
+
+    def __init__(self, seq):
+        super().__init__("Changes until %i compacted, a full export is needed" % seq)
+        self.seq = seq
+
+
+def record(ecosystem_ids, project_names, kind, action, names):
+    """ Add the entries of the projects in each ecosystem
+
+    :param names: names of the objects changed, one entry for each
+    """
+
+    entries = [Change(ecosystem_id=ecosystem_id, project=project, kind=kind, action=action, name=name)
+               for ecosystem_id in ecosystem_ids
+               for project in project_names
+               for name in names]
+    Change.objects.bulk_create(entries)
+
+
+def view_members(**filters):
+    """ (ecosystem_id, project name, view_id) of the memberships of views or repositories """
+
+    membership.flush_rebuilds()
+
+    return Membership.objects.filter(**filters).values_list('ecosystem_id', 'project__name', 'repository_view_id')
+
+
+def record_views(memberships, kind, action):
+    """ Add the entries of the views of the (ecosystem_id, project name, view_id) memberships """
+
+    memberships = list(memberships)
+    lines = view_lines(set(view_id for (_, _, view_id) in memberships))
+
+    Change.objects.bulk_create([Change(ecosystem_id=ecosystem_id, project=project, kind=kind,
+                                       action=action, name=lines[view_id])
+                                for ecosystem_id, project, view_id in memberships])
+
+
+def view_lines(view_ids):
+    """ Repository lines of the projects files of the views, by view id """
+
+    # Imported when used, as the exporter sets up django if the apps are not ready
+    from projects.bestiary_export import build_repository_line
+
+    views = RepositoryView.objects.filter(id__in=view_ids) \
+        .values_list('id', 'repository__data_source__name', 'repository__name', 'params')
+    return {view_id: build_repository_line(data_source, repository, params)
+            for view_id, data_source, repository, params in views}
+
+
+def _ecosystem_filter(ecosystem):
+    if isinstance(ecosystem, Ecosystem):
+        return {'ecosystem': ecosystem}
+    return {'ecosystem__name': ecosystem}
+
+
+def last_seq(ecosystem):
+    """ Seq of the last change of an ecosystem (or its name). The consumers
+    of a full export ask for the changes after the one read before it """
+
+    last = Change.objects.filter(**_ecosystem_filter(ecosystem)).aggregate(seq=Max('seq'))['seq']
+    return last if last is not None else compacted_seq(ecosystem)
+
+
+def compacted_seq(ecosystem):
+    compactions = ChangeCompaction.objects.filter(**_ecosystem_filter(ecosystem))
+    return compactions.values_list('seq', flat=True).first() or 0
+
+
+def fetch_changes(ecosystem, since=0, limit=None):
+    """ Changes of an ecosystem (or its name) after the seq since.
+
+    :returns: a dict with the entries, the current data of the projects
+        in them (None if removed from the ecosystem), and the seq to ask
+        for the next changes
+    :raises ChangesCompacted: if the changes after since were dropped
+    """
+
+    from projects.bestiary_export import snapshot_projects
+
+    if not isinstance(ecosystem, Ecosystem):
+        ecosystem = Ecosystem.objects.get(name=ecosystem)
+    if limit is None:
+        limit = settings.CHANGES_PAGE_SIZE
+
+    compacted = compacted_seq(ecosystem)
+    if since < compacted:
+        raise ChangesCompacted(compacted)
+
+    entries = list(Change.objects.filter(ecosystem=ecosystem, seq__gt=since).order_by('seq')[:limit + 1])
+    more = len(entries) > limit
+    entries = entries[:limit]
+
+    names = set(entry.project for entry in entries)
+    projects = dict.fromkeys(names)
+    if names:
+        snapshot = EcosystemSnapshot.build(ecosystem, recursive=True, project_names=names)
+        projects.update(snapshot_projects(snapshot))
+
+    return {
+        'ecosystem': ecosystem.name,
+        'since': since,
+        'last_seq': entries[-1].seq if entries else since,
+        'more': more,
+        'changes': [{'seq': entry.seq, 'created_at': entry.created_at.isoformat(), 'project': entry.project,
+                     'kind': entry.kind, 'action': entry.action, 'name': entry.name}
+                    for entry in entries],
+        'projects': projects
+    }
+
+
+def apply_changes(projects, changes):
+    """ Apply the changes returned by fetch_changes to the projects of
+    a recursive export (or of a previous sync), in place.
+
+    :returns: the seq to ask for the next changes
+    """
+
+    for project, data in changes['projects'].items():
+        if data is None:
+            projects.pop(project, None)
+        else:
+            projects[project] = data
+
+    return changes['last_seq']
+
+
+def compact(max_age_days=None):
+    """ Drop the entries superseded by a later one of the same project
+    and, if max_age_days, the ones older than it.
+
+    :returns: the number of entries superseded and expired dropped
+    """
+
+    if max_age_days is None:
+        max_age_days = settings.CHANGES_MAX_AGE_DAYS
+
+    last_entries = Change.objects.values('ecosystem', 'project').annotate(last=Max('seq')).values('last')
+    nsuperseded, _ = Change.objects.exclude(seq__in=last_entries).delete()
+
+    nexpired = 0
+    if max_age_days:
+        expired = Change.objects.filter(created_at__lt=timezone.now() - datetime.timedelta(days=max_age_days))
+        for ecosystem_id, seq in expired.values('ecosystem').annotate(last=Max('seq')).values_list('ecosystem', 'last'):
+            ChangeCompaction.objects.update_or_create(ecosystem_id=ecosystem_id, defaults={'seq': seq})
+        nexpired, _ = expired.delete()
+
+    return nsuperseded, nexpired
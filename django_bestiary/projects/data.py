@@ -1,5 +1,31 @@
+import threading
+
+from projects.catalog import catalog
+from projects.hierarchy import effective_projects
 from projects.models import DataSource, Ecosystem, Project, Repository, RepositoryView
-from grimoire_elk import utils as gelk_utils
+
+
+_connectors = None
+_connectors_lock = threading.Lock()
+
+
+def connector_names():
+    """ Names of the data sources supported by GrimoireLab.
+
+    Finding them is expensive and they don't change while running,
+    so they are found only once per process. grimoire_elk imports all the
+    perceval backends, so it is imported only when they are needed and
+    not when the web app or the command line tools start.
+    """
+
+    global _connectors
+
+    with _connectors_lock:
+        if _connectors is None:
+            from grimoire_elk import utils as gelk_utils
+            _connectors = list(gelk_utils.get_connectors())
+
+    return _connectors
 
 
 class DataSourcesData():
@@ -10,11 +36,10 @@ class DataSourcesData():
     def __fetch_from_repository_views(self, views):
         already_fetched = []
 
-        for view in views:
-            data_source_name = view.repository.data_source.name
-            if data_source_name not in already_fetched:
-                already_fetched.append(data_source_name)
-                data_source = DataSource.objects.get(name=data_source_name)
+        for view in views.select_related('repository__data_source'):
+            data_source = view.repository.data_source
+            if data_source.name not in already_fetched:
+                already_fetched.append(data_source.name)
                 yield data_source
 
     def __fetch_from_projects(self, projects):
@@ -27,14 +52,15 @@ class DataSourcesData():
     def fetch(self):
 
         if not self.state or self.state.is_empty():
-            supported_data_sources = list(gelk_utils.get_connectors())
-            for data_source_name in supported_data_sources:
+            for data_source_name in connector_names():
                 data_source = DataSource(name=data_source_name)
                 yield data_source
         elif self.state.data_sources:
-            data_sources = DataSource.objects.filter(name__in=self.state.data_sources)
-            for data_source in data_sources:
-                yield data_source
+            for data_source_name in self.state.data_sources:
+                try:
+                    yield catalog.get(data_source_name)
+                except DataSource.DoesNotExist:
+                    pass
         elif self.state.repository_views:
             views = RepositoryView.objects.filter(id__in=self.state.repository_views)
             for data_source in self.__fetch_from_repository_views(views):
@@ -44,8 +70,7 @@ class DataSourcesData():
             for data_source in self.__fetch_from_projects(projects):
                 yield data_source
         elif self.state.eco_name:
-            ecosystem = Ecosystem.objects.get(name=self.state.eco_name)
-            projects = ecosystem.projects.all()
+            projects = effective_projects(self.state.eco_name)
             for data_source in self.__fetch_from_projects(projects):
                 yield data_source
 
@@ -86,8 +111,7 @@ class ProjectsData():
             for project in projects:
                 yield project
         elif self.state.eco_name:
-            ecosystem = Ecosystem.objects.get(name=self.state.eco_name)
-            projects = ecosystem.projects.all()
+            projects = effective_projects(self.state.eco_name)
             for project in projects:
                 yield project
 
@@ -108,17 +132,16 @@ class RepositoryViewsData():
         elif self.state.projects:
             projects = Project.objects.filter(name__in=self.state.projects)
             for project in projects:
-                for view in project.repository_views.all():
-                    if self.state.data_sources:
-                        if view.repository.data_source.name not in self.state.data_sources:
-                            continue
+                views = project.repository_views.select_related('repository__data_source')
+                if self.state.data_sources:
+                    views = views.filter(repository__data_source__name__in=self.state.data_sources)
+                for view in views:
                     yield view
         elif self.state.data_sources:
-            for view in RepositoryView.objects.all():
-                if view.repository.data_source.name in self.state.data_sources:
-                    yield view
+            views = RepositoryView.objects.filter(repository__data_source__name__in=self.state.data_sources)
+            for view in views.select_related('repository__data_source'):
+                yield view
         elif self.state.eco_name:
-            ecosystem = Ecosystem.objects.get(name=self.state.eco_name)
-            for project in ecosystem.projects.all():
+            for project in effective_projects(self.state.eco_name):
                 for view in project.repository_views.all():
                     yield view
@@ -0,0 +1,388 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+""" Encodings of the projects files
+
+    json     the projects.json object, pretty printed
+    ndjson   one {project: {...}} JSON object per line
+    msgpack  one {project: {...}} msgpack map after another
+
+Each of them can be gzip compressed, adding ".gz" to the format. They
+are written and read in streaming: the projects are encoded one by one
+in chunks, and read one by one from the files, without loading the whole
+file. This module only uses the python standard library.
+"""
+
+import gzip
+import json
+import re
+import struct
+import zlib
+
+
+FORMATS = ['json', 'ndjson', 'msgpack']
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+    'msgpack': 'application/msgpack'
+}
+# Extensions of the files in each format
+EXTENSIONS = {
+    'json': ['.json'],
+    'ndjson': ['.ndjson', '.jsonl'],
+    'msgpack': ['.msgpack', '.mpk']
+}
+
+CHUNK_SIZE = 64 * 1024
+GZIP_MAGIC = b'\x1f\x8b'
+WHITESPACE = re.compile(r'\s*')
+
+
+def all_formats():
+    return FORMATS + [file_format + '.gz' for file_format in FORMATS]
+
+
+def split_format(file_format):
+    """ Encoding and whether it is gzip compressed """
+
+    compressed = file_format.endswith('.gz')
+    encoding = file_format[:-3] if compressed else file_format
+    if encoding not in FORMATS:
+        raise ValueError("Unknown projects format %s" % file_format)
+    return encoding, compressed
+
+
+def detect_format(file_name):
+    """ Format of a projects file from its extension, json by default """
+
+    name = file_name.lower()
+    suffix = '.gz' if name.endswith('.gz') else ''
+    name = name[:-len(suffix)] if suffix else name
+
+    for encoding, extensions in EXTENSIONS.items():
+        if any(name.endswith(extension) for extension in extensions):
+            return encoding + suffix
+    return 'json' + suffix
+
+
+def file_extension(file_format):
+    encoding, compressed = split_format(file_format)
+    return EXTENSIONS[encoding][0] + ('.gz' if compressed else '')
+
+
+# msgpack (https://msgpack.org) encoding of the types used in the projects
+
+def msgpack_pack(obj):
+    if obj is None:
+        return b'\xc0'
+    if obj is True:
+        return b'\xc3'
+    if obj is False:
+        return b'\xc2'
+    if isinstance(obj, int):
+        if 0 <= obj <= 0x7f:
+            return struct.pack('B', obj)
+        if -32 <= obj < 0:
+            return struct.pack('b', obj)
+        if 0 <= obj <= 0xffffffffffffffff:
+            return b'\xcf' + struct.pack('>Q', obj)
+        return b'\xd3' + struct.pack('>q', obj)
+    if isinstance(obj, str):
+        data = obj.encode('utf-8')
+        size = len(data)
+        if size <= 31:
+            return struct.pack('B', 0xa0 | size) + data
+        if size <= 0xff:
+            return b'\xd9' + struct.pack('B', size) + data
+        if size <= 0xffff:
+            return b'\xda' + struct.pack('>H', size) + data
+        return b'\xdb' + struct.pack('>I', size) + data
+    if isinstance(obj, (list, tuple)):
+        return _msgpack_header(len(obj), 0x90, b'\xdc', b'\xdd') + b''.join(msgpack_pack(item) for item in obj)
+    if isinstance(obj, dict):
+        return _msgpack_header(len(obj), 0x80, b'\xde', b'\xdf') + \
+            b''.join(msgpack_pack(key) + msgpack_pack(value) for key, value in obj.items())
+    raise TypeError("%s can not be encoded with msgpack" % type(obj).__name__)
+
+
+def _msgpack_header(size, fix, marker16, marker32):
+    if size <= 15:
+        return struct.pack('B', fix | size)
+    if size <= 0xffff:
+        return marker16 + struct.pack('>H', size)
+    return marker32 + struct.pack('>I', size)
+
+
+class IncompleteData(ValueError):
+    pass
+
+
+def _take(data, pos, size):
+    if pos + size > len(data):
+        raise IncompleteData("Unexpected end of msgpack data")
+    return data[pos:pos + size], pos + size
+
+
+# Types with the size or the value after the type byte
+MSGPACK_STRUCTS = {byte: struct.Struct(fmt) for byte, fmt in [
+    (0xcc, '>B'), (0xcd, '>H'), (0xce, '>I'), (0xcf, '>Q'),
+    (0xd0, '>b'), (0xd1, '>h'), (0xd2, '>i'), (0xd3, '>q'),
+    (0xd9, '>B'), (0xda, '>H'), (0xdb, '>I'),
+    (0xdc, '>H'), (0xdd, '>I'), (0xde, '>H'), (0xdf, '>I')]}
+
+
+def _unpack(data, pos):
+    """ Object starting at pos in data, and the position after it """
+
+    if pos >= len(data):
+        raise IncompleteData("Unexpected end of msgpack data")
+    byte = data[pos]
+    pos += 1
+
+    if byte <= 0x7f:
+        return byte, pos
+    if byte >= 0xe0:
+        return byte - 0x100, pos
+    if byte <= 0x8f:
+        return _unpack_map(data, pos, byte & 0x0f)
+    if byte <= 0x9f:
+        return _unpack_array(data, pos, byte & 0x0f)
+    if byte <= 0xbf:
+        value, pos = _take(data, pos, byte & 0x1f)
+        return value.decode('utf-8'), pos
+    if byte == 0xc0:
+        return None, pos
+    if byte in (0xc2, 0xc3):
+        return byte == 0xc3, pos
+
+    value_struct = MSGPACK_STRUCTS.get(byte)
+    if not value_struct:
+        raise ValueError("Unsupported msgpack type 0x%x" % byte)
+    if pos + value_struct.size > len(data):
+        raise IncompleteData("Unexpected end of msgpack data")
+    value = value_struct.unpack_from(data, pos)[0]
+    pos += value_struct.size
+
+    if byte <= 0xd3:
+        return value, pos
+    if byte <= 0xdb:
+        value, pos = _take(data, pos, value)
+        return value.decode('utf-8'), pos
+    if byte <= 0xdd:
+        return _unpack_array(data, pos, value)
+    return _unpack_map(data, pos, value)
+
+
+def _unpack_array(data, pos, size):
+    array = []
+    for _ in range(size):
+        item, pos = _unpack(data, pos)
+        array.append(item)
+    return array, pos
+
+
+def _unpack_map(data, pos, size):
+    obj = {}
+    for _ in range(size):
+        key, pos = _unpack(data, pos)
+        obj[key], pos = _unpack(data, pos)
+    return obj, pos
+
+
+def msgpack_unpack(data):
+    """ Object encoded in data """
+
+    obj, pos = _unpack(data, 0)
+    if pos != len(data):
+        raise ValueError("Extra data after the msgpack object")
+    return obj
+
+
+# Writers
+
+def _chunks(pieces):
+    """ Join the pieces in chunks of CHUNK_SIZE or more bytes """
+
+    chunk = []
+    size = 0
+    for piece in pieces:
+        if isinstance(piece, str):
+            piece = piece.encode('utf-8')
+        chunk.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield b''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b''.join(chunk)
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)  # gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def encode_projects(projects, file_format='json'):
+    """ Chunks of bytes with the projects encoded in file_format """
+
+    encoding, compressed = split_format(file_format)
+
+    if encoding == 'json':
+        pieces = json.JSONEncoder(indent=True, sort_keys=True).iterencode(projects)
+    elif encoding == 'ndjson':
+        pieces = (json.dumps({name: projects[name]}, sort_keys=True, separators=(',', ':')) + '\n'
+                  for name in sorted(projects))
+    else:
+        pieces = (msgpack_pack({name: projects[name]}) for name in sorted(projects))
+
+    chunks = _chunks(pieces)
+    return _gzip(chunks) if compressed else chunks
+
+
+def write_projects(projects_file, projects, file_format='json'):
+    with open(projects_file, 'wb') as pfile:
+        for chunk in encode_projects(projects, file_format):
+            pfile.write(chunk)
+
+
+# Readers
+
+def _json_members(fileobj):
+    """ Members of the JSON objects in a text file, one object after another,
+    so it reads json (one object) and ndjson (an object per line) files """
+
+    decoder = json.JSONDecoder()
+    state = {'buffer': '', 'pos': 0, 'eof': False, 'read_size': CHUNK_SIZE}
+
+    def read_more():
+        data = fileobj.read(state['read_size'])
+        state['eof'] = not data
+        state['buffer'] = state['buffer'][state['pos']:] + data
+        state['pos'] = 0
+
+    def next_char(chars, optional=False):
+        while True:
+            state['pos'] = WHITESPACE.match(state['buffer'], state['pos']).end()
+            if state['pos'] < len(state['buffer']) or state['eof']:
+                break
+            read_more()
+        if state['pos'] == len(state['buffer']):
+            if optional:
+                return None
+            raise ValueError("Unexpected end of JSON data")
+        char = state['buffer'][state['pos']]
+        if char not in chars:
+            raise ValueError("Expecting one of %s at %s" % (chars, state['buffer'][state['pos']:state['pos'] + 20]))
+        return char
+
+    def decode():
+        while True:
+            try:
+                value, end = decoder.raw_decode(state['buffer'], state['pos'])
+                if end == len(state['buffer']) and not state['eof']:
+                    # A number could continue in the next read
+                    raise ValueError("Value at the end of the buffer")
+                state['pos'] = end
+                state['read_size'] = CHUNK_SIZE
+                return value
+            except ValueError:
+                if state['eof']:
+                    raise
+                # Bigger reads for big values, so they are not decoded too many times
+                state['read_size'] *= 2
+                read_more()
+
+    while next_char('{', optional=True):
+        state['pos'] += 1
+        if next_char('"}') == '}':
+            state['pos'] += 1
+            continue
+        while True:
+            key = decode()
+            next_char(':')
+            state['pos'] += 1
+            next_char('"{[-0123456789tfn')
+            yield key, decode()
+            char = next_char(',}')
+            state['pos'] += 1
+            if char == '}':
+                break
+            next_char('"')
+
+
+def _msgpack_members(fileobj):
+    """ Members of the msgpack maps in a binary file, one map after another """
+
+    data = b''
+    pos = 0
+    read_size = CHUNK_SIZE
+    eof = False
+
+    while True:
+        try:
+            obj, end = _unpack(data, pos)
+        except IncompleteData:
+            if eof:
+                if pos == len(data):
+                    return
+                raise
+            chunk = fileobj.read(read_size)
+            eof = not chunk
+            data = data[pos:] + chunk
+            pos = 0
+            # Bigger reads for big objects, so they are not decoded too many times
+            read_size *= 2
+            continue
+
+        pos = end
+        read_size = CHUNK_SIZE
+        if not isinstance(obj, dict):
+            raise ValueError("The msgpack data is not a stream of maps")
+        for key, value in obj.items():
+            yield key, value
+
+
+def read_projects(projects_file, file_format=None):
+    """ Projects names and contents in a projects file, read one by one.
+    gzip compressed files are found from their content """
+
+    encoding, _ = split_format(file_format or detect_format(projects_file))
+
+    with open(projects_file, 'rb') as pfile:
+        compressed = pfile.read(2) == GZIP_MAGIC
+    opener = gzip.open if compressed else open
+
+    if encoding == 'msgpack':
+        with opener(projects_file, 'rb') as pfile:
+            for member in _msgpack_members(pfile):
+                yield member
+    else:
+        with opener(projects_file, 'rt', encoding='utf-8') as pfile:
+            for member in _json_members(pfile):
+                yield member
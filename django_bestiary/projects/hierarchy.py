@@ -0,0 +1,172 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+""" Sub-ecosystems and sub-projects hierarchy queries
+
+The hierarchies are followed with recursive CTEs, so the whole closure
+is resolved in one query whatever its depth. UNION removes the rows
+already found, so the recursion ends even if there are cycles.
+"""
+
+from django.db import connection, connections, router
+from django.db.models.expressions import RawSQL
+
+from projects.models import Ecosystem, Project
+
+
+def _edges(model):
+    """ Table and (parent, child) columns of the self relation of a model """
+
+    field = model._meta.get_field('subecos' if model is Ecosystem else 'subprojects')
+    return (field.remote_field.through._meta.db_table,
+            field.m2m_column_name(), field.m2m_reverse_name())
+
+
+def _query_ids(sql, params):
+    # Routed like the reads of the projects, to a replica if they are used
+    with connections[router.db_for_read(Project)].cursor() as cursor:
+        cursor.execute(sql, params)
+        return set(row[0] for row in cursor.fetchall())
+
+
+def _quote(*names):
+    return [connection.ops.quote_name(name) for name in names]
+
+
+class _Subquery(RawSQL):
+    """ Raw query used as the values of an __in lookup. The lookup already
+    encloses it in parentheses: with the ones added by RawSQL it would be a
+    scalar subquery, returning only its first row. """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def _closure_ids(model, ids, include_self, reverse=False):
+    ids = list(ids)
+    if not ids:
+        return set()
+
+    table, parent, child = _quote(*_edges(model))
+    if reverse:
+        parent, child = child, parent
+    sql = """
+        WITH RECURSIVE tree(id) AS (
+            SELECT %(child)s FROM %(table)s WHERE %(parent)s IN (%(ids)s)
+            UNION
+            SELECT edges.%(child)s FROM %(table)s edges JOIN tree ON edges.%(parent)s = tree.id
+        )
+        SELECT id FROM tree
+    """ % {'table': table, 'parent': parent, 'child': child, 'ids': ', '.join(['%s'] * len(ids))}
+
+    closure = _query_ids(sql, ids)
+    if include_self:
+        closure.update(ids)
+
+    return closure
+
+
+def descendant_ids(model, ids, include_self=True):
+    """ Ids of all the sub-ecosystems or sub-projects of the given ones.
+
+    :param model: Ecosystem or Project
+    :param ids: ids of the roots of the hierarchy
+    :param include_self: include the roots in the result
+    """
+
+    return _closure_ids(model, ids, include_self)
+
+
+def ancestor_ids(model, ids, include_self=True):
+    """ Ids of all the ecosystems or projects including the given ones """
+
+    return _closure_ids(model, ids, include_self, reverse=True)
+
+
+def _effective_projects_sql():
+    # The ecosystem id is the only parameter of the query
+    eco_table, eco_parent, eco_child = _quote(*_edges(Ecosystem))
+    proj_table, proj_parent, proj_child = _quote(*_edges(Project))
+
+    projects_field = Ecosystem._meta.get_field('projects')
+    eco_projects, eco_column, project_column = _quote(projects_field.remote_field.through._meta.db_table,
+                                                      projects_field.m2m_column_name(),
+                                                      projects_field.m2m_reverse_name())
+
+    return """
+        WITH RECURSIVE ecos(id) AS (
+            SELECT %%s
+            UNION
+            SELECT edges.%(eco_child)s FROM %(eco_table)s edges JOIN ecos ON edges.%(eco_parent)s = ecos.id
+        ), projs(id) AS (
+            SELECT members.%(project_column)s FROM %(eco_projects)s members
+                JOIN ecos ON members.%(eco_column)s = ecos.id
+            UNION
+            SELECT edges.%(proj_child)s FROM %(proj_table)s edges JOIN projs ON edges.%(proj_parent)s = projs.id
+        )
+        SELECT id FROM projs
+    """ % {'eco_table': eco_table, 'eco_parent': eco_parent, 'eco_child': eco_child,
+           'proj_table': proj_table, 'proj_parent': proj_parent, 'proj_child': proj_child,
+           'eco_projects': eco_projects, 'eco_column': eco_column, 'project_column': project_column}
+
+
+def effective_project_ids(ecosystem):
+    """ Ids of the projects of an ecosystem, its sub-ecosystems and all their sub-projects """
+
+    return _query_ids(_effective_projects_sql(), [ecosystem.id])
+
+
+def effective_projects(ecosystem):
+    """ Flattened projects of an ecosystem, following sub-ecosystems and sub-projects.
+
+    :param ecosystem: Ecosystem or its name
+    """
+
+    if not isinstance(ecosystem, Ecosystem):
+        ecosystem = Ecosystem.objects.get(name=ecosystem)
+
+    # The CTE is run as a subquery, so the ids are not sent back as query
+    # params, which are limited (999 in SQLite)
+    return Project.objects.filter(id__in=_Subquery(_effective_projects_sql(), [ecosystem.id]))
+
+
+def find_cycles(model):
+    """ Ids of the ecosystems or projects which are their own descendants """
+
+    table, parent, child = _quote(*_edges(model))
+    sql = """
+        WITH RECURSIVE reach(root, id) AS (
+            SELECT %(parent)s, %(child)s FROM %(table)s
+            UNION
+            SELECT reach.root, edges.%(child)s FROM %(table)s edges JOIN reach ON edges.%(parent)s = reach.id
+        )
+        SELECT DISTINCT root FROM reach WHERE root = id
+    """ % {'table': table, 'parent': parent, 'child': child}
+
+    return _query_ids(sql, [])
+
+
+def creates_cycle(parent, child):
+    """ Check if adding child as sub-ecosystem or sub-project of parent creates a cycle """
+
+    return parent.id == child.id or parent.id in descendant_ids(type(parent), [child.id])
@@ -0,0 +1,181 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bulk ingestion of discovered repositories into Bestiary
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+import itertools
+import logging
+
+from collections import OrderedDict, namedtuple
+
+from django.db import transaction
+
+from projects.models import DataSource, Project, Repository, RepositoryView
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500  # Keep it under the SQLite limit of 999 variables per query
+
+IngestReport = namedtuple('IngestReport', ['repositories_inserted', 'repositories_existing',
+                                           'views_inserted', 'views_existing',
+                                           'views_linked'])
+
+
+def batches(iterable, size=BATCH_SIZE):
+    """ Split an iterable in lists of size items without consuming it all """
+
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def upsert_repositories(names, data_source_orm):
+    """ Add the repositories not already in Bestiary.
+
+    :returns: a dict with the repository id for each name and the
+        number of repositories inserted
+    """
+
+    ids = dict(Repository.objects.filter(data_source=data_source_orm, name__in=names)
+               .values_list('name', 'id'))
+    missing = [name for name in names if name not in ids]
+
+    if missing:
+        Repository.objects.bulk_create([Repository(name=name, data_source=data_source_orm)
+                                        for name in missing])
+        # bulk_create does not return the ids of the rows in all the backends
+        ids.update(Repository.objects.filter(data_source=data_source_orm, name__in=missing)
+                   .values_list('name', 'id'))
+
+    return ids, len(missing)
+
+
+def upsert_repository_views(repository_ids, params=''):
+    """ Add the repository views not already in Bestiary.
+
+    :returns: a list with the views ids for the repository ids and the
+        number of views inserted
+    """
+
+    ids = dict(RepositoryView.objects.filter(repository_id__in=repository_ids, params=params)
+               .values_list('repository_id', 'id'))
+    missing = [repo_id for repo_id in repository_ids if repo_id not in ids]
+
+    if missing:
+        RepositoryView.objects.bulk_create([RepositoryView(repository_id=repo_id, params=params)
+                                            for repo_id in missing])
+        ids.update(RepositoryView.objects.filter(repository_id__in=missing, params=params)
+                   .values_list('repository_id', 'id'))
+
+    return [ids[repo_id] for repo_id in repository_ids], len(missing)
+
+
+def link_repository_views(project_orm, view_ids):
+    """ Add to a project the repository views not already included in it.
+
+    :returns: the number of views linked to the project
+    """
+
+    through = Project.repository_views.through
+    linked = set(through.objects.filter(project_id=project_orm.id, repositoryview_id__in=view_ids)
+                 .values_list('repositoryview_id', flat=True))
+    new_ids = [view_id for view_id in view_ids if view_id not in linked]
+
+    if new_ids:
+        # A single query for all the views in the batch
+        project_orm.repository_views.add(*new_ids)
+
+    return len(new_ids)
+
+
+def ingest_repositories(repo_ids, data_source, project=None, params='', batch_size=BATCH_SIZE):
+    """ Upsert a stream of repositories ids in Bestiary.
+
+    Repositories and their views with `params` are inserted with bulk
+    queries, `batch_size` repositories at a time, so the stream can be
+    consumed while it is still being fetched. All the batches are run
+    in a single transaction: if something fails nothing is stored.
+
+    :param repo_ids: iterable with the repositories ids (names in Bestiary)
+    :param data_source: name of an existing data source of the repositories
+    :param project: name of an existing project to add the views to
+    :param params: params of the repository views
+    :param batch_size: number of repositories per bulk query
+    :returns: an IngestReport with the inserted and existing counts
+    :raises DataSource.DoesNotExist: if the data source is not in Bestiary
+    """
+
+    counts = dict.fromkeys(IngestReport._fields, 0)
+
+    with transaction.atomic():
+        data_source_orm = DataSource.objects.get(name=data_source)
+        project_orm = Project.objects.get(name=project) if project else None
+
+        for batch in batches(repo_ids, batch_size):
+            # Remove duplicates keeping the order
+            names = list(OrderedDict.fromkeys(batch))
+
+            repos, ninserted = upsert_repositories(names, data_source_orm)
+            counts['repositories_inserted'] += ninserted
+            counts['repositories_existing'] += len(names) - ninserted
+
+            view_ids, ninserted = upsert_repository_views([repos[name] for name in names], params)
+            counts['views_inserted'] += ninserted
+            counts['views_existing'] += len(names) - ninserted
+
+            if project_orm:
+                counts['views_linked'] += link_repository_views(project_orm, view_ids)
+
+            logger.debug("Ingested %i repositories from %s", len(names), data_source)
+
+    return IngestReport(**counts)
+
+
+def unlink_repositories(repo_ids, data_source, project, params='', batch_size=BATCH_SIZE):
+    """ Remove from a project the views of a stream of repositories ids.
+
+    The repositories and their views are kept in Bestiary because they
+    could be used in other projects.
+
+    :returns: the number of views removed from the project
+    """
+
+    nunlinked = 0
+
+    with transaction.atomic():
+        project_orm = Project.objects.get(name=project)
+
+        for batch in batches(repo_ids, batch_size):
+            linked = list(project_orm.repository_views.filter(repository__name__in=batch,
+                                                              repository__data_source__name=data_source,
+                                                              params=params)
+                          .values_list('id', flat=True))
+            if linked:
+                project_orm.repository_views.remove(*linked)
+            nunlinked += len(linked)
+
+    return nunlinked
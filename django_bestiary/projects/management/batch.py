@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+""" Base command to process many (file, ecosystem) items in one process
+
+The items are given with --item FILE ECOSYSTEM (several times) or in a
+JSON manifest file with a list of {"file": ..., "ecosystem": ...} objects,
+and are processed in parallel with --jobs.
+"""
+
+import json
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+def read_manifest(manifest_file):
+    with open(manifest_file) as fmanifest:
+        manifest = json.load(fmanifest)
+
+    try:
+        return [(item['file'], item['ecosystem']) for item in manifest]
+    except (KeyError, TypeError):
+        raise CommandError("%s is not a list of {\"file\": ..., \"ecosystem\": ...} objects" % manifest_file)
+
+
+class BatchCommand(BaseCommand):
+    """ Command processing items in threads with process_item(projects_file, ecosystem),
+    which returns the number of projects and repository views processed """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--item', nargs=2, action='append', default=[], metavar=('FILE', 'ECOSYSTEM'),
+                            help='Projects file and ecosystem to be processed. It can be repeated')
+        parser.add_argument('--manifest', help='JSON file with a list of {"file": ..., "ecosystem": ...}')
+        parser.add_argument('-j', '--jobs', type=int, default=1, help='Items processed in parallel')
+
+    def get_jobs(self, options):
+        return options['jobs']
+
+    def process_item(self, projects_file, ecosystem):
+        raise NotImplementedError
+
+    def handle(self, *args, **options):
+        items = [tuple(item) for item in options['item']]
+        if options['manifest']:
+            items += read_manifest(options['manifest'])
+        if not items:
+            raise CommandError("No items to process: use --item or --manifest")
+
+        self.options = options
+        self.output_lock = threading.Lock()
+        task_init = time()
+
+        jobs = self.get_jobs(options)
+        if jobs > 1:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(self.run_item, items))
+        else:
+            results = [self.run_item(item) for item in items]
+
+        failed = [result for result in results if result['error']]
+        self.stdout.write("Total: %i items (%i failed), %i projects, %i repository views (%.2f sec)" %
+                          (len(results), len(failed), sum(result['projects'] for result in results),
+                           sum(result['repository_views'] for result in results), time() - task_init))
+
+        if failed:
+            raise CommandError("Failed items: %s" % ", ".join("%s %s" % (result['file'], result['ecosystem'])
+                                                              for result in failed))
+
+    def run_item(self, item):
+        projects_file, ecosystem = item
+        result = {'file': projects_file, 'ecosystem': ecosystem, 'projects': 0, 'repository_views': 0, 'error': None}
+        item_init = time()
+
+        try:
+            result['projects'], result['repository_views'] = self.process_item(projects_file, ecosystem)
+        except Exception as ex:
+            result['error'] = ex
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                # Each thread has its own database connection
+                connection.close()
+
+        with self.output_lock:
+            if result['error']:
+                self.stderr.write("%s %s: failed: %s %s (%.2f sec)" %
+                                  (projects_file, ecosystem, type(result['error']).__name__, result['error'],
+                                   time() - item_init))
+            else:
+                self.stdout.write("%s %s: %i projects, %i repository views (%.2f sec)" %
+                                  (projects_file, ecosystem, result['projects'], result['repository_views'],
+                                   time() - item_init))
+
+        return result
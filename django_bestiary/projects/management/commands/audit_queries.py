@@ -0,0 +1,196 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+""" Query plan audit of the queries done by the importer, exporter and editor
+
+The queries are captured running the importer (with a sample projects
+file), the exporter and the lookups of the editor views and data layer
+against the current database, in a transaction which is rolled back.
+Each distinct query is explained and full scans of tables with more
+than --min-rows rows are reported.
+"""
+
+import logging
+import os
+import re
+
+from collections import OrderedDict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from projects.bestiary_export import fetch_projects
+from projects.bestiary_import import load_projects
+from projects.models import DataSource, Ecosystem, Project, Repository, RepositoryView
+
+
+logger = logging.getLogger(__name__)
+
+AUDIT_ECOSYSTEM = '__audit__'
+SAMPLE_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'projects-release.json')
+
+# IN lists are collapsed to group the queries which only differ in them
+IN_LISTS = re.compile(r'IN \(%s(?:, %s)*\)')
+
+# Full scans not using an index in the plans
+SCANS = {
+    'sqlite': re.compile(r'^SCAN (?:TABLE )?(\w+)\b(?! USING (?:COVERING )?INDEX)', re.MULTILINE),
+    'postgresql': re.compile(r'Seq Scan on (\w+)')
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+def editor_samples():
+    """ Objects imported by the audit used in the editor lookups """
+
+    ecosystem = Ecosystem.objects.get(name=AUDIT_ECOSYSTEM)
+    project = ecosystem.projects.first()
+    view = project.repository_views.select_related('repository__data_source').first()
+
+    return ecosystem, project, view
+
+
+def editor_workload(ecosystem, project, view):
+    """ Lookups done by the editor views, forms and data layer """
+
+    repository = view.repository
+    data_source = repository.data_source
+
+    Project.objects.get(name=project.name)
+    Project.objects.get(id=project.id)
+    Ecosystem.objects.get(name=ecosystem.name)
+    Ecosystem.objects.get(id=ecosystem.id)
+    DataSource.objects.get(name=data_source.name)
+    Repository.objects.get(name=repository.name, data_source=data_source)
+    RepositoryView.objects.get(params=view.params, repository=repository)
+    RepositoryView.objects.get(id=view.id)
+    list(project.repository_views.all())
+    list(ecosystem.projects.all())
+
+    try:
+        from projects import data
+        from projects.views import EditorState
+    except ImportError as ex:
+        logger.warning("Editor data layer not audited: %s", ex)
+        return
+
+    states = [EditorState(eco_name=ecosystem.name), EditorState(projects=[project.name]),
+              EditorState(data_sources=[data_source.name]), EditorState(repository_views=[view.id])]
+    for state in states:
+        for layer in [data.ProjectsData, data.RepositoryViewsData, data.DataSourcesData]:
+            list(layer(state).fetch())
+
+
+class Command(BaseCommand):
+    help = 'Audit the query plans of the importer, exporter and editor queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects-file', default=SAMPLE_FILE,
+                            help='Projects file imported to audit the importer')
+        parser.add_argument('--min-rows', type=int, default=1000,
+                            help='Report full scans of tables with at least these rows')
+        parser.add_argument('--fail', action='store_true',
+                            help='Exit with an error if full scans are found')
+        parser.add_argument('--plans', action='store_true', help='Show all the query plans')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in SCANS:
+            raise CommandError("Query plans of %s databases are not supported" % connection.vendor)
+
+        queries = OrderedDict()
+        table_rows = {}
+        # The plans of recursive CTEs also scan their own results and constant rows
+        tables = set(connection.introspection.table_names())
+        captured = []
+
+        def capture(execute, sql, params, many, context):
+            if not many and sql.startswith('SELECT'):
+                captured.append((sql, params))
+            return execute(sql, params, many, context)
+
+        try:
+            with transaction.atomic():
+                with connection.execute_wrapper(capture):
+                    load_projects(options['projects_file'], AUDIT_ECOSYSTEM)
+                    fetch_projects(AUDIT_ECOSYSTEM)
+                    fetch_projects(AUDIT_ECOSYSTEM, recursive=True)
+
+                samples = editor_samples()
+                with connection.execute_wrapper(capture):
+                    editor_workload(*samples)
+
+                for sql, params in captured:
+                    pattern = IN_LISTS.sub('IN (...)', sql)
+                    if pattern not in queries:
+                        queries[pattern] = {'sql': sql, 'params': params, 'count': 0,
+                                            'plan': self.explain(sql, params)}
+                    queries[pattern]['count'] += 1
+
+                for query in queries.values():
+                    query['scans'] = []
+                    for table in SCANS[connection.vendor].findall('\n'.join(query['plan'])):
+                        if table not in tables:
+                            continue
+                        if table not in table_rows:
+                            table_rows[table] = self.count(table)
+                        if table_rows[table] >= options['min_rows']:
+                            query['scans'].append(table)
+
+                # The data added by the workloads is not kept
+                raise Rollback()
+        except Rollback:
+            pass
+
+        nscans = 0
+        for query in queries.values():
+            if not query['scans'] and not options['plans']:
+                continue
+            nscans += bool(query['scans'])
+            self.stdout.write("%s[%i times] %s %s" % ("FULL SCAN " if query['scans'] else "",
+                                                      query['count'], query['sql'], list(query['params'])))
+            for line in query['plan']:
+                self.stdout.write("    " + line)
+
+        self.stdout.write("%i distinct queries audited, %i with full scans of tables with %i rows or more" %
+                          (len(queries), nscans, options['min_rows']))
+
+        if nscans and options['fail']:
+            raise CommandError("%i queries with full scans" % nscans)
+
+    @staticmethod
+    def explain(sql, params):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                return [row[-1] for row in cursor.fetchall()]
+            cursor.execute('EXPLAIN ' + sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    @staticmethod
+    def count(table):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM %s' % connection.ops.quote_name(table))
+            return cursor.fetchone()[0]
@@ -0,0 +1,46 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+from time import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from projects.changes import compact
+
+
+class Command(BaseCommand):
+    help = 'Compact the change feed of the ecosystems'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=settings.CHANGES_MAX_AGE_DAYS,
+                            help='Drop the changes older than these days (0 to keep them)')
+
+    def handle(self, *args, **options):
+        task_init = time()
+
+        nsuperseded, nexpired = compact(options['max_age'])
+
+        self.stdout.write("Changes dropped: %i superseded, %i older than %i days (%.2f sec)" %
+                          (nsuperseded, nexpired, options['max_age'], time() - task_init))
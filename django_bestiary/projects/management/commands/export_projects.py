@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+from projects.bestiary_export import export_projects, export_snapshot
+from projects.formats import all_formats
+from projects.management.batch import BatchCommand
+
+
+class Command(BatchCommand):
+    help = 'Export ecosystems to projects files'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('-r', '--recursive', action='store_true',
+                            help='Include the projects of the sub-ecosystems and the sub-projects')
+        parser.add_argument('--format', choices=all_formats(),
+                            help='Format of the projects files. Found from their extensions by default')
+        parser.add_argument('-b', '--binary', action='store_true',
+                            help='Export to binary snapshot files (see projects/snapshot_file.py)')
+
+    def process_item(self, projects_file, ecosystem):
+        if self.options['binary']:
+            return export_snapshot(projects_file, ecosystem, self.options['recursive'])
+        return export_projects(projects_file, ecosystem, self.options['recursive'], self.options['format'])
@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+import logging
+
+from django.core.management.base import CommandError
+from django.db import connection
+
+from projects.bestiary_import import BATCH_PROJECTS, check_projects, load_projects
+from projects.formats import all_formats
+from projects.management.batch import BatchCommand
+from projects.planner import plan_import
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BatchCommand):
+    help = 'Import projects files into ecosystems'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--format', choices=all_formats(),
+                            help='Format of the projects files. Found from their extensions by default')
+        parser.add_argument('--check', action='store_true',
+                            help='Compare the projects of each file with the ones of its ecosystem after importing it')
+        parser.add_argument('-n', '--dry-run', action='store_true',
+                            help='Show the changes of the imports without doing them')
+        parser.add_argument('--batch-size', type=int, default=BATCH_PROJECTS,
+                            help='Projects imported in each transaction. 0 to import each file in one')
+
+    def get_jobs(self, options):
+        if options['jobs'] > 1 and connection.vendor == 'sqlite' and not options['dry_run']:
+            # sqlite supports only one writer at a time
+            logger.warning("The items are imported one by one with sqlite")
+            return 1
+        return options['jobs']
+
+    def process_item(self, projects_file, ecosystem):
+        if self.options['dry_run']:
+            return self.plan_item(projects_file, ecosystem)
+
+        counts = load_projects(projects_file, ecosystem, self.options['format'], self.options['batch_size'])
+
+        if self.options['check']:
+            result = check_projects(projects_file, ecosystem, self.options['format'])
+            if not result.ok:
+                raise CommandError("\n".join(result.report()))
+
+        return counts
+
+    def plan_item(self, projects_file, ecosystem):
+        plan = plan_import(projects_file, ecosystem, self.options['format'], batch_size=self.options['batch_size'])
+
+        with self.output_lock:
+            for line in plan.report():
+                self.stdout.write("%s %s: %s" % (projects_file, ecosystem, line))
+
+        if plan.errors:
+            raise CommandError("The import would fail: %s" % "; ".join(plan.errors))
+
+        return plan.nprojects, plan.nrepository_views
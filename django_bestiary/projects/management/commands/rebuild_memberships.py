@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+from time import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.membership import rebuild_memberships
+from projects.models import Ecosystem
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the ecosystems membership table from the projects and views relations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ecosystems', nargs='*',
+                            help='Ecosystems to be rebuilt. All of them if none is given')
+
+    def handle(self, *args, **options):
+        task_init = time()
+
+        ecosystem_ids = None
+        if options['ecosystems']:
+            ecosystems = dict(Ecosystem.objects.filter(name__in=options['ecosystems']).values_list('name', 'id'))
+            missing = set(options['ecosystems']) - set(ecosystems)
+            if missing:
+                raise CommandError("Can not find ecosystems %s" % ", ".join(sorted(missing)))
+            ecosystem_ids = ecosystems.values()
+
+        nrows = rebuild_memberships(ecosystem_ids)
+
+        self.stdout.write("Membership rows: %i (%.2f sec)" % (nrows, time() - task_init))
@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+""" Refresh the read replicas with a snapshot of the primary database
+
+The snapshot is done with the sqlite online backup, so it is consistent
+while the primary is being written, and it replaces the replicas files
+atomically. New connections to the replicas read the new snapshot.
+"""
+
+import os
+import shutil
+import sqlite3
+
+from time import sleep, time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from projects.routers import replica_aliases
+
+
+def snapshot(source, target_file):
+    """ Copy the sqlite database in connection source to target_file """
+
+    tmp_file = target_file + '.tmp'
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+
+    target = sqlite3.connect(tmp_file)
+    try:
+        if hasattr(source, 'backup'):
+            source.backup(target)
+        else:
+            # python < 3.7, needs sqlite >= 3.27
+            target.close()
+            source.execute('VACUUM INTO ?', [tmp_file])
+            target = sqlite3.connect(tmp_file)
+        # The file is replaced, so the WAL files of the primary must not be used
+        target.execute('PRAGMA journal_mode = delete')
+    finally:
+        target.close()
+
+    os.replace(tmp_file, target_file)
+
+
+class Command(BaseCommand):
+    help = 'Refresh the read replicas with a snapshot of the primary database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Refresh the replicas every interval seconds, forever')
+
+    def handle(self, *args, **options):
+        replicas = replica_aliases()
+        if not replicas:
+            raise CommandError("No replicas configured in settings.REPLICA_DATABASES")
+
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError("Snapshots of %s databases are not supported" % primary.vendor)
+
+        while True:
+            task_init = time()
+
+            primary.ensure_connection()
+            replica_files = [settings.DATABASES[replica]['NAME'] for replica in replicas]
+            snapshot(primary.connection, replica_files[0])
+            for replica_file in replica_files[1:]:
+                shutil.copyfile(replica_files[0], replica_file + '.tmp')
+                os.replace(replica_file + '.tmp', replica_file)
+
+            self.stdout.write("Replicas %s refreshed (%.2f sec)" % (", ".join(replicas), time() - task_init))
+
+            if not options['interval']:
+                break
+            sleep(max(0, options['interval'] - (time() - task_init)))
@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+from time import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from projects.sync import HttpRemote, SyncError, sync_ecosystem
+
+
+class Command(BaseCommand):
+    help = 'Sync ecosystems from other Bestiary instance, transferring only the projects which differ'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='URL of the projects of the instance, like http://bestiary:8000/projects/')
+        parser.add_argument('ecosystems', nargs='+', help='Ecosystems to be synced')
+        parser.add_argument('--dry-run', action='store_true', help='Show the projects which differ without syncing')
+        parser.add_argument('--timeout', type=int, default=60, help='Seconds to wait for each request')
+
+    def handle(self, *args, **options):
+        for ecosystem in options['ecosystems']:
+            task_init = time()
+            remote = HttpRemote(options['url'], options['timeout'])
+
+            try:
+                changed, removed = sync_ecosystem(remote, ecosystem, options['dry_run'])
+            except SyncError as ex:
+                raise CommandError("Can not sync %s: %s" % (ecosystem, ex))
+
+            if options['dry_run']:
+                for name in sorted(changed):
+                    self.stdout.write("changed %s" % name)
+                for name in sorted(removed):
+                    self.stdout.write("removed %s" % name)
+
+            self.stdout.write("%s: %i projects updated, %i removed, %i requests (%.2f sec)" %
+                              (ecosystem, len(changed), len(removed), remote.requests, time() - task_init))
@@ -0,0 +1,257 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+""" Maintenance and queries of the Membership table
+
+Views linked to or unlinked from a project are added to or removed from
+the ecosystems including the project, and the same is done with the views
+of the projects added to or removed from an ecosystem. Changes in the
+sub-ecosystems and sub-projects rebuild the ecosystems affected, once per
+transaction when it is committed, or before the table is read in it. The
+signals handlers are in projects.signals.
+"""
+
+import contextlib
+import logging
+import threading
+
+from django.db import transaction
+
+from projects.hierarchy import ancestor_ids, descendant_ids, effective_project_ids
+from projects.ingest import batches
+from projects.models import Ecosystem, Membership, Project, RepositoryView
+
+
+logger = logging.getLogger(__name__)
+
+# Ecosystems to be rebuilt in the current transaction of each thread
+_pending = threading.local()
+
+# Ecosystems including others, cached by cache_ancestors in each thread
+_ancestors = threading.local()
+
+
+@contextlib.contextmanager
+def cache_ancestors():
+    """ Cache the ecosystems including others in a block of writes, as the
+    imports, which are done once per project otherwise. It is cleared if the
+    sub-ecosystems are changed. """
+
+    _ancestors.cache = {}
+    try:
+        yield
+    finally:
+        _ancestors.cache = None
+
+
+def clear_ancestors():
+    if getattr(_ancestors, 'cache', None):
+        _ancestors.cache = {}
+
+
+def ecosystem_ancestor_ids(ecosystem_ids):
+    cache = getattr(_ancestors, 'cache', None)
+    if cache is None:
+        return ancestor_ids(Ecosystem, ecosystem_ids)
+
+    key = frozenset(ecosystem_ids)
+    if key not in cache:
+        cache[key] = ancestor_ids(Ecosystem, key)
+    return set(cache[key])
+
+
+def affected_ecosystem_ids(ecosystem_ids=(), project_ids=()):
+    """ Ids of the ecosystems including, directly or not, the given ecosystems or projects """
+
+    ecosystem_ids = set(ecosystem_ids)
+
+    project_ids = ancestor_ids(Project, project_ids)
+    if project_ids:
+        ecosystem_ids.update(Ecosystem.projects.through.objects.filter(project_id__in=project_ids)
+                             .values_list('ecosystem_id', flat=True))
+
+    return ecosystem_ancestor_ids(ecosystem_ids)
+
+
+def rebuild_ecosystem(ecosystem_id):
+    """ Rebuild the membership rows of an ecosystem.
+
+    :returns: the number of rows inserted
+    """
+
+    views = Project.repository_views.through.objects
+    nrows = 0
+
+    with transaction.atomic():
+        Membership.objects.filter(ecosystem_id=ecosystem_id).delete()
+
+        for project_ids in batches(sorted(effective_project_ids(Ecosystem(id=ecosystem_id)))):
+            rows = views.filter(project_id__in=project_ids) \
+                .values_list('project_id', 'repositoryview_id', 'repositoryview__repository_id')
+            memberships = [Membership(ecosystem_id=ecosystem_id, project_id=project_id,
+                                      repository_view_id=view_id, repository_id=repository_id)
+                           for (project_id, view_id, repository_id) in rows]
+            Membership.objects.bulk_create(memberships)
+            nrows += len(memberships)
+
+    logger.debug("Membership of ecosystem %i rebuilt: %i rows", ecosystem_id, nrows)
+
+    return nrows
+
+
+def rebuild_memberships(ecosystem_ids=None):
+    """ Rebuild the membership rows of the given ecosystems, or all of them.
+
+    :returns: the number of rows inserted
+    """
+
+    if ecosystem_ids is None:
+        Membership.objects.all().delete()
+        ecosystem_ids = Ecosystem.objects.values_list('id', flat=True)
+
+    return sum([rebuild_ecosystem(ecosystem_id) for ecosystem_id in ecosystem_ids])
+
+
+def schedule_rebuild(ecosystem_ids):
+    """ Rebuild the ecosystems when the transaction is committed, or now
+    outside of transactions """
+
+    if not transaction.get_connection().in_atomic_block:
+        rebuild_memberships(ecosystem_ids)
+        return
+
+    if not hasattr(_pending, 'ecosystem_ids'):
+        _pending.ecosystem_ids = set()
+    _pending.ecosystem_ids.update(ecosystem_ids)
+    # It does nothing if the ecosystems are already rebuilt
+    transaction.on_commit(flush_rebuilds)
+
+
+def flush_rebuilds():
+    """ Rebuild the ecosystems scheduled. Called before reading the table.
+
+    The ecosystems of a transaction rolled back are rebuilt too, which
+    is not needed but leaves them right.
+    """
+
+    ecosystem_ids = getattr(_pending, 'ecosystem_ids', None)
+    if ecosystem_ids:
+        _pending.ecosystem_ids = set()
+        rebuild_memberships(ecosystem_ids)
+
+
+def add_projects(ecosystem_ids, project_ids):
+    """ Add the views of the projects, and their sub-projects, to the ecosystems """
+
+    flush_rebuilds()
+
+    project_ids = descendant_ids(Project, project_ids)
+    views = Project.repository_views.through.objects
+
+    for project_ids_batch in batches(sorted(project_ids)):
+        rows = list(views.filter(project_id__in=project_ids_batch)
+                    .values_list('project_id', 'repositoryview_id', 'repositoryview__repository_id'))
+        if not rows:
+            continue
+        existing = set(Membership.objects.filter(ecosystem_id__in=ecosystem_ids, project_id__in=project_ids_batch)
+                       .values_list('ecosystem_id', 'project_id', 'repository_view_id'))
+        Membership.objects.bulk_create([Membership(ecosystem_id=ecosystem_id, project_id=project_id,
+                                                   repository_view_id=view_id, repository_id=repository_id)
+                                        for ecosystem_id in ecosystem_ids
+                                        for (project_id, view_id, repository_id) in rows
+                                        if (ecosystem_id, project_id, view_id) not in existing])
+
+
+def remove_projects(ecosystem_ids, project_ids):
+    """ Remove the views of the projects, and their sub-projects, from the
+    ecosystems which do not include them anymore """
+
+    flush_rebuilds()
+
+    project_ids = descendant_ids(Project, project_ids)
+
+    for ecosystem_id in ecosystem_ids:
+        # They could still be included from other projects or sub-ecosystems
+        removed = project_ids - effective_project_ids(Ecosystem(id=ecosystem_id))
+        if removed:
+            Membership.objects.filter(ecosystem_id=ecosystem_id, project_id__in=removed).delete()
+
+
+def add_views(project_id, view_ids):
+    """ Add the views linked to a project to the ecosystems including it
+
+    :returns: the ids of the ecosystems
+    """
+
+    flush_rebuilds()
+
+    ecosystem_ids = affected_ecosystem_ids(project_ids=[project_id])
+    if not ecosystem_ids:
+        return ecosystem_ids
+
+    repository_ids = dict(RepositoryView.objects.filter(id__in=view_ids).values_list('id', 'repository_id'))
+    existing = set(Membership.objects.filter(project_id=project_id, repository_view_id__in=view_ids)
+                   .values_list('ecosystem_id', 'repository_view_id'))
+
+    Membership.objects.bulk_create([Membership(ecosystem_id=ecosystem_id, project_id=project_id,
+                                               repository_view_id=view_id, repository_id=repository_ids[view_id])
+                                    for ecosystem_id in ecosystem_ids
+                                    for view_id in view_ids
+                                    if (ecosystem_id, view_id) not in existing])
+
+    return ecosystem_ids
+
+
+def remove_views(project_ids, view_ids=None):
+    """ Remove the views unlinked from the projects, or all the project views """
+
+    flush_rebuilds()
+
+    memberships = Membership.objects.filter(project_id__in=project_ids)
+    if view_ids is not None:
+        memberships = memberships.filter(repository_view_id__in=view_ids)
+    memberships.delete()
+
+
+def move_view(view_id, repository_id):
+    """ Update the repository of a view moved to another one """
+
+    Membership.objects.filter(repository_view_id=view_id).update(repository_id=repository_id)
+
+
+def repository_ecosystems(repository):
+    """ Ecosystems including a repository, with an indexed query """
+
+    flush_rebuilds()
+
+    return Ecosystem.objects.filter(id__in=Membership.objects.filter(repository=repository)
+                                    .values('ecosystem_id'))
+
+
+def ecosystem_repository_views(ecosystem):
+    """ Repository views of an ecosystem, its sub-ecosystems and sub-projects """
+
+    flush_rebuilds()
+
+    return RepositoryView.objects.filter(id__in=Membership.objects.filter(ecosystem=ecosystem)
+                                         .values('repository_view_id'))
@@ -0,0 +1,168 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+""" Merkle trees of the projects of the ecosystems, for the anti-entropy sync
+
+Each project of an ecosystem export has a hash of its canonical content
+(see project_hash), so the same projects have the same hash in all the
+Bestiary instances whatever the ids and order of their rows. The projects
+are placed in the tree by the hex digits of the sha256 of their names:
+the node with prefix 'a3' has the projects whose name hash starts with
+'a3'. A node with up to LEAF_SIZE projects is a leaf with their hashes,
+and the others have the hashes of their (up to 16) children.
+
+Two instances with the same projects have the same root hash, and the
+different projects are found following the nodes whose hashes differ
+(see projects.sync), with one request for each level of the tree.
+
+The trees are cached in each process until the change feed of the
+ecosystem (see projects.changes) has new entries.
+"""
+
+import hashlib
+import json
+import threading
+
+from projects import changes
+from projects.models import Ecosystem
+from projects.snapshot import EcosystemSnapshot
+
+
+LEAF_SIZE = 16
+HEX_DIGITS = '0123456789abcdef'
+
+
+def canonical_project(data):
+    """ Project data as it is exported after being imported: with its
+    repository lines sorted and without duplicates, the meta title as a
+    dict and without the empty data sources and titles """
+
+    canonical = {}
+    for field, value in data.items():
+        if field == 'meta':
+            title = value if isinstance(value, str) else value.get('title')
+            if title:
+                canonical['meta'] = {'title': title}
+        elif value:
+            canonical[field] = sorted(set(value))
+
+    return canonical
+
+
+def project_hash(name, data):
+    """ Hash of the name and canonical content of a project """
+
+    content = json.dumps([name, canonical_project(data)], sort_keys=True, separators=(',', ':'),
+                         ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def key_hash(name):
+    """ Position of a project in the tree """
+
+    return hashlib.sha256(name.encode('utf-8')).hexdigest()
+
+
+def _hash_lines(lines):
+    return hashlib.sha256('\n'.join(lines).encode('utf-8')).hexdigest()
+
+
+class MerkleTree():
+    """ Merkle tree of the projects of an ecosystem export """
+
+    def __init__(self, projects):
+        """ :param projects: dict with the projects data by name, as exported """
+
+        self.hashes = {name: project_hash(name, data) for name, data in projects.items()}
+        self.keys = {name: key_hash(name) for name in self.hashes}
+        self.nodes = {}
+        leaves = sorted((key, name) for name, key in self.keys.items())
+        self._build('', leaves)
+
+    def _build(self, prefix, leaves):
+        if len(leaves) <= LEAF_SIZE:
+            projects = {name: self.hashes[name] for (_, name) in leaves}
+            node_hash = _hash_lines(['%s:%s' % (name, projects[name]) for (_, name) in leaves])
+            self.nodes[prefix] = {'hash': node_hash, 'projects': projects}
+            return node_hash
+
+        children = {}
+        for digit in HEX_DIGITS:
+            child = prefix + digit
+            child_leaves = [leaf for leaf in leaves if leaf[0][len(prefix)] == digit]
+            if child_leaves:
+                children[child] = self._build(child, child_leaves)
+
+        node_hash = _hash_lines(['%s:%s' % (child, children[child]) for child in sorted(children)])
+        self.nodes[prefix] = {'hash': node_hash, 'children': children}
+        return node_hash
+
+    @property
+    def root_hash(self):
+        return self.nodes['']['hash']
+
+    def node(self, prefix):
+        """ Node with prefix: its hash and its children or projects hashes.
+        A node not in the tree has no projects and a None hash """
+
+        return self.nodes.get(prefix, {'hash': None, 'projects': {}})
+
+    def project_hashes(self, prefix):
+        """ Hashes of all the projects under prefix, whatever the node is """
+
+        return {name: self.hashes[name] for name, key in self.keys.items() if key.startswith(prefix)}
+
+
+_trees = {}
+_trees_lock = threading.Lock()
+
+
+def ecosystem_tree(ecosystem):
+    """ Merkle tree of the projects of an ecosystem (or its name), as exported """
+
+    from projects.bestiary_export import snapshot_projects
+
+    if not isinstance(ecosystem, Ecosystem):
+        ecosystem = Ecosystem.objects.get(name=ecosystem)
+
+    # Read before the projects, so a tree is never older than its seq
+    seq = changes.last_seq(ecosystem)
+    with _trees_lock:
+        cached = _trees.get(ecosystem.id)
+    if cached and cached[0] == seq:
+        return cached[1]
+
+    tree = MerkleTree(snapshot_projects(EcosystemSnapshot.build(ecosystem)))
+    with _trees_lock:
+        _trees[ecosystem.id] = (seq, tree)
+
+    return tree
+
+
+def ecosystem_projects(ecosystem, names):
+    """ Data of the projects with names in an ecosystem, as exported """
+
+    from projects.bestiary_export import snapshot_projects
+
+    return snapshot_projects(EcosystemSnapshot.build(ecosystem, project_names=names))
@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+from time import time
+
+from django.conf import settings
+
+from projects.routers import replica_aliases, track_writes, use_replicas
+
+
+STICKY_COOKIE = 'bestiary_primary_until'
+STICKY_SECONDS = 60  # if REPLICA_STICKY_SECONDS is not in settings
+SAFE_METHODS = ['GET', 'HEAD', 'OPTIONS']
+
+
+class ReplicaMiddleware():
+    """ Read only requests read from the replicas, except after a write
+
+    A client which has written something reads from the primary during
+    REPLICA_STICKY_SECONDS, which should be longer than the time between
+    the replicas snapshots, so it always reads its own writes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        try:
+            sticky = float(request.COOKIES.get(STICKY_COOKIE, 0)) > time()
+        except ValueError:
+            sticky = False
+
+        with track_writes() as writes:
+            if request.method in SAFE_METHODS and not sticky:
+                with use_replicas():
+                    response = self.get_response(request)
+            else:
+                response = self.get_response(request)
+
+        if writes:
+            sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', STICKY_SECONDS)
+            response.set_cookie(STICKY_COOKIE, str(time() + sticky_seconds), max_age=sticky_seconds, httponly=True)
+
+        return response
@@ -68,3 +68,96 @@ class Ecosystem(BeastModel):
 
     def __str__(self):
         return self.name
+
+
+class Membership(models.Model):
+    """ Denormalized membership of the repository views in the ecosystems.
+
+    There is a row for each view of each project of an ecosystem, following
+    sub-ecosystems and sub-projects (see projects.membership). It is derived
+    data maintained from the m2m signals, so it has no BeastModel metadata.
+    """
+    ecosystem = models.ForeignKey(Ecosystem, on_delete=models.CASCADE)
+    # The project which includes the view directly
+    project = models.ForeignKey(Project, on_delete=models.CASCADE)
+    repository_view = models.ForeignKey(RepositoryView, on_delete=models.CASCADE)
+    repository = models.ForeignKey(Repository, on_delete=models.CASCADE)
+
+    class Meta:
+        # Its index is used for the ecosystem wide scans
+        unique_together = ('ecosystem', 'project', 'repository_view')
+        # Reverse lookups: ecosystems including a repository, view or project.
+        # (project, repository_view) is also used when linking views.
+        indexes = [
+            models.Index(fields=['repository', 'ecosystem']),
+            models.Index(fields=['repository_view', 'ecosystem']),
+            models.Index(fields=['project', 'repository_view'])
+        ]
+
+    def __str__(self):
+        return "%s: %s %s" % (self.ecosystem, self.project, self.repository_view)
+
+
+class Change(models.Model):
+    """ Entry of the change feed of an ecosystem (see projects.changes).
+
+    There is an entry for each ecosystem including, directly or not, the
+    project changed. seq grows monotonically, so the consumers ask for
+    the changes after the last one they applied.
+    """
+    KINDS = ('project', 'repository_view', 'repository', 'membership')
+    ACTIONS = ('add', 'update', 'remove')
+
+    seq = models.BigAutoField(primary_key=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    ecosystem = models.ForeignKey(Ecosystem, on_delete=models.CASCADE)
+    # Name of the project in the flattened export of the ecosystem
+    project = models.CharField(max_length=200)
+    kind = models.CharField(max_length=20, choices=[(kind, kind) for kind in KINDS])
+    action = models.CharField(max_length=10, choices=[(action, action) for action in ACTIONS])
+    # The project, repository lines (one per line) or child changed
+    name = models.TextField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ecosystem', 'seq']),
+            models.Index(fields=['ecosystem', 'project'])
+        ]
+
+    def __str__(self):
+        return "%i %s: %s %s %s" % (self.seq, self.ecosystem_id, self.action, self.kind, self.name)
+
+
+class ChangeCompaction(models.Model):
+    """ Last seq of the changes of an ecosystem dropped by the compaction.
+
+    The consumers which did not apply the changes up to it must start
+    again from a full export.
+    """
+    ecosystem = models.OneToOneField(Ecosystem, on_delete=models.CASCADE, primary_key=True)
+    seq = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return "%s: %i" % (self.ecosystem_id, self.seq)
+
+
+class ImportCheckpoint(models.Model):
+    """ Progress of an import of a projects file into an ecosystem.
+
+    It is saved with each batch of projects imported, in its transaction,
+    so an interrupted import is resumed after the last batch committed.
+    The file is identified by the sha256 of its content.
+    """
+    file_hash = models.CharField(max_length=64)
+    ecosystem = models.ForeignKey(Ecosystem, on_delete=models.CASCADE)
+    # Projects of the file already imported, and their repository views
+    nprojects = models.IntegerField(default=0)
+    nrepository_views = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('file_hash', 'ecosystem')
+
+    def __str__(self):
+        return "%s %s: %i projects" % (self.ecosystem_id, self.file_hash, self.nprojects)
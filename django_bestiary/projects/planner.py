@@ -0,0 +1,281 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+""" Dry run of the import of a projects file
+
+The file is resolved against the current database with bulk lookups of
+the projects, repositories and views of each chunk of projects, without
+writing anything. The plan has the objects the importer would create
+and the relations it would link, following load_projects: the existing
+objects are reused and nothing is unlinked. The relations of the
+ecosystem and its projects which are not in the file are reported as
+stale, as a sync of the ecosystem (see projects.sync) would unlink them.
+
+The importer writes the objects and the relations one by one, in a
+transaction for each batch of batch_size projects (one for all of them
+with 0), so the plan counts the rows written and the transactions.
+"""
+
+import math
+
+from collections import OrderedDict
+
+from projects.bestiary_import import BATCH_PROJECTS, find_params, find_repo_name, list_not_ds_fields
+from projects.catalog import catalog
+from projects.formats import read_projects
+from projects.ingest import batches
+from projects.models import Ecosystem, Project, Repository, RepositoryView
+
+
+# Projects resolved with each bulk lookup
+CHUNK_SIZE = 100
+
+MODELS = ['Ecosystem', 'Project', 'DataSource', 'Repository', 'RepositoryView']
+RELATIONS = ['Ecosystem.projects', 'Project.repository_views']
+
+
+class ImportPlan():
+    """ Objects created, relations linked and stale, errors which make the
+    import fail and repository lines skipped of an import.
+
+    The objects and relations are tuples of names: (data source, repository)
+    for the repositories, (data source, repository, params) for the views,
+    and (parent, child names...) for the relations.
+    """
+
+    def __init__(self, ecosystem, batch_size=BATCH_PROJECTS):
+        self.ecosystem = ecosystem
+        self.batch_size = batch_size
+        self.creates = OrderedDict((model, set()) for model in MODELS)
+        self.links = OrderedDict((relation, set()) for relation in RELATIONS)
+        self.stale = OrderedDict((relation, set()) for relation in RELATIONS)
+        self.errors = []
+        self.skipped = []
+        self.nprojects = 0
+        self.nrepository_views = 0
+
+    @property
+    def empty(self):
+        return not any(self.creates.values()) and not any(self.links.values())
+
+    def counts(self):
+        """ Creates of each model, links and stale of each relation """
+
+        counts = OrderedDict()
+        for model in MODELS:
+            counts[model] = {'create': len(self.creates[model])}
+        for relation in RELATIONS:
+            counts[relation] = {'link': len(self.links[relation]), 'stale': len(self.stale[relation])}
+        return counts
+
+    def writes(self):
+        """ Rows inserted by the import, one by one """
+
+        return sum(len(keys) for keys in list(self.creates.values()) + list(self.links.values()))
+
+    def transactions(self):
+        """ Transactions of the import, one for each batch of projects """
+
+        if not self.batch_size:
+            return 1
+        return math.ceil(self.nprojects / self.batch_size)
+
+    def changes(self):
+        """ Lines with the changes, sorted by model """
+
+        lines = []
+        for action, changes in [('create', self.creates), ('link', self.links), ('stale', self.stale)]:
+            for name, keys in changes.items():
+                # The empty params are not shown
+                lines.extend("%s %s %s" % (action, name, " ".join(filter(None, key))) for key in sorted(keys))
+        return lines
+
+    def report(self):
+        """ Lines with the changes, the errors and the counts """
+
+        lines = self.changes()
+        lines.extend("skipped %s" % line for line in self.skipped)
+        lines.extend("error %s" % error for error in self.errors)
+        for name, count in self.counts().items():
+            lines.append("%s: %s" % (name, ", ".join("%i %s" % (count[field], field) for field in count)))
+        lines.append("%i projects, %i repository views: %i rows written in %i transactions" %
+                     (self.nprojects, self.nrepository_views, self.writes(), self.transactions()))
+        return lines
+
+    def to_dict(self):
+        return {
+            'ecosystem': self.ecosystem,
+            'create': {model: sorted(keys) for model, keys in self.creates.items()},
+            'link': {relation: sorted(keys) for relation, keys in self.links.items()},
+            'stale': {relation: sorted(keys) for relation, keys in self.stale.items()},
+            'errors': self.errors,
+            'skipped': self.skipped,
+            'counts': self.counts(),
+            'writes': self.writes(),
+            'transactions': self.transactions()
+        }
+
+
+def parse_project(name, data, plan):
+    """ Meta title (None if not given) and (data source, repository, params) of the views """
+
+    meta = data.get('meta')
+    meta_title = None
+    if meta is not None:
+        meta_title = meta if isinstance(meta, str) else meta['title']
+
+    views = set()
+    for data_source, lines in data.items():
+        if data_source in list_not_ds_fields():
+            continue
+        for line in lines:
+            repo_name = find_repo_name(line, data_source)
+            if repo_name is None:
+                plan.skipped.append("%s %s %s" % (name, data_source, line))
+                continue
+            plan.nrepository_views += 1
+            views.add((data_source, repo_name, find_params(line, data_source)))
+
+    return meta_title, views
+
+
+def plan_import(projects_file, ecosystem, file_format=None, chunk_size=CHUNK_SIZE, batch_size=BATCH_PROJECTS):
+    """ Plan of the import of a projects file, in any of the projects.formats,
+    into the ecosystem with name, without writing to the database.
+    batch_size is the one of the import (see load_projects). """
+
+    plan = ImportPlan(ecosystem, batch_size)
+
+    ecosystem_orm = Ecosystem.objects.filter(name=ecosystem).first()
+    ecosystem_project_ids = set()
+    if ecosystem_orm:
+        ecosystem_project_ids = set(Ecosystem.projects.through.objects.filter(ecosystem=ecosystem_orm)
+                                    .values_list('project_id', flat=True))
+    else:
+        plan.creates['Ecosystem'].add((ecosystem,))
+
+    data_sources = set(catalog.names())
+    file_project_ids = set()
+
+    for chunk in batches(read_projects(projects_file, file_format), chunk_size):
+        projects = OrderedDict()
+        for name, data in chunk:
+            projects[name] = parse_project(name, data, plan)
+            for data_source in set(data) - set(list_not_ds_fields()) - data_sources:
+                plan.creates['DataSource'].add((data_source,))
+        plan.nprojects += len(chunk)
+
+        existing = {name: (project_id, meta_title) for project_id, name, meta_title in
+                    Project.objects.filter(name__in=list(projects)).values_list('id', 'name', 'meta_title')}
+        file_project_ids.update(project_id for project_id, _ in existing.values())
+
+        for name, (meta_title, _) in projects.items():
+            if name not in existing:
+                plan.creates['Project'].add((name,))
+            elif meta_title is not None and existing[name][1] != meta_title:
+                plan.errors.append("Project %s exists with meta title %r instead of %r: the import fails" %
+                                   (name, existing[name][1], meta_title))
+            if name not in existing or existing[name][0] not in ecosystem_project_ids:
+                plan.links['Ecosystem.projects'].add((ecosystem, name))
+
+        view_ids = _resolve_views(set(view for (_, views) in projects.values() for view in views),
+                                  data_sources, plan)
+
+        # Views of the existing projects
+        project_ids = [project_id for project_id, _ in existing.values()]
+        linked = {}
+        for ids in batches(project_ids):
+            for project_id, view_id in Project.repository_views.through.objects.filter(project_id__in=ids) \
+                    .values_list('project_id', 'repositoryview_id'):
+                linked.setdefault(project_id, set()).add(view_id)
+
+        stale_ids = {}
+        for name, (_, views) in projects.items():
+            project_id = existing[name][0] if name in existing else None
+            project_view_ids = linked.get(project_id, set())
+            file_view_ids = set()
+            for view in views:
+                view_id = view_ids.get(view)
+                file_view_ids.add(view_id)
+                if view_id is None or view_id not in project_view_ids:
+                    plan.links['Project.repository_views'].add((name,) + view)
+            if project_view_ids - file_view_ids:
+                stale_ids[name] = project_view_ids - file_view_ids
+
+        _add_stale_views(stale_ids, plan)
+
+    stale_projects = Project.objects.filter(id__in=ecosystem_project_ids - file_project_ids)
+    plan.stale['Ecosystem.projects'].update((ecosystem, name) for name in stale_projects.values_list('name', flat=True))
+
+    return plan
+
+
+def _resolve_views(views, data_sources, plan):
+    """ Ids of the existing views of the (data source, repository, params) views,
+    adding to the plan the missing data sources, repositories and views """
+
+    repositories = {}
+    for data_source, repo_name, _ in views:
+        repositories.setdefault(data_source, set()).add(repo_name)
+
+    repository_ids = {}
+    for data_source, names in repositories.items():
+        if data_source not in data_sources:
+            continue
+        for names_batch in batches(sorted(names)):
+            for repository_id, name in Repository.objects.filter(data_source__name=data_source, name__in=names_batch) \
+                    .values_list('id', 'name'):
+                repository_ids[(data_source, name)] = repository_id
+
+    existing_views = {}
+    for ids in batches(sorted(set(repository_ids.values()))):
+        for view_id, repository_id, params in RepositoryView.objects.filter(repository_id__in=ids) \
+                .values_list('id', 'repository_id', 'params'):
+            existing_views[(repository_id, params)] = view_id
+
+    view_ids = {}
+    for data_source, repo_name, params in views:
+        repository_id = repository_ids.get((data_source, repo_name))
+        if repository_id is None:
+            plan.creates['Repository'].add((data_source, repo_name))
+        view_id = existing_views.get((repository_id, params))
+        if view_id is None:
+            plan.creates['RepositoryView'].add((data_source, repo_name, params))
+        view_ids[(data_source, repo_name, params)] = view_id
+
+    return view_ids
+
+
+def _add_stale_views(stale_ids, plan):
+    """ Add the views linked to the projects and not in the file """
+
+    ids = set(view_id for view_ids in stale_ids.values() for view_id in view_ids)
+    views = {}
+    for ids_batch in batches(sorted(ids)):
+        for view_id, data_source, repo_name, params in RepositoryView.objects.filter(id__in=ids_batch) \
+                .values_list('id', 'repository__data_source__name', 'repository__name', 'params'):
+            views[view_id] = (data_source, repo_name, params)
+
+    for name, view_ids in stale_ids.items():
+        plan.stale['Project.repository_views'].update((name,) + views[view_id] for view_id in view_ids)
@@ -0,0 +1,117 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+""" Database router sending reads to the replicas
+
+The replicas are snapshots of the primary database (see the
+snapshot_replicas command) listed in settings.REPLICA_DATABASES. Reads
+are sent to them only inside use_replicas(), which ReplicaMiddleware uses
+for the read only requests. All the other reads, and the reads inside
+transactions, go to the primary, like all the writes.
+"""
+
+import random
+import threading
+
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Apps with data in the replicas. Sessions, users and the like are always
+# read from the primary, as they are written while reading the projects.
+REPLICATED_APPS = ['projects']
+
+_state = threading.local()
+
+
+def replica_aliases():
+    return getattr(settings, 'REPLICA_DATABASES', [])
+
+
+@contextmanager
+def use_replicas():
+    """ Send the reads of this thread to a replica chosen at random """
+
+    replicas = replica_aliases()
+    previous = getattr(_state, 'replica', None)
+    _state.replica = random.choice(replicas) if replicas else None
+    try:
+        yield _state.replica
+    finally:
+        _state.replica = previous
+
+
+@contextmanager
+def use_primary():
+    """ Send the reads of this thread to the primary """
+
+    previous = getattr(_state, 'replica', None)
+    _state.replica = None
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+@contextmanager
+def track_writes():
+    """ Yield a list with the models of the replicated apps written in this thread """
+
+    previous = getattr(_state, 'writes', None)
+    _state.writes = []
+    try:
+        yield _state.writes
+    finally:
+        _state.writes = previous
+
+
+class ReplicaRouter():
+
+    def db_for_read(self, model, **hints):
+        replica = getattr(_state, 'replica', None)
+
+        if not replica or model._meta.app_label not in REPLICATED_APPS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # It could read rows written in the transaction
+            return DEFAULT_DB_ALIAS
+
+        return replica
+
+    def db_for_write(self, model, **hints):
+        writes = getattr(_state, 'writes', None)
+        if writes is not None and model._meta.app_label in REPLICATED_APPS:
+            writes.append(model._meta.label)
+
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas have the same rows than the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replicas are created from the migrated primary
+        return db not in replica_aliases()
@@ -0,0 +1,227 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+""" Signal handlers keeping the Membership table, the change feed and the
+data sources catalog up to date
+
+They are connected in ProjectsConfig.ready()
+"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+
+from projects import changes, membership
+from projects.catalog import catalog
+from projects.hierarchy import descendant_ids, effective_projects
+from projects.models import DataSource, Ecosystem, Project, Repository, RepositoryView
+
+
+# Fields of the objects whose changes are added to the change feed
+TRACKED_FIELDS = {
+    Project: ('name', 'meta_title'),
+    Repository: ('name', 'data_source_id'),
+    RepositoryView: ('repository_id', 'params')
+}
+
+# The parent to children relations of the hierarchy by their through model
+HIERARCHY_FIELDS = {field.remote_field.through: field for field in [
+    Ecosystem._meta.get_field('projects'), Ecosystem._meta.get_field('subecos'),
+    Project._meta.get_field('subprojects')]}
+
+
+def project_views_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """ Project.repository_views: the views are updated without rebuilding """
+
+    if action == 'post_add' and pk_set:
+        if reverse:
+            # instance is a view added to the projects in pk_set
+            lines = changes.view_lines([instance.id])
+            for project in Project.objects.filter(id__in=pk_set):
+                ecosystem_ids = membership.add_views(project.id, [instance.id])
+                changes.record(ecosystem_ids, [project.name], 'repository_view', 'add', lines.values())
+        else:
+            ecosystem_ids = membership.add_views(instance.id, list(pk_set))
+            if ecosystem_ids:
+                # One entry with the lines of all the views
+                lines = changes.view_lines(pk_set)
+                changes.record(ecosystem_ids, [instance.name], 'repository_view', 'add',
+                               ["\n".join(lines[view_id] for view_id in sorted(lines))])
+    elif action == 'pre_remove' and pk_set:
+        if reverse:
+            removed = changes.view_members(project_id__in=pk_set, repository_view_id=instance.id)
+        else:
+            removed = changes.view_members(project_id=instance.id, repository_view_id__in=pk_set)
+        changes.record_views(removed, 'repository_view', 'remove')
+    elif action == 'post_remove':
+        if reverse:
+            membership.remove_views(pk_set, [instance.id])
+        else:
+            membership.remove_views([instance.id], pk_set)
+    elif action == 'pre_clear':
+        if reverse:
+            changes.record_views(changes.view_members(repository_view_id=instance.id), 'repository_view', 'remove')
+            membership.remove_views(instance.project_set.values_list('id', flat=True), [instance.id])
+        else:
+            changes.record_views(changes.view_members(project_id=instance.id), 'repository_view', 'remove')
+            membership.remove_views([instance.id])
+
+
+def hierarchy_changed(sender, instance, action, reverse, pk_set, model, **kwargs):
+    """ Ecosystem.projects: the views of the projects are added to or removed
+    from the ecosystems including the changed ones.
+    Ecosystem.subecos and Project.subprojects: those ecosystems are rebuilt """
+
+    if action == 'pre_clear':
+        # The related objects are not known after the clear
+        instance._membership_affected = affected_ecosystems(type(instance), [instance.id])
+        if reverse:
+            instance._changes_children = [instance.id]
+        else:
+            field = HIERARCHY_FIELDS[sender]
+            instance._changes_children = list(sender.objects.filter(**{field.m2m_field_name(): instance.id})
+                                              .values_list(field.m2m_reverse_field_name(), flat=True))
+        return
+
+    if action == 'post_clear':
+        ecosystem_ids = instance._membership_affected
+        children = instance._changes_children
+    elif action in ['post_add', 'post_remove'] and pk_set:
+        ecosystem_ids = affected_ecosystems(type(instance), [instance.id])
+        if reverse:
+            # instance is the child, and pk_set its parents
+            ecosystem_ids |= affected_ecosystems(model, pk_set)
+        children = [instance.id] if reverse else pk_set
+    else:
+        return
+
+    if sender is not Ecosystem.projects.through:
+        if sender is Ecosystem.subecos.through:
+            membership.clear_ancestors()
+        membership.schedule_rebuild(ecosystem_ids)
+    elif action == 'post_add':
+        membership.add_projects(ecosystem_ids, children)
+    else:
+        membership.remove_projects(ecosystem_ids, children)
+
+    child_model = type(instance) if reverse else model
+    for child in child_model.objects.filter(id__in=children):
+        changes.record(ecosystem_ids, child_project_names(child), 'membership',
+                       'add' if action == 'post_add' else 'remove', [child.name])
+
+
+def child_project_names(child):
+    """ Projects included in the ecosystems with a child ecosystem or project """
+
+    if isinstance(child, Ecosystem):
+        projects = effective_projects(child)
+    else:
+        projects = Project.objects.filter(id__in=descendant_ids(Project, [child.id]))
+
+    return projects.values_list('name', flat=True)
+
+
+def affected_ecosystems(model, ids):
+    """ Ecosystems including the ecosystems or projects with ids """
+
+    if model is Ecosystem:
+        return membership.affected_ecosystem_ids(ecosystem_ids=ids)
+    return membership.affected_ecosystem_ids(project_ids=ids)
+
+
+def hierarchy_pre_delete(sender, instance, **kwargs):
+    # The relations of the deleted object are removed without m2m signals
+    affected = affected_ecosystems(sender, [instance.id])
+    if sender is Ecosystem:
+        # Its own rows are deleted in cascade
+        affected.discard(instance.id)
+        membership.clear_ancestors()
+    instance._membership_affected = affected
+
+    if sender is Ecosystem:
+        changes.record(affected, child_project_names(instance), 'membership', 'remove', [instance.name])
+    else:
+        changes.record(affected, child_project_names(instance), 'project', 'remove', [instance.name])
+
+
+def hierarchy_post_delete(sender, instance, **kwargs):
+    membership.schedule_rebuild(instance._membership_affected)
+
+
+def data_source_changed(sender, **kwargs):
+    catalog.invalidate()
+
+
+def tracked_loaded(sender, instance, **kwargs):
+    # The values saved are compared with them
+    instance._changes_saved = tuple(getattr(instance, field) for field in TRACKED_FIELDS[sender])
+
+
+def tracked_saved(sender, instance, created, **kwargs):
+    """ Project, Repository or RepositoryView updated. The views moved to
+    another repository are updated in the Membership table too """
+
+    saved = instance._changes_saved
+    tracked_loaded(sender, instance)
+    if created or saved == instance._changes_saved:
+        return
+
+    if sender is Project:
+        # A renamed project is removed from the exports with its old name
+        ecosystem_ids = affected_ecosystems(Project, [instance.id])
+        names = [instance.name] if saved[0] == instance.name else [saved[0], instance.name]
+        changes.record(ecosystem_ids, names, 'project', 'update', [instance.name])
+    elif sender is Repository:
+        changes.record_views(changes.view_members(repository_id=instance.id), 'repository', 'update')
+    else:
+        if saved[0] != instance.repository_id:
+            membership.move_view(instance.id, instance.repository_id)
+        changes.record_views(changes.view_members(repository_view_id=instance.id), 'repository_view', 'update')
+
+
+def views_pre_delete(sender, instance, **kwargs):
+    """ Repository or RepositoryView deleted, with its memberships in cascade """
+
+    if sender is Repository:
+        changes.record_views(changes.view_members(repository_id=instance.id), 'repository', 'remove')
+    else:
+        changes.record_views(changes.view_members(repository_view_id=instance.id), 'repository_view', 'remove')
+
+
+def connect():
+    m2m_changed.connect(project_views_changed, sender=Project.repository_views.through)
+
+    for through in [Ecosystem.projects.through, Ecosystem.subecos.through, Project.subprojects.through]:
+        m2m_changed.connect(hierarchy_changed, sender=through)
+
+    for model in [Ecosystem, Project]:
+        pre_delete.connect(hierarchy_pre_delete, sender=model)
+        post_delete.connect(hierarchy_post_delete, sender=model)
+
+    post_save.connect(data_source_changed, sender=DataSource)
+    post_delete.connect(data_source_changed, sender=DataSource)
+
+    for model in TRACKED_FIELDS:
+        post_init.connect(tracked_loaded, sender=model)
+        post_save.connect(tracked_saved, sender=model)
+
+    for model in [Repository, RepositoryView]:
+        pre_delete.connect(views_pre_delete, sender=model)
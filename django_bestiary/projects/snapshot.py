@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+""" Compact read only snapshot of the projects of an ecosystem
+
+The exporter and other read only consumers only need a few strings of
+each repository view, so they are loaded with values_list() queries into
+flat arrays instead of model instances. The strings are interned, so the
+repositories in several projects and the params repeated in many views
+are stored once, and the data sources are small integers.
+"""
+
+import sys
+
+from array import array
+from collections import namedtuple
+
+from projects.hierarchy import effective_projects
+from projects.models import DataSource, Ecosystem, Project
+
+
+SnapshotView = namedtuple('SnapshotView', ['data_source', 'repository', 'params'])
+
+
+class EcosystemSnapshot():
+    """ Projects and repository views of an ecosystem.
+
+    The views of the project i are the ones in the range
+    [offsets[i], offsets[i + 1]) of the views arrays.
+    """
+
+    __slots__ = ('name', '_data_sources', '_projects', '_meta_titles', '_offsets',
+                 '_view_data_sources', '_view_repositories', '_view_params')
+
+    def __init__(self, name, data_sources, projects, meta_titles, offsets,
+                 view_data_sources, view_repositories, view_params):
+        self.name = name
+        self._data_sources = tuple(data_sources)
+        self._projects = tuple(projects)
+        self._meta_titles = tuple(meta_titles)
+        self._offsets = offsets
+        self._view_data_sources = view_data_sources
+        self._view_repositories = tuple(view_repositories)
+        self._view_params = tuple(view_params)
+
+    @classmethod
+    def build(cls, ecosystem, recursive=False, project_names=None):
+        """ Snapshot of an ecosystem (or its name). With recursive, the projects of
+        the sub-ecosystems and all the sub-projects are included, flattened.
+        With project_names, only the ones of them in the ecosystem """
+
+        if not isinstance(ecosystem, Ecosystem):
+            ecosystem = Ecosystem.objects.get(name=ecosystem)
+
+        if recursive:
+            projects = effective_projects(ecosystem)
+        else:
+            projects = ecosystem.projects.all()
+        if project_names is not None:
+            projects = projects.filter(name__in=list(project_names))
+
+        data_sources = []
+        data_source_index = {}
+        for data_source_id, data_source in DataSource.objects.order_by('id').values_list('id', 'name'):
+            data_source_index[data_source_id] = len(data_sources)
+            data_sources.append(sys.intern(data_source))
+
+        project_ids = []
+        project_index = {}
+        names = []
+        meta_titles = []
+        for project_id, name, meta_title in projects.order_by('name').values_list('id', 'name', 'meta_title'):
+            project_index[project_id] = len(project_ids)
+            project_ids.append(project_id)
+            names.append(sys.intern(name))
+            meta_titles.append(sys.intern(meta_title) if meta_title else None)
+
+        # The views of each project, grouped by project
+        project_views = [[] for _ in project_ids]
+        through = Project.repository_views.through
+        views = through.objects.filter(project__in=projects).order_by('repositoryview_id')
+        for project_id, params, repository, data_source_id in views.values_list(
+                'project_id', 'repositoryview__params', 'repositoryview__repository__name',
+                'repositoryview__repository__data_source_id'):
+            project_views[project_index[project_id]].append((data_source_index[data_source_id],
+                                                             sys.intern(repository), sys.intern(params)))
+
+        offsets = array('L', [0])
+        view_data_sources = array('H')
+        view_repositories = []
+        view_params = []
+        for views in project_views:
+            for data_source, repository, params in views:
+                view_data_sources.append(data_source)
+                view_repositories.append(repository)
+                view_params.append(params)
+            offsets.append(len(view_repositories))
+
+        return cls(ecosystem.name, data_sources, names, meta_titles, offsets,
+                   view_data_sources, view_repositories, view_params)
+
+    def __len__(self):
+        """ Number of (project, repository view) pairs """
+
+        return len(self._view_repositories)
+
+    @property
+    def data_sources(self):
+        return self._data_sources
+
+    def projects(self):
+        """ Names and meta titles of the projects, sorted by name """
+
+        return zip(self._projects, self._meta_titles)
+
+    def project_views(self, nproject):
+        """ Views of the project in position nproject """
+
+        for nview in range(self._offsets[nproject], self._offsets[nproject + 1]):
+            yield SnapshotView(self._data_sources[self._view_data_sources[nview]],
+                               self._view_repositories[nview], self._view_params[nview])
+
+    def views(self):
+        """ Project name and view of all the views """
+
+        for nproject, project in enumerate(self._projects):
+            for view in self.project_views(nproject):
+                yield project, view
@@ -0,0 +1,259 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+""" Binary snapshot files of the projects of an ecosystem
+
+The file has the projects of an ecosystem in the projects.json shape,
+with the repository lines already built, and it is read with mmap, so a
+project is found without reading the rest. This module only uses the
+python standard library, so it can be copied to the consumers:
+
+    with SnapshotReader('chaoss.bsnp') as snapshot:
+        snapshot['grimoirelab']  # {"git": ["https://..."], "meta": {...}}
+
+Layout, with little endian uint32 values:
+
+    header       magic, version, ecosystem name string, number of strings,
+                 data sources, projects and views
+    string index (strings + 1) offsets of the strings in the string data
+    data sources string of each data source name
+    projects     name string, meta title string (or NONE), first view and
+                 end view, sorted by the UTF-8 bytes of the name
+    views        data source and repository line string
+    string data  UTF-8 strings, each one stored once
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+
+MAGIC = b'BSNP'
+VERSION = 1
+NONE = 0xFFFFFFFF
+
+HEADER = struct.Struct('<4sHHIIIII')
+UINT = struct.Struct('<I')
+PROJECT = struct.Struct('<IIII')
+VIEW = struct.Struct('<II')
+
+
+def write_snapshot(snapshot_file, ecosystem, projects):
+    """ Write atomically the projects of an ecosystem in the projects.json
+    shape ({project: {data source: [repository lines], "meta": {...}}}) """
+
+    strings = {}
+
+    def string_id(string):
+        if string not in strings:
+            strings[string] = len(strings)
+        return strings[string]
+
+    ecosystem_sid = string_id(ecosystem)
+    data_sources = []
+    data_source_index = {}
+    project_records = []
+    view_records = []
+
+    for name in sorted(projects, key=lambda project: project.encode('utf-8')):
+        meta_title = projects[name].get('meta', {}).get('title')
+        first_view = len(view_records)
+        for data_source, lines in projects[name].items():
+            if data_source == 'meta':
+                continue
+            if data_source not in data_source_index:
+                data_source_index[data_source] = len(data_sources)
+                data_sources.append(string_id(data_source))
+            for line in lines:
+                view_records.append((data_source_index[data_source], string_id(line)))
+        project_records.append((string_id(name), string_id(meta_title) if meta_title else NONE,
+                                first_view, len(view_records)))
+
+    string_data = [string.encode('utf-8') for string in sorted(strings, key=strings.get)]
+    string_index = [0]
+    for data in string_data:
+        string_index.append(string_index[-1] + len(data))
+
+    dir_name = os.path.dirname(os.path.abspath(snapshot_file))
+    with tempfile.NamedTemporaryFile('wb', dir=dir_name, delete=False) as fsnapshot:
+        try:
+            fsnapshot.write(HEADER.pack(MAGIC, VERSION, 0, ecosystem_sid, len(string_data), len(data_sources),
+                                        len(project_records), len(view_records)))
+            fsnapshot.write(struct.pack('<%iI' % len(string_index), *string_index))
+            fsnapshot.write(struct.pack('<%iI' % len(data_sources), *data_sources))
+            for record in project_records:
+                fsnapshot.write(PROJECT.pack(*record))
+            for record in view_records:
+                fsnapshot.write(VIEW.pack(*record))
+            fsnapshot.write(b''.join(string_data))
+        except Exception:
+            os.remove(fsnapshot.name)
+            raise
+    # Temporary files are only readable by the owner
+    os.chmod(fsnapshot.name, 0o644)
+    os.replace(fsnapshot.name, snapshot_file)
+
+    return len(project_records), len(view_records)
+
+
+class UIntArray():
+    """ Little endian uint32 array in a buffer, for big endian hosts """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    def __getitem__(self, index):
+        return UINT.unpack_from(self.buffer, UINT.size * index)[0]
+
+    def release(self):
+        self.buffer.release()
+
+
+class SnapshotReader():
+    """ Read only access to a snapshot file, as a mapping of the project
+    names to the projects in the projects.json shape """
+
+    def __init__(self, snapshot_file):
+        with open(snapshot_file, 'rb') as fsnapshot:
+            # Empty files can not be mapped
+            if os.fstat(fsnapshot.fileno()).st_size < HEADER.size:
+                raise ValueError("%s is not a snapshot file" % snapshot_file)
+            self._mm = mmap.mmap(fsnapshot.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffers = []
+
+        magic, version, _, ecosystem_sid, nstrings, nsources, self._nprojects, nviews = \
+            HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("%s is not a version %i snapshot file" % (snapshot_file, VERSION))
+
+        # The sections are used in place, nothing is read until it is needed
+        offset = HEADER.size
+        self._string_index = self._uints(offset, nstrings + 1)
+        offset += UINT.size * (nstrings + 1)
+        self._data_sources = self._uints(offset, nsources)
+        offset += UINT.size * nsources
+        self._projects = self._uints(offset, 4 * self._nprojects)
+        offset += PROJECT.size * self._nprojects
+        self._views = self._uints(offset, 2 * nviews)
+        offset += VIEW.size * nviews
+        self._string_data = offset
+
+        self.ecosystem = self._string(ecosystem_sid)
+
+    def _uints(self, offset, count):
+        buffer = memoryview(self._mm)[offset:offset + UINT.size * count]
+        uints = buffer.cast('I') if sys.byteorder == 'little' else UIntArray(buffer)
+        self._buffers.extend([uints, buffer])
+        return uints
+
+    def close(self):
+        for buffer in self._buffers:
+            buffer.release()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _string_bytes(self, sid):
+        return self._mm[self._string_data + self._string_index[sid]:self._string_data + self._string_index[sid + 1]]
+
+    def _string(self, sid):
+        return self._string_bytes(sid).decode('utf-8')
+
+    def _find(self, name):
+        """ Position of the project with name, or None """
+
+        target = name.encode('utf-8')
+        low, high = 0, self._nprojects
+        while low < high:
+            middle = (low + high) // 2
+            middle_name = self._string_bytes(self._projects[4 * middle])
+            if middle_name < target:
+                low = middle + 1
+            elif middle_name > target:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def _project(self, nproject):
+        meta_sid, first_view, end_view = [self._projects[4 * nproject + field] for field in range(1, 4)]
+
+        project = {}
+        if meta_sid != NONE:
+            project['meta'] = {'title': self._string(meta_sid)}
+        data_sources = {}
+        for nview in range(first_view, end_view):
+            data_source = self._views[2 * nview]
+            if data_source not in data_sources:
+                data_sources[data_source] = project[self._string(self._data_sources[data_source])] = []
+            data_sources[data_source].append(self._string(self._views[2 * nview + 1]))
+
+        return project
+
+    def __len__(self):
+        return self._nprojects
+
+    def __iter__(self):
+        for nproject in range(self._nprojects):
+            yield self._string(self._projects[4 * nproject])
+
+    def __contains__(self, name):
+        return self._find(name) is not None
+
+    def __getitem__(self, name):
+        nproject = self._find(name)
+        if nproject is None:
+            raise KeyError(name)
+        return self._project(nproject)
+
+    def items(self):
+        """ Projects names and contents, read one by one """
+
+        for nproject in range(self._nprojects):
+            yield self._string(self._projects[4 * nproject]), self._project(nproject)
+
+    def to_projects(self):
+        """ All the projects in the projects.json shape """
+
+        return dict(self.items())
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("usage: snapshot_file.py SNAPSHOT_FILE [PROJECT]")
+
+    with SnapshotReader(sys.argv[1]) as reader:
+        if len(sys.argv) == 3:
+            projects = {sys.argv[2]: reader[sys.argv[2]]}
+        else:
+            projects = reader.to_projects()
+    print(json.dumps(projects, indent=True, sort_keys=True))
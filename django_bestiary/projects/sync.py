@@ -0,0 +1,175 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+""" Anti-entropy sync of the ecosystems from other Bestiary instance
+
+The Merkle tree of the remote ecosystem (see projects.merkle) is compared
+with the local one level by level, asking only for the nodes whose hashes
+differ, and then only the projects which differ are transferred and
+applied. The ecosystems are synced as exported: their projects and the
+repository views of each one.
+"""
+
+import json
+import logging
+
+from urllib.error import URLError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+from django.db import transaction
+
+from projects import merkle
+from projects.bestiary_import import add, find_params, find_repo_name, list_not_ds_fields
+from projects.catalog import catalog
+from projects.ingest import batches
+from projects.models import Ecosystem, Project, Repository, RepositoryView
+
+
+logger = logging.getLogger(__name__)
+
+# Prefixes or names in each request, for short URLs
+ITEMS_PER_REQUEST = 100
+
+
+class SyncError(Exception):
+    pass
+
+
+class HttpRemote():
+    """ Bestiary instance with its projects app in url """
+
+    def __init__(self, url, timeout=60):
+        self.url = url.rstrip('/') + '/'
+        self.timeout = timeout
+        self.requests = 0
+
+    def get(self, path, params):
+        url = self.url + path + '?' + urlencode(params, doseq=True)
+        self.requests += 1
+        try:
+            with urlopen(url, timeout=self.timeout) as response:
+                return json.loads(response.read().decode('utf-8'))
+        except (URLError, ValueError) as ex:
+            raise SyncError("Can not get %s: %s" % (url, ex))
+
+    def nodes(self, ecosystem, prefixes):
+        return self.get('merkle/', {'ecosystem': ecosystem, 'prefix': prefixes})['nodes']
+
+    def projects(self, ecosystem, names):
+        return self.get('merkle/projects/', {'ecosystem': ecosystem, 'name': names})['projects']
+
+
+def diff_projects(remote, ecosystem, tree):
+    """ Projects of the remote ecosystem which differ from the ones in tree.
+
+    :returns: the names of the projects changed or missing in tree, and
+        the names of the projects in tree which are not in the remote
+    """
+
+    changed = set()
+    removed = set()
+
+    prefixes = ['']
+    while prefixes:
+        remote_nodes = {}
+        for batch in batches(prefixes, ITEMS_PER_REQUEST):
+            remote_nodes.update(remote.nodes(ecosystem, batch))
+        prefixes = []
+
+        for prefix, remote_node in sorted(remote_nodes.items()):
+            if remote_node['hash'] == tree.node(prefix)['hash']:
+                continue
+
+            local = tree.project_hashes(prefix)
+            if 'projects' in remote_node:
+                changed.update(name for name, project_hash in remote_node['projects'].items()
+                               if local.get(name) != project_hash)
+                removed.update(set(local) - set(remote_node['projects']))
+                continue
+
+            for child, child_hash in remote_node['children'].items():
+                if child_hash != tree.node(child)['hash']:
+                    prefixes.append(child)
+            removed.update(name for name in local
+                           if tree.keys[name][:len(prefix) + 1] not in remote_node['children'])
+
+    return changed, removed
+
+
+def apply_project(ecosystem, name, data):
+    """ Make the project with name in ecosystem the same as data, as exported """
+
+    with transaction.atomic():
+        project = add(Project, name=name)
+        meta = data.get('meta', '')
+        meta_title = meta if isinstance(meta, str) else meta.get('title', '')
+        if project.meta_title != meta_title:
+            project.meta_title = meta_title
+            project.save()
+        ecosystem.projects.add(project)
+
+        view_ids = set()
+        for data_source, lines in data.items():
+            if data_source in list_not_ds_fields():
+                continue
+            data_source_orm, _ = catalog.get_or_create(data_source)
+            for line in lines:
+                repo_name = find_repo_name(line, data_source)
+                if repo_name is None:
+                    logger.error("Can not find repository for %s %s", data_source, line)
+                    continue
+                repository = add(Repository, name=repo_name, data_source=data_source_orm)
+                view = add(RepositoryView, params=find_params(line, data_source), repository=repository)
+                view_ids.add(view.id)
+
+        current_ids = set(project.repository_views.values_list('id', flat=True))
+        if current_ids - view_ids:
+            project.repository_views.remove(*(current_ids - view_ids))
+        if view_ids - current_ids:
+            project.repository_views.add(*(view_ids - current_ids))
+
+
+def sync_ecosystem(remote, ecosystem, dry_run=False):
+    """ Sync the ecosystem with name from the remote instance.
+
+    :returns: the names of the projects updated and removed
+    """
+
+    ecosystem_orm = Ecosystem.objects.filter(name=ecosystem).first()
+    tree = merkle.ecosystem_tree(ecosystem_orm) if ecosystem_orm else merkle.MerkleTree({})
+    changed, removed = diff_projects(remote, ecosystem, tree)
+
+    if dry_run:
+        return changed, removed
+
+    ecosystem = ecosystem_orm or add(Ecosystem, name=ecosystem)
+
+    for batch in batches(sorted(changed), ITEMS_PER_REQUEST):
+        for name, data in remote.projects(ecosystem.name, batch).items():
+            apply_project(ecosystem, name, data)
+    if removed:
+        ecosystem.projects.remove(*Project.objects.filter(name__in=removed))
+
+    return changed, removed
@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+import io
+import unittest.mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from .models import Ecosystem, Repository
+
+
+class AuditQueriesTests(TestCase):
+
+    def test_audit(self):
+        output = io.StringIO()
+        call_command('audit_queries', plans=True, stdout=output)
+
+        self.assertIn('SEARCH', output.getvalue())
+        self.assertRegex(output.getvalue(), r'\d+ distinct queries audited, 0 with full scans')
+
+        # The data imported to audit the queries is rolled back
+        self.assertEqual(Ecosystem.objects.count(), 0)
+        self.assertEqual(Repository.objects.count(), 0)
+
+    @unittest.mock.patch('projects.management.commands.audit_queries.Command.explain')
+    def test_audit_fail(self, mock_explain):
+        mock_explain.return_value = ['SCAN TABLE projects_repository',
+                                     'SCAN projects_project USING COVERING INDEX projects_project_name']
+
+        # Only the scans of tables with min_rows are reported
+        output = io.StringIO()
+        call_command('audit_queries', min_rows=1000, fail=True, stdout=output)
+        self.assertNotIn('FULL SCAN', output.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command('audit_queries', min_rows=0, fail=True, stdout=output)
+        self.assertIn('FULL SCAN', output.getvalue())
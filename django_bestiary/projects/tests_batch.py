@@ -0,0 +1,91 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, TransactionTestCase
+
+from .models import Ecosystem
+
+
+PROJECTS_FILE = 'projects/projects-release.json'
+
+
+def read_json(json_file):
+    with open(json_file) as fjson:
+        return json.load(fjson)
+
+
+class BatchCommandsTests(TestCase):
+
+    def test_import_export(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            manifest = os.path.join(tmp_dir, 'manifest.json')
+            with open(manifest, 'w') as fmanifest:
+                json.dump([{'file': PROJECTS_FILE, 'ecosystem': 'eco2'}], fmanifest)
+
+            stdout = io.StringIO()
+            call_command('import_projects', item=[[PROJECTS_FILE, 'eco1']], manifest=manifest, stdout=stdout)
+            self.assertListEqual(sorted(Ecosystem.objects.values_list('name', flat=True)), ['eco1', 'eco2'])
+
+            output = stdout.getvalue().splitlines()
+            self.assertEqual(len(output), 3)
+            self.assertTrue(output[0].startswith(PROJECTS_FILE + ' eco1: '))
+            self.assertTrue(output[2].startswith('Total: 2 items (0 failed)'))
+
+            exported = [os.path.join(tmp_dir, 'eco%i.json' % neco) for neco in [1, 2]]
+            call_command('export_projects', item=[[exported[0], 'eco1'], [exported[1], 'eco2']],
+                         stdout=io.StringIO())
+            for exported_file in exported:
+                self.assertDictEqual(read_json(exported_file), read_json(PROJECTS_FILE))
+
+    def test_failed_items(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            stdout = io.StringIO()
+            with self.assertRaisesRegex(CommandError, 'missing'):
+                call_command('export_projects', item=[[os.path.join(tmp_dir, 'eco.json'), 'missing']],
+                             stdout=stdout, stderr=io.StringIO())
+            self.assertTrue(stdout.getvalue().startswith('Total: 1 items (1 failed)'))
+
+        with self.assertRaises(CommandError):
+            call_command('import_projects')
+
+
+class ParallelBatchCommandsTests(TransactionTestCase):
+
+    def test_parallel_export(self):
+        call_command('import_projects', item=[[PROJECTS_FILE, 'eco1'], [PROJECTS_FILE, 'eco2']],
+                     stdout=io.StringIO())
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            items = [[os.path.join(tmp_dir, 'eco%i.json' % neco), 'eco%i' % neco] for neco in [1, 2]]
+            call_command('export_projects', item=items, jobs=2, stdout=io.StringIO())
+            for exported_file, _ in items:
+                self.assertDictEqual(read_json(exported_file), read_json(PROJECTS_FILE))
@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+from unittest import mock
+
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from .catalog import catalog
+from .models import DataSource
+
+
+class CatalogTests(TransactionTestCase):
+    """ The catalog is not used inside transactions, so TransactionTestCase """
+
+    def setUp(self):
+        catalog.invalidate()
+        self.git = DataSource.objects.create(name='git')
+        DataSource.objects.create(name='github')
+
+    def tearDown(self):
+        catalog.invalidate()
+
+    def test_get(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(catalog.get('git'), self.git)
+            self.assertEqual(catalog.get_by_id(self.git.id), self.git)
+            self.assertListEqual(catalog.names(), ['git', 'github'])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(catalog.get('git'), self.git)
+
+        with self.assertRaises(DataSource.DoesNotExist):
+            catalog.get('gerrit')
+
+    def test_get_or_create(self):
+        data_source, created = catalog.get_or_create('gerrit')
+        self.assertTrue(created)
+
+        # The cache is reloaded once after the creation
+        catalog.names()
+        with self.assertNumQueries(0):
+            self.assertEqual(catalog.get_or_create('gerrit'), (data_source, False))
+
+    def test_invalidate(self):
+        catalog.get('git')
+
+        # Saved and deleted data sources are reloaded
+        self.git.name = 'git-renamed'
+        self.git.save()
+        self.assertEqual(catalog.get('git-renamed'), self.git)
+        with self.assertRaises(DataSource.DoesNotExist):
+            catalog.get('git')
+
+        DataSource.objects.get(name='github').delete()
+        self.assertListEqual(catalog.names(), ['git-renamed'])
+
+    def test_ttl(self):
+        catalog.get('git')
+
+        # Added by other process, without signals
+        DataSource.objects.bulk_create([DataSource(name='gerrit')])
+        self.assertNotIn('gerrit', catalog.names())
+
+        with mock.patch('projects.catalog.time.time', return_value=catalog._loaded_at + catalog.get_ttl()):
+            self.assertIn('gerrit', catalog.names())
+
+    def test_transaction(self):
+        with transaction.atomic():
+            catalog.get('git')
+            catalog.get_or_create('gerrit')
+        self.assertIsNone(catalog._loaded_at)
+
+        with self.assertNumQueries(1):
+            catalog.get('gerrit')
@@ -0,0 +1,206 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+import datetime
+import io
+import json
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from . import changes
+from .bestiary_export import fetch_projects
+from .bestiary_import import load_projects
+from .models import Change, DataSource, Ecosystem, Project, Repository, RepositoryView
+from .testing import ProjectsFileMixin
+
+
+PROJECTS_FILE = 'projects/projects-release.json'
+
+
+class ChangesTests(ProjectsFileMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        # eco1 -> eco2, eco2 with proj1 -> proj2
+        self.eco1 = Ecosystem.objects.create(name='eco1')
+        self.eco2 = Ecosystem.objects.create(name='eco2')
+        self.eco1.subecos.add(self.eco2)
+
+        self.proj1 = Project.objects.create(name='proj1', meta_title='Project 1')
+        self.proj2 = Project.objects.create(name='proj2')
+        self.proj1.subprojects.add(self.proj2)
+        self.eco2.projects.add(self.proj1)
+
+        self.git = DataSource.objects.create(name='git')
+        self.views = []
+        for nrepo in range(3):
+            repo = Repository.objects.create(name='https://github.com/grimoirelab/repo%i' % nrepo,
+                                             data_source=self.git)
+            self.views.append(RepositoryView.objects.create(repository=repo, params=''))
+        self.proj1.repository_views.add(self.views[0])
+
+    def assertSynced(self, ecosystem, projects, since):
+        """ The projects synced with the changes are the exported ones """
+
+        feed = changes.fetch_changes(ecosystem, since)
+        since = changes.apply_changes(projects, feed)
+        self.assertDictEqual(projects, fetch_projects(ecosystem, recursive=True))
+        return since
+
+    def entries(self, ecosystem, since):
+        return list(Change.objects.filter(ecosystem=ecosystem, seq__gt=since)
+                    .order_by('seq').values_list('project', 'kind', 'action', 'name'))
+
+    def test_sync(self):
+        since = changes.last_seq(self.eco1)
+        projects = fetch_projects(self.eco1, recursive=True)
+
+        self.proj2.repository_views.add(self.views[1])
+        self.assertListEqual(self.entries(self.eco1, since), [
+            ('proj2', 'repository_view', 'add', 'https://github.com/grimoirelab/repo1')])
+        since = self.assertSynced(self.eco1, projects, since)
+
+        self.views[1].params = 'branch'
+        self.views[1].save()
+        self.views[1].repository.name = 'https://github.com/grimoirelab/renamed'
+        self.views[1].repository.save()
+        self.assertListEqual(self.entries(self.eco1, since), [
+            ('proj2', 'repository_view', 'update', 'https://github.com/grimoirelab/repo1 branch'),
+            ('proj2', 'repository', 'update', 'https://github.com/grimoirelab/renamed branch')])
+        since = self.assertSynced(self.eco1, projects, since)
+
+        self.proj1.name = 'proj1-renamed'
+        self.proj1.save()
+        self.proj2.save()
+        self.assertListEqual(self.entries(self.eco1, since), [
+            ('proj1', 'project', 'update', 'proj1-renamed'),
+            ('proj1-renamed', 'project', 'update', 'proj1-renamed')])
+        since = self.assertSynced(self.eco1, projects, since)
+
+        proj3 = Project.objects.create(name='proj3')
+        proj3.repository_views.add(self.views[2])
+        self.eco1.projects.add(proj3)
+        self.proj1.subprojects.remove(self.proj2)
+        since = self.assertSynced(self.eco1, projects, since)
+        self.assertSetEqual(set(projects), set(['proj1-renamed', 'proj3']))
+
+        self.views[0].repository.delete()
+        proj3.delete()
+        self.eco1.subecos.clear()
+        self.assertSynced(self.eco1, projects, since)
+        self.assertDictEqual(projects, {})
+
+    def test_pages(self):
+        since = changes.last_seq(self.eco2)
+        projects = fetch_projects(self.eco2, recursive=True)
+        # One entry for each add
+        for view in self.views:
+            self.proj2.repository_views.add(view)
+        self.proj1.repository_views.add(self.views[1])
+
+        feed = changes.fetch_changes(self.eco2, since, limit=2)
+        self.assertTrue(feed['more'])
+        self.assertEqual(len(feed['changes']), 2)
+        since = changes.apply_changes(projects, feed)
+        self.assertEqual(since, feed['changes'][-1]['seq'])
+
+        feed = changes.fetch_changes(self.eco2, since, limit=2)
+        self.assertFalse(feed['more'])
+        self.assertEqual(changes.apply_changes(projects, feed), changes.last_seq(self.eco2))
+        self.assertDictEqual(projects, fetch_projects(self.eco2, recursive=True))
+
+        # Nothing new
+        feed = changes.fetch_changes(self.eco2, feed['last_seq'])
+        self.assertListEqual(feed['changes'], [])
+        self.assertEqual(feed['last_seq'], changes.last_seq(self.eco2))
+
+    def test_reimport(self):
+        load_projects(PROJECTS_FILE, 'release')
+        since = changes.last_seq('release')
+        self.assertGreater(since, 0)
+
+        load_projects(PROJECTS_FILE, 'release')
+        self.assertEqual(changes.last_seq('release'), since)
+
+    def test_import_views(self):
+        """ One entry with the lines of all the views of a project imported """
+
+        since = {eco: changes.last_seq(eco) for eco in [self.eco1, self.eco2]}
+        # Existing views and new ones
+        lines = ['https://github.com/grimoirelab/repo%i' % nrepo for nrepo in range(5)]
+
+        projects_file = self.write({'proj3': {'git': lines}})
+        load_projects(projects_file, 'eco2')
+        for eco in [self.eco1, self.eco2]:
+            self.assertListEqual(self.entries(eco, since[eco]), [
+                ('proj3', 'membership', 'add', 'proj3'),
+                ('proj3', 'repository_view', 'add', "\n".join(lines))])
+
+    def test_compact(self):
+        since = changes.last_seq(self.eco1)
+        projects = fetch_projects(self.eco1, recursive=True)
+        self.proj1.repository_views.add(self.views[1], self.views[2])
+        self.proj1.repository_views.remove(self.views[1])
+
+        # Only the last change of each project is needed
+        call_command('compact_changes', stdout=io.StringIO())
+        self.assertEqual(Change.objects.filter(ecosystem=self.eco1, project='proj1').count(), 1)
+        self.assertSynced(self.eco1, projects, since)
+
+        Change.objects.filter(ecosystem=self.eco2).update(created_at=timezone.now() - datetime.timedelta(days=2))
+        nsuperseded, nexpired = changes.compact(max_age_days=1)
+        self.assertGreater(nexpired, 0)
+        self.assertFalse(Change.objects.filter(ecosystem=self.eco2).exists())
+        self.assertGreater(changes.compacted_seq(self.eco2), since)
+        with self.assertRaises(changes.ChangesCompacted):
+            changes.fetch_changes(self.eco2, since)
+        # Starting again from an export
+        self.assertListEqual(changes.fetch_changes(self.eco2, changes.last_seq(self.eco2))['changes'], [])
+
+    def test_views(self):
+        response = self.client.get('/projects/export/ecosystem=eco1', {'recursive': 1})
+        since = int(response['X-Bestiary-Seq'])
+        projects = json.loads(b''.join(response.streaming_content).decode('utf-8'))
+
+        self.proj2.repository_views.add(self.views[2])
+        response = self.client.get('/projects/changes/', {'ecosystem': 'eco1', 'since': since})
+        self.assertEqual(response.status_code, 200)
+        changes.apply_changes(projects, response.json())
+        self.assertDictEqual(projects, fetch_projects(self.eco1, recursive=True))
+
+        # The feed does not apply to flat exports
+        self.assertNotIn('X-Bestiary-Seq', self.client.get('/projects/export/ecosystem=eco1'))
+
+        self.assertEqual(self.client.get('/projects/changes/', {'ecosystem': 'eco1', 'since': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/projects/changes/', {'since': 1}).status_code, 400)
+        self.assertEqual(self.client.get('/projects/changes/', {'ecosystem': 'missing'}).status_code, 404)
+
+        changes.compact(max_age_days=-1)
+        response = self.client.get('/projects/changes/', {'ecosystem': 'eco1', 'since': since})
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(response.json()['compacted_seq'], changes.last_seq(self.eco1))
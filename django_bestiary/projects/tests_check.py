@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+import io
+import json
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from .bestiary_import import check_projects, load_projects
+from .models import Ecosystem, Project
+from .testing import ProjectsFileMixin
+
+
+PROJECTS_FILE = 'projects/projects-release.json'
+
+
+class CheckTests(ProjectsFileMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        with open(PROJECTS_FILE) as fprojects:
+            self.projects = json.load(fprojects)
+        load_projects(PROJECTS_FILE, 'release')
+
+    def test_check(self):
+        result = check_projects(PROJECTS_FILE, 'release')
+        self.assertTrue(result.ok)
+        self.assertEqual(result.nprojects, len(self.projects))
+
+        # The order of the repository lines does not matter
+        for data in self.projects['grimoire'].values():
+            if isinstance(data, list):
+                data.reverse()
+        self.assertTrue(check_projects(self.write(self.projects), 'release').ok)
+
+    def test_differences(self):
+        project = Project.objects.get(name='grimoire')
+        project.repository_views.remove(*project.repository_views.filter(repository__data_source__name='git'))
+        Ecosystem.objects.get(name='release').projects.add(Project.objects.create(name='other'))
+        self.projects['missing'] = {'git': ['https://github.com/grimoirelab/missing']}
+
+        result = check_projects(self.write(self.projects), 'release')
+        self.assertFalse(result.ok)
+        self.assertListEqual(result.missing, ['missing'])
+        self.assertListEqual(result.extra, ['other'])
+        self.assertListEqual(result.changed, ['grimoire'])
+
+        git_lines = set(self.projects['grimoire']['git'])
+        # Up to 5 lines of each data source are shown
+        self.assertEqual(len(result.diffs), min(len(git_lines), 5) + (len(git_lines) > 5))
+        self.assertTrue(result.diffs[0].startswith('- grimoire git '))
+        self.assertIn("1 missing, 1 not in the file, 1 different", result.report()[0])
+
+        self.assertListEqual(check_projects(self.write(self.projects), 'release', max_diffs=0).diffs, [])
+
+    def test_command(self):
+        call_command('import_projects', '--check', '--item', PROJECTS_FILE, 'release', stdout=io.StringIO())
+
+        # The importer does not remove the meta titles
+        Project.objects.filter(name='grimoire').update(meta_title='Other')
+        with self.assertRaises(CommandError):
+            call_command('import_projects', '--check', '--item', PROJECTS_FILE, 'release',
+                         stdout=io.StringIO(), stderr=io.StringIO())
@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+from unittest import mock
+
+from django.test import TestCase
+
+from . import bestiary_import
+from .bestiary_import import check_projects, load_projects
+from .models import Ecosystem, ImportCheckpoint, Project, RepositoryView
+from .testing import ProjectsFileMixin
+
+
+class Interrupted(Exception):
+    pass
+
+
+class CheckpointTests(ProjectsFileMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.projects = {}
+        for nproject in range(10):
+            self.projects['proj%i' % nproject] = {
+                'git': ['https://github.com/grimoirelab/repo%i' % nproject],
+                'github': ['https://github.com/grimoirelab/repo%i' % nproject]
+            }
+        self.projects_file = self.write(self.projects)
+
+    def load_interrupted(self, nfail, batch_size=3):
+        """ Import the file failing in the project number nfail """
+
+        loaded = []
+        load_project = bestiary_import.load_project
+
+        def fail(eco_orm, project, project_data):
+            if len(loaded) == nfail:
+                raise Interrupted()
+            loaded.append(project)
+            return load_project(eco_orm, project, project_data)
+
+        with mock.patch('projects.bestiary_import.load_project', side_effect=fail):
+            with self.assertRaises(Interrupted):
+                load_projects(self.projects_file, 'eco', batch_size=batch_size)
+
+        return loaded
+
+    def test_resume(self):
+        # Failing in the 3rd batch keeps the first two
+        self.load_interrupted(7)
+        self.assertEqual(Project.objects.count(), 6)
+        checkpoint = ImportCheckpoint.objects.get()
+        self.assertEqual(checkpoint.ecosystem.name, 'eco')
+        self.assertEqual(checkpoint.nprojects, 6)
+        self.assertEqual(checkpoint.nrepository_views, 12)
+
+        # The projects of the committed batches are not imported again
+        with mock.patch('projects.bestiary_import.load_project', wraps=bestiary_import.load_project) as load:
+            self.assertTupleEqual(load_projects(self.projects_file, 'eco', batch_size=3), (10, 20))
+        self.assertListEqual([call[0][1] for call in load.call_args_list], ['proj%i' % n for n in range(6, 10)])
+
+        self.assertFalse(ImportCheckpoint.objects.exists())
+        self.assertEqual(RepositoryView.objects.count(), 20)
+        self.assertTrue(check_projects(self.projects_file, 'eco').ok)
+
+    def test_changed_file(self):
+        self.load_interrupted(4)
+        self.assertEqual(ImportCheckpoint.objects.get().nprojects, 3)
+
+        # A different file is imported from the beginning
+        self.projects['proj0']['git'].append('https://github.com/grimoirelab/other')
+        with mock.patch('projects.bestiary_import.load_project', wraps=bestiary_import.load_project) as load:
+            self.assertTupleEqual(load_projects(self.write(self.projects), 'eco', batch_size=3), (10, 21))
+        self.assertEqual(load.call_count, 10)
+        # The checkpoint of the first file is kept, it can still be resumed
+        self.assertEqual(ImportCheckpoint.objects.get().nprojects, 3)
+        self.assertTrue(check_projects(self.projects_file, 'eco').ok)
+
+    def test_one_transaction(self):
+        # Nothing is kept, not even the ecosystem
+        self.load_interrupted(7, batch_size=0)
+        self.assertFalse(Ecosystem.objects.exists())
+        self.assertFalse(Project.objects.exists())
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+        self.assertTupleEqual(load_projects(self.projects_file, 'eco', batch_size=0), (10, 20))
+        self.assertTrue(check_projects(self.projects_file, 'eco').ok)
@@ -33,6 +33,7 @@ from .models import Ecosystem, Project, Repository, RepositoryView, DataSource
 
 from .bestiary_import import load_projects, list_not_ds_fields, find_repo_name
 from .bestiary_export import export_projects
+from .testing import ProjectsFileMixin
 
 
 class BeastFeederTests(TestCase):
@@ -105,3 +106,22 @@ class BeastFeederTests(TestCase):
             self.maxDiff = 1000000
             print("Comparing projects contents between imported and exported")
             self.assertDictEqual(orig_json, exported_json)
+
+
+class ImportQueriesTests(ProjectsFileMixin, TestCase):
+
+    def import_project(self, name, nviews):
+        lines = ['https://github.com/grimoirelab/%s-%i' % (name, nview) for nview in range(nviews)]
+        return self.write({name: {'git': lines}})
+
+    def test_project_views(self):
+        """ The queries of a project are the ones of its new objects, and a fixed number """
+
+        # The ecosystem and the data source exist
+        load_projects(self.import_project('first', 1), 'eco')
+
+        for nviews in [10, 20]:
+            projects_file = self.import_project('project%i' % nviews, nviews)
+            # get, savepoint, insert and release of each repository and view
+            with self.assertNumQueries(35 + 8 * nviews):
+                load_projects(projects_file, 'eco')
@@ -0,0 +1,128 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+import gzip
+import json
+import os
+import tempfile
+
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from . import formats
+from .bestiary_export import export_projects, fetch_projects
+from .bestiary_import import load_projects
+from .models import Project
+
+
+PROJECTS_FILE = 'projects/projects-release.json'
+
+
+def read_json(json_file):
+    with open(json_file) as fjson:
+        return json.load(fjson)
+
+
+class FormatsTests(SimpleTestCase):
+
+    def setUp(self):
+        self.projects = read_json(PROJECTS_FILE)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_formats(self):
+        for file_format in formats.all_formats():
+            projects_file = os.path.join(self.tmp_dir.name, 'projects' + formats.file_extension(file_format))
+            formats.write_projects(projects_file, self.projects, file_format)
+            self.assertEqual(formats.detect_format(projects_file), file_format)
+
+            self.assertDictEqual(dict(formats.read_projects(projects_file)), self.projects)
+            # Values split between reads
+            with mock.patch.object(formats, 'CHUNK_SIZE', 7):
+                self.assertDictEqual(dict(formats.read_projects(projects_file)), self.projects)
+
+    def test_encodings(self):
+        encoded = b''.join(formats.encode_projects(self.projects))
+        self.assertEqual(encoded.decode('utf-8'), json.dumps(self.projects, indent=True, sort_keys=True))
+
+        lines = b''.join(formats.encode_projects(self.projects, 'ndjson')).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), len(self.projects))
+        self.assertDictEqual(json.loads(lines[0]), {sorted(self.projects)[0]: self.projects[sorted(self.projects)[0]]})
+
+        compressed = b''.join(formats.encode_projects(self.projects, 'json.gz'))
+        self.assertEqual(gzip.decompress(compressed), encoded)
+
+    def test_msgpack(self):
+        values = [None, True, False, 0, 127, 128, -1, -33, 2 ** 40, 'a' * 31, 'ñ' * 200, 'b' * 70000,
+                  list(range(20)), {str(key): key for key in range(20)}, {'meta': {'title': 'Title'}}]
+        for value in values:
+            self.assertEqual(formats.msgpack_unpack(formats.msgpack_pack(value)), value)
+
+    def test_wrong_files(self):
+        projects_file = os.path.join(self.tmp_dir.name, 'projects.json')
+        with open(projects_file, 'w') as pfile:
+            pfile.write('{"perceval": {"git": []}, ')
+        with self.assertRaises(ValueError):
+            list(formats.read_projects(projects_file))
+
+        with self.assertRaises(ValueError):
+            list(formats.read_projects(projects_file, 'xml'))
+
+
+class FormatsExportImportTests(TestCase):
+
+    def test_import_export(self):
+        projects = read_json(PROJECTS_FILE)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for neco, file_format in enumerate(formats.all_formats()):
+                projects_file = os.path.join(tmp_dir, 'eco%i' % neco)
+                formats.write_projects(projects_file, projects, file_format)
+                load_projects(projects_file, 'eco%i' % neco, file_format)
+                self.assertDictEqual(fetch_projects('eco%i' % neco), projects)
+
+                exported_file = os.path.join(tmp_dir, 'exported' + formats.file_extension(file_format))
+                export_projects(exported_file, 'eco%i' % neco)
+                self.assertDictEqual(dict(formats.read_projects(exported_file)), projects)
+
+    def test_export_view(self):
+        load_projects(PROJECTS_FILE, 'eco')
+
+        response = self.client.get('/projects/export/ecosystem=eco', {'format': 'ndjson.gz'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('projects_eco.ndjson.gz', response['Content-Disposition'])
+        lines = gzip.decompress(b''.join(response.streaming_content)).splitlines()
+        self.assertEqual(len(lines), Project.objects.count())
+
+        response = self.client.get('/projects/export/ecosystem=eco')
+        self.assertDictEqual(json.loads(b''.join(response.streaming_content).decode('utf-8')),
+                             read_json(PROJECTS_FILE))
+
+        response = self.client.get('/projects/export/ecosystem=eco', {'format': 'xml'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,110 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+from django.forms import modelform_factory
+from django.test import TestCase
+
+from .models import Ecosystem, Project
+
+from .admin import EcosystemForm
+from .bestiary_export import fetch_projects
+from .hierarchy import (creates_cycle, descendant_ids, effective_project_ids,
+                        effective_projects, find_cycles)
+
+
+class HierarchyTests(TestCase):
+
+    def setUp(self):
+        # eco1 -> eco2 -> eco3 -> eco2 (cycle)
+        self.ecos = [Ecosystem.objects.create(name='eco%i' % neco) for neco in range(1, 4)]
+        self.ecos[0].subecos.add(self.ecos[1])
+        self.ecos[1].subecos.add(self.ecos[2])
+        self.ecos[2].subecos.add(self.ecos[1])
+
+        # proj2 -> proj3 -> proj4 -> proj3 (cycle)
+        self.projects = [Project.objects.create(name='proj%i' % nproj) for nproj in range(1, 6)]
+        self.projects[1].subprojects.add(self.projects[2])
+        self.projects[2].subprojects.add(self.projects[3])
+        self.projects[3].subprojects.add(self.projects[2])
+
+        self.ecos[0].projects.add(self.projects[0])
+        self.ecos[2].projects.add(self.projects[1])
+
+    def test_descendants(self):
+        self.assertSetEqual(descendant_ids(Ecosystem, [self.ecos[0].id]),
+                            set(eco.id for eco in self.ecos))
+        self.assertSetEqual(descendant_ids(Ecosystem, [self.ecos[1].id], include_self=False),
+                            set([self.ecos[1].id, self.ecos[2].id]))
+        self.assertSetEqual(descendant_ids(Project, [self.projects[0].id]), set([self.projects[0].id]))
+        self.assertSetEqual(descendant_ids(Project, []), set())
+
+    def test_effective_projects(self):
+        with self.assertNumQueries(1):
+            project_ids = effective_project_ids(self.ecos[0])
+        self.assertSetEqual(project_ids, set(project.id for project in self.projects[:4]))
+
+        names = sorted([project.name for project in effective_projects('eco2')])
+        self.assertListEqual(names, ['proj2', 'proj3', 'proj4'])
+
+    def test_effective_projects_many(self):
+        # More projects than the query params allowed by SQLite (999)
+        Project.objects.bulk_create([Project(name='many%i' % nproj) for nproj in range(1200)])
+        eco = Ecosystem.objects.create(name='many')
+        eco.projects.add(*Project.objects.filter(name__startswith='many'))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(effective_projects(eco).count(), 1200)
+
+    def test_cycles(self):
+        self.assertSetEqual(find_cycles(Ecosystem), set([self.ecos[1].id, self.ecos[2].id]))
+        self.assertSetEqual(find_cycles(Project), set([self.projects[2].id, self.projects[3].id]))
+
+        self.assertTrue(creates_cycle(self.ecos[1], self.ecos[0]))
+        self.assertTrue(creates_cycle(self.projects[0], self.projects[0]))
+        self.assertFalse(creates_cycle(self.projects[0], self.projects[1]))
+
+    def test_editor_cycles(self):
+        # eco1 includes eco3
+        response = self.client.post('/projects/add_subecosystem',
+                                    {'eco_id_state': self.ecos[2].id, 'ecosystem_name': 'eco1'})
+        self.assertContains(response, 'it can not be its sub-ecosystem')
+        self.assertFalse(self.ecos[2].subecos.filter(id=self.ecos[0].id).exists())
+
+        response = self.client.post('/projects/add_subproject',
+                                    {'project_id_state': self.projects[0].id, 'project_name': 'proj1'})
+        self.assertContains(response, 'it can not be its sub-project')
+        self.assertFalse(self.projects[0].subprojects.exists())
+
+        form_class = modelform_factory(Ecosystem, form=EcosystemForm, fields=['name', 'subecos'])
+        form = form_class({'name': 'eco3', 'subecos': [self.ecos[0].id]}, instance=self.ecos[2])
+        self.assertFalse(form.is_valid())
+        self.assertIn('subecos', form.errors)
+        form = form_class({'name': 'eco1', 'subecos': [self.ecos[1].id]}, instance=self.ecos[0])
+        self.assertTrue(form.is_valid())
+
+    def test_export_recursive(self):
+        self.assertListEqual(list(fetch_projects('eco1').keys()), ['proj1'])
+        self.assertListEqual(sorted(fetch_projects('eco1', recursive=True).keys()),
+                             ['proj1', 'proj2', 'proj3', 'proj4'])
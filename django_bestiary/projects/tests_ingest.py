@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+from django.test import TestCase
+
+from .models import DataSource, Project, Repository, RepositoryView
+
+from .ingest import ingest_repositories, unlink_repositories
+
+
+REPOS = ['https://github.com/grimoirelab/perceval',
+         'https://github.com/grimoirelab/arthur',
+         'https://github.com/grimoirelab/sortinghat']
+
+
+class IngestTests(TestCase):
+
+    def setUp(self):
+        DataSource(name='github').save()
+
+    def test_ingest(self):
+        Project(name='grimoirelab').save()
+
+        # Generators are consumed in batches
+        report = ingest_repositories((repo for repo in REPOS), 'github',
+                                     project='grimoirelab', batch_size=2)
+
+        self.assertEqual(report.repositories_inserted, 3)
+        self.assertEqual(report.repositories_existing, 0)
+        self.assertEqual(report.views_inserted, 3)
+        self.assertEqual(report.views_existing, 0)
+        self.assertEqual(report.views_linked, 3)
+
+        self.assertEqual(DataSource.objects.filter(name='github').count(), 1)
+        self.assertEqual(Repository.objects.count(), 3)
+        self.assertEqual(RepositoryView.objects.filter(params='').count(), 3)
+        project = Project.objects.get(name='grimoirelab')
+        self.assertEqual(project.repository_views.count(), 3)
+
+    def test_ingest_existing(self):
+        Project(name='grimoirelab').save()
+        ingest_repositories(REPOS[:2], 'github')
+
+        repos = REPOS + [REPOS[0]]  # duplicated repositories are ignored
+        report = ingest_repositories(repos, 'github', project='grimoirelab')
+
+        self.assertEqual(report.repositories_inserted, 1)
+        self.assertEqual(report.repositories_existing, 2)
+        self.assertEqual(report.views_inserted, 1)
+        self.assertEqual(report.views_existing, 2)
+        self.assertEqual(report.views_linked, 3)
+        self.assertEqual(Repository.objects.count(), 3)
+
+        report = ingest_repositories(REPOS, 'github', project='grimoirelab')
+        self.assertEqual(report.repositories_inserted, 0)
+        self.assertEqual(report.views_linked, 0)
+
+    def test_ingest_no_project(self):
+        with self.assertRaises(Project.DoesNotExist):
+            ingest_repositories(REPOS, 'github', project='unknown')
+
+        # The whole ingestion is rolled back
+        self.assertEqual(Repository.objects.count(), 0)
+
+    def test_ingest_no_data_source(self):
+        Project(name='grimoirelab').save()
+
+        # Data sources are not created by the ingestion
+        with self.assertRaises(DataSource.DoesNotExist):
+            ingest_repositories(REPOS, 'gitlab', project='grimoirelab')
+
+        self.assertEqual(DataSource.objects.count(), 1)
+        self.assertEqual(Repository.objects.count(), 0)
+
+    def test_unlink(self):
+        Project(name='grimoirelab').save()
+        ingest_repositories(REPOS, 'github', project='grimoirelab')
+
+        nunlinked = unlink_repositories(REPOS[1:] + ['https://github.com/unknown'],
+                                        'github', 'grimoirelab')
+        self.assertEqual(nunlinked, 2)
+
+        project = Project.objects.get(name='grimoirelab')
+        self.assertEqual(project.repository_views.count(), 1)
+        # Repositories and views are not removed from Bestiary
+        self.assertEqual(RepositoryView.objects.count(), 3)
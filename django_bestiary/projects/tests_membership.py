@@ -0,0 +1,206 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+import io
+
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .models import DataSource, Ecosystem, Membership, Project, Repository, RepositoryView
+
+from .membership import ecosystem_repository_views, flush_rebuilds, rebuild_memberships, repository_ecosystems
+
+
+class MembershipTests(TestCase):
+
+    def setUp(self):
+        # eco1 -> eco2, eco2 with proj1 -> proj2
+        self.eco1 = Ecosystem.objects.create(name='eco1')
+        self.eco2 = Ecosystem.objects.create(name='eco2')
+        self.eco1.subecos.add(self.eco2)
+
+        self.proj1 = Project.objects.create(name='proj1')
+        self.proj2 = Project.objects.create(name='proj2')
+        self.proj1.subprojects.add(self.proj2)
+        self.eco2.projects.add(self.proj1)
+
+        data_source = DataSource.objects.create(name='git')
+        self.views = []
+        for nrepo in range(3):
+            repo = Repository.objects.create(name='https://github.com/grimoirelab/repo%i' % nrepo,
+                                             data_source=data_source)
+            self.views.append(RepositoryView.objects.create(repository=repo, params=''))
+
+    def memberships(self):
+        # The transaction of the test is not committed
+        flush_rebuilds()
+        return set(Membership.objects.values_list('ecosystem__name', 'project__name', 'repository_view_id'))
+
+    def assertRebuilt(self):
+        """ The maintained rows are the same than the rebuilt ones """
+
+        memberships = self.memberships()
+        rebuild_memberships()
+        self.assertSetEqual(self.memberships(), memberships)
+
+    def test_views(self):
+        self.proj2.repository_views.add(self.views[0], self.views[1])
+        # Reverse side of the relation
+        self.views[2].project_set.add(self.proj1)
+
+        self.assertSetEqual(self.memberships(), set([
+            ('eco1', 'proj2', self.views[0].id), ('eco2', 'proj2', self.views[0].id),
+            ('eco1', 'proj2', self.views[1].id), ('eco2', 'proj2', self.views[1].id),
+            ('eco1', 'proj1', self.views[2].id), ('eco2', 'proj1', self.views[2].id)]))
+        self.assertRebuilt()
+
+        self.proj2.repository_views.remove(self.views[0])
+        self.views[2].project_set.clear()
+        self.assertSetEqual(self.memberships(), set([
+            ('eco1', 'proj2', self.views[1].id), ('eco2', 'proj2', self.views[1].id)]))
+        self.assertRebuilt()
+
+        self.views[1].delete()
+        self.assertSetEqual(self.memberships(), set())
+
+    def test_hierarchy(self):
+        self.proj2.repository_views.add(self.views[0])
+
+        proj3 = Project.objects.create(name='proj3')
+        proj3.repository_views.add(self.views[1])
+        self.assertEqual(Membership.objects.count(), 2)
+
+        # A new project in the middle of the hierarchy
+        proj3.project_set.add(self.proj2)
+        self.assertSetEqual(self.memberships(), set([
+            ('eco1', 'proj2', self.views[0].id), ('eco2', 'proj2', self.views[0].id),
+            ('eco1', 'proj3', self.views[1].id), ('eco2', 'proj3', self.views[1].id)]))
+        self.assertRebuilt()
+
+        self.eco1.subecos.clear()
+        self.assertSetEqual(self.memberships(), set([
+            ('eco2', 'proj2', self.views[0].id), ('eco2', 'proj3', self.views[1].id)]))
+        self.assertRebuilt()
+
+        self.eco1.projects.add(proj3)
+        self.proj2.delete()
+        self.assertSetEqual(self.memberships(), set([
+            ('eco1', 'proj3', self.views[1].id)]))
+        self.assertRebuilt()
+
+        self.eco1.delete()
+        self.assertSetEqual(self.memberships(), set())
+
+    def test_ecosystem_projects(self):
+        self.proj2.repository_views.add(self.views[0])
+        proj3 = Project.objects.create(name='proj3')
+        proj3.repository_views.add(self.views[1], self.views[2])
+
+        self.eco1.projects.add(proj3, self.proj2)
+        self.assertRebuilt()
+
+        # proj2 is still included from eco2 -> proj1
+        self.eco1.projects.remove(self.proj2)
+        self.proj1.ecosystem_set.remove(self.eco2)
+        self.assertSetEqual(self.memberships(), set([
+            ('eco1', 'proj3', self.views[1].id), ('eco1', 'proj3', self.views[2].id)]))
+        self.assertRebuilt()
+
+        self.eco1.projects.clear()
+        self.assertSetEqual(self.memberships(), set())
+
+    def test_add_project_queries(self):
+        """ The queries to add a project do not depend on the ecosystem size """
+
+        def add_project(name):
+            project = Project.objects.create(name=name)
+            project.repository_views.add(*self.views)
+            with CaptureQueriesContext(connection) as queries:
+                self.eco2.projects.add(project)
+            return len(queries)
+
+        nqueries = add_project('first')
+        for nproject in range(20):
+            add_project('project%i' % nproject)
+        self.assertEqual(add_project('last'), nqueries)
+        self.assertEqual(Membership.objects.count(), 22 * 3 * 2)
+        self.assertRebuilt()
+
+        # Nothing is done if the project is already there
+        project = Project.objects.get(name='last')
+        with self.assertNumQueries(1):
+            self.eco2.projects.add(project)
+
+    def test_rebuild_once(self):
+        self.proj2.repository_views.add(*self.views)
+        eco3 = Ecosystem.objects.create(name='eco3')
+
+        with mock.patch('projects.membership.rebuild_memberships', wraps=rebuild_memberships) as rebuild:
+            eco3.subecos.add(self.eco2)
+            self.eco1.subecos.remove(self.eco2)
+            self.assertEqual(rebuild.call_count, 0)
+            # Read inside the transaction
+            self.assertEqual(len(ecosystem_repository_views(eco3)), 3)
+        rebuild.assert_called_once_with(set([self.eco1.id, eco3.id]))
+        self.assertSetEqual(set(eco for (eco, _, _) in self.memberships()), set(['eco2', 'eco3']))
+
+    def test_lookups(self):
+        self.proj2.repository_views.add(*self.views)
+
+        with self.assertNumQueries(1):
+            ecosystems = [eco.name for eco in repository_ecosystems(self.views[0].repository)]
+        self.assertListEqual(sorted(ecosystems), ['eco1', 'eco2'])
+
+        with self.assertNumQueries(1):
+            views = list(ecosystem_repository_views(self.eco1))
+        self.assertEqual(len(views), 3)
+
+    def test_move_view(self):
+        self.proj2.repository_views.add(self.views[0])
+        old_repository = self.views[0].repository
+        new_repository = Repository.objects.create(name='https://github.com/grimoirelab/new',
+                                                   data_source=old_repository.data_source)
+
+        # As the editor does
+        self.views[0].repository = new_repository
+        self.views[0].save()
+        self.assertFalse(repository_ecosystems(old_repository).exists())
+        self.assertListEqual(sorted(eco.name for eco in repository_ecosystems(new_repository)), ['eco1', 'eco2'])
+        self.assertRebuilt()
+
+    def test_rebuild_command(self):
+        self.proj2.repository_views.add(*self.views)
+        memberships = self.memberships()
+
+        Membership.objects.all().delete()
+        call_command('rebuild_memberships', 'eco1', stdout=io.StringIO())
+        self.assertEqual(Membership.objects.count(), 3)
+
+        call_command('rebuild_memberships', stdout=io.StringIO())
+        self.assertSetEqual(self.memberships(), memberships)
@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+import io
+import json
+import math
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .bestiary_import import BATCH_PROJECTS, load_projects
+from .models import DataSource, Ecosystem, Project, RepositoryView
+from .planner import plan_import
+from .testing import ProjectsFileMixin
+
+
+PROJECTS_FILE = 'projects/projects-release.json'
+
+
+def database_state():
+    """ The objects and relations in the database with the keys of the plans """
+
+    through = Project.repository_views.through.objects
+    return {
+        'Ecosystem': set((name,) for name in Ecosystem.objects.values_list('name', flat=True)),
+        'Project': set((name,) for name in Project.objects.values_list('name', flat=True)),
+        'DataSource': set((name,) for name in DataSource.objects.values_list('name', flat=True)),
+        'Repository': set(RepositoryView.objects.values_list('repository__data_source__name', 'repository__name')),
+        'RepositoryView': set(RepositoryView.objects.values_list('repository__data_source__name', 'repository__name',
+                                                                 'params')),
+        'Ecosystem.projects': set(Ecosystem.projects.through.objects.values_list('ecosystem__name', 'project__name')),
+        'Project.repository_views': set(through.values_list('project__name', 'repositoryview__repository__data_source__name',
+                                                            'repositoryview__repository__name', 'repositoryview__params'))
+    }
+
+
+class PlannerTests(ProjectsFileMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        with open(PROJECTS_FILE) as fprojects:
+            self.projects = json.load(fprojects)
+
+        # Part of the projects already imported
+        grimoire = self.projects['grimoire']
+        partial = {'grimoire': {data_source: grimoire[data_source][:1] for data_source in list(grimoire)[:3]},
+                   'old': {'git': ['https://github.com/grimoirelab/old']}}
+        load_projects(self.write(partial), 'release')
+
+    def test_plan(self):
+        self.projects['new'] = {'meta': {'title': 'New'}, 'git': ['https://github.com/grimoirelab/old'],
+                                'newsource': ['https://example.com/new']}
+        projects_file = self.write(self.projects)
+
+        with CaptureQueriesContext(connection) as queries:
+            plan = plan_import(projects_file, 'release', chunk_size=1)
+        self.assertTrue(all(query['sql'].startswith('SELECT') for query in queries.captured_queries))
+        self.assertFalse(plan.errors)
+
+        before = database_state()
+        load_projects(projects_file, 'release')
+        after = database_state()
+
+        for model, keys in plan.creates.items():
+            self.assertSetEqual(keys, after[model] - before[model], model)
+        for relation, keys in plan.links.items():
+            self.assertSetEqual(keys, after[relation] - before[relation], relation)
+        self.assertSetEqual(plan.stale['Ecosystem.projects'], set([('release', 'old')]))
+
+        counts = plan.counts()
+        self.assertEqual(counts['Project']['create'], 1)
+        self.assertIn(('newsource',), plan.creates['DataSource'])
+        self.assertEqual(counts['DataSource'], {'create': len(plan.creates['DataSource'])})
+        # The importer skips the lines without repository
+        self.assertListEqual(plan.skipped, ['new newsource https://example.com/new'])
+        # The rows inserted by the import, one by one
+        self.assertEqual(plan.writes(), sum(len(after[name] - before[name]) for name in after))
+        self.assertEqual(plan.transactions(), math.ceil(len(self.projects) / BATCH_PROJECTS))
+        self.assertEqual(plan_import(projects_file, 'release', batch_size=0).transactions(), 1)
+        self.assertIn('create Project new', plan.report())
+
+        # Nothing else to import
+        self.assertTrue(plan_import(projects_file, 'release').empty)
+
+    def test_new_ecosystem(self):
+        plan = plan_import(PROJECTS_FILE, 'other')
+        self.assertSetEqual(plan.creates['Ecosystem'], set([('other',)]))
+        self.assertSetEqual(plan.links['Ecosystem.projects'], set([('other', 'grimoire')]))
+        self.assertFalse(plan.creates['Project'])
+        self.assertFalse(Ecosystem.objects.filter(name='other').exists())
+
+    def test_errors(self):
+        Project.objects.filter(name='grimoire').update(meta_title='Grimoire')
+        self.projects['grimoire']['meta'] = {'title': 'Other'}
+        projects_file = self.write(self.projects)
+
+        plan = plan_import(projects_file, 'release')
+        self.assertEqual(len(plan.errors), 1)
+
+        output = io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command('import_projects', '--dry-run', '--item', projects_file, 'release', stdout=output,
+                         stderr=io.StringIO())
+        self.assertIn('error Project grimoire exists', output.getvalue())
@@ -0,0 +1,127 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+import os
+import sqlite3
+import tempfile
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+
+from .management.commands.snapshot_replicas import snapshot
+from .middleware import STICKY_COOKIE, ReplicaMiddleware
+from .models import Ecosystem, Project
+from .routers import ReplicaRouter, use_primary, use_replicas
+
+
+@override_settings(REPLICA_DATABASES=['replica0'])
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads(self):
+        self.assertEqual(self.router.db_for_read(Project), 'default')
+
+        with use_replicas():
+            self.assertEqual(self.router.db_for_read(Project), 'replica0')
+            self.assertEqual(self.router.db_for_write(Project), 'default')
+            # Not replicated
+            self.assertEqual(self.router.db_for_read(User), 'default')
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(Project), 'default')
+            self.assertEqual(self.router.db_for_read(Project), 'replica0')
+
+        self.assertEqual(self.router.db_for_read(Project), 'default')
+
+    def test_migrate(self):
+        self.assertTrue(self.router.allow_migrate('default', 'projects'))
+        self.assertFalse(self.router.allow_migrate('replica0', 'projects'))
+
+
+@override_settings(REPLICA_DATABASES=['replica0'])
+class ReplicaMiddlewareTests(SimpleTestCase):
+
+    def request(self, method='get', write=False, cookies=None):
+        router = ReplicaRouter()
+        databases = []
+
+        def get_response(request):
+            databases.append(router.db_for_read(Project))
+            if write:
+                router.db_for_write(Project)
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies or {})
+        response = ReplicaMiddleware(get_response)(request)
+
+        return databases[0], response.cookies
+
+    def test_stickiness(self):
+        database, cookies = self.request()
+        self.assertEqual(database, 'replica0')
+        self.assertNotIn(STICKY_COOKIE, cookies)
+
+        # Not safe methods use the primary, and the client only sticks to it after writing
+        database, cookies = self.request(method='post')
+        self.assertEqual(database, 'default')
+        self.assertNotIn(STICKY_COOKIE, cookies)
+
+        database, cookies = self.request(method='post', write=True)
+        self.assertEqual(database, 'default')
+        sticky = cookies[STICKY_COOKIE].value
+
+        database, _ = self.request(cookies={STICKY_COOKIE: sticky})
+        self.assertEqual(database, 'default')
+        database, _ = self.request(cookies={STICKY_COOKIE: '0'})
+        self.assertEqual(database, 'replica0')
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas(self):
+        database, cookies = self.request(write=True)
+        self.assertEqual(database, 'default')
+        self.assertNotIn(STICKY_COOKIE, cookies)
+
+
+class SnapshotTests(TransactionTestCase):
+
+    def test_snapshot(self):
+        Ecosystem.objects.create(name='eco1')
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            replica_file = os.path.join(tmp_dir, 'replica.sqlite3')
+            connection.ensure_connection()
+            snapshot(connection.connection, replica_file)
+            self.assertListEqual(os.listdir(tmp_dir), ['replica.sqlite3'])
+
+            replica = sqlite3.connect(replica_file)
+            try:
+                self.assertListEqual(replica.execute('SELECT name FROM projects_ecosystem').fetchall(), [('eco1',)])
+                self.assertEqual(replica.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+            finally:
+                replica.close()
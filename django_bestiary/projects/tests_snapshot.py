@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+from django.test import TestCase
+
+from .models import DataSource, Ecosystem, Project, Repository, RepositoryView
+from .snapshot import EcosystemSnapshot, SnapshotView
+
+
+class EcosystemSnapshotTests(TestCase):
+
+    def setUp(self):
+        # eco1 with proj2 (meta title) and proj1 -> proj3
+        self.eco1 = Ecosystem.objects.create(name='eco1')
+        proj1 = Project.objects.create(name='proj1')
+        proj2 = Project.objects.create(name='proj2', meta_title='Project 2')
+        proj3 = Project.objects.create(name='proj3')
+        proj1.subprojects.add(proj3)
+        self.eco1.projects.add(proj2, proj1)
+
+        git = DataSource.objects.create(name='git')
+        github = DataSource.objects.create(name='github')
+        repo = Repository.objects.create(name='https://github.com/grimoirelab/perceval', data_source=git)
+        view1 = RepositoryView.objects.create(repository=repo, params='')
+        view2 = RepositoryView.objects.create(repository=repo, params='--filter-no-collection=true')
+        repo = Repository.objects.create(name='https://github.com/grimoirelab/perceval', data_source=github)
+        view3 = RepositoryView.objects.create(repository=repo, params='')
+
+        proj1.repository_views.add(view2, view1)
+        proj2.repository_views.add(view1)
+        proj3.repository_views.add(view3)
+
+    def test_build(self):
+        with self.assertNumQueries(4):
+            snapshot = EcosystemSnapshot.build('eco1')
+
+        self.assertEqual(snapshot.name, 'eco1')
+        self.assertEqual(len(snapshot), 3)
+        self.assertListEqual(list(snapshot.projects()), [('proj1', None), ('proj2', 'Project 2')])
+        self.assertListEqual(list(snapshot.project_views(0)), [
+            SnapshotView('git', 'https://github.com/grimoirelab/perceval', ''),
+            SnapshotView('git', 'https://github.com/grimoirelab/perceval', '--filter-no-collection=true')])
+
+        # The same strings are shared by all the views
+        views = [view for _, view in snapshot.views()]
+        self.assertIs(views[0].repository, views[2].repository)
+        self.assertIs(views[0].params, views[2].params)
+
+    def test_recursive(self):
+        snapshot = EcosystemSnapshot.build(self.eco1, recursive=True)
+
+        self.assertEqual(len(snapshot), 4)
+        self.assertListEqual([project for project, _ in snapshot.projects()], ['proj1', 'proj2', 'proj3'])
+        self.assertListEqual(list(snapshot.project_views(2)), [
+            SnapshotView('github', 'https://github.com/grimoirelab/perceval', '')])
+
+    def test_missing(self):
+        with self.assertRaises(Ecosystem.DoesNotExist):
+            EcosystemSnapshot.build('missing')
+
+        snapshot = EcosystemSnapshot.build(Ecosystem.objects.create(name='eco2'))
+        self.assertEqual(len(snapshot), 0)
+        self.assertListEqual(list(snapshot.views()), [])
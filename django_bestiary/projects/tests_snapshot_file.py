@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+import json
+import os
+import sys
+import tempfile
+
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from .bestiary_export import export_snapshot, fetch_projects
+from .bestiary_import import load_projects
+from .snapshot_file import SnapshotReader, write_snapshot
+
+
+PROJECTS = {
+    'perceval': {
+        'git': ['https://github.com/chaoss/grimoirelab-perceval'],
+        'github': ['https://github.com/chaoss/grimoirelab-perceval'],
+        'meta': {'title': 'Perceval'}
+    },
+    'añejo': {
+        'git': ['https://github.com/chaoss/grimoirelab-perceval', 'https://github.com/chaoss/grimoirelab-elk']
+    },
+    'empty': {}
+}
+
+
+class SnapshotFileTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_file = os.path.join(self.tmp_dir.name, 'eco.bsnp')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read(self):
+        self.assertEqual(write_snapshot(self.snapshot_file, 'eco', PROJECTS), (3, 4))
+
+        with SnapshotReader(self.snapshot_file) as reader:
+            self.assertEqual(reader.ecosystem, 'eco')
+            self.assertEqual(len(reader), 3)
+            # Sorted by the UTF-8 bytes of the names
+            self.assertListEqual(list(reader), ['añejo', 'empty', 'perceval'])
+            self.assertDictEqual(reader['perceval'], PROJECTS['perceval'])
+            self.assertDictEqual(reader['empty'], {})
+            self.assertIn('añejo', reader)
+            self.assertNotIn('missing', reader)
+            with self.assertRaises(KeyError):
+                reader['missing']
+            self.assertDictEqual(reader.to_projects(), PROJECTS)
+
+    def test_big_endian(self):
+        write_snapshot(self.snapshot_file, 'eco', PROJECTS)
+
+        with mock.patch.object(sys, 'byteorder', 'big'):
+            with SnapshotReader(self.snapshot_file) as reader:
+                self.assertDictEqual(reader.to_projects(), PROJECTS)
+
+    def test_wrong_file(self):
+        with open(self.snapshot_file, 'w') as fsnapshot:
+            json.dump(PROJECTS, fsnapshot)
+
+        with self.assertRaises(ValueError):
+            SnapshotReader(self.snapshot_file)
+
+    def test_empty_file(self):
+        open(self.snapshot_file, 'wb').close()
+
+        with self.assertRaisesRegex(ValueError, 'is not a snapshot file'):
+            SnapshotReader(self.snapshot_file)
+
+
+class SnapshotExportTests(TestCase):
+
+    def test_export(self):
+        load_projects('projects/projects-release.json', 'eco')
+
+        with tempfile.NamedTemporaryFile() as snapshot_file:
+            export_snapshot(snapshot_file.name, 'eco')
+            with SnapshotReader(snapshot_file.name) as reader:
+                self.assertDictEqual(reader.to_projects(), fetch_projects('eco'))
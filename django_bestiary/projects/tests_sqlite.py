@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from django_bestiary.sqlite3.base import DatabaseWrapper
+
+
+class SqlitePragmasTests(TestCase):
+
+    def test_pragmas(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("Not a sqlite database")
+
+        pragmas = dict(connection.settings_dict['OPTIONS'].get('pragmas', []))
+        with connection.cursor() as cursor:
+            for pragma in ['cache_size', 'busy_timeout']:
+                if pragma in pragmas:
+                    cursor.execute('PRAGMA %s' % pragma)
+                    self.assertEqual(cursor.fetchone()[0], int(pragmas[pragma]))
+
+
+class SqlitePragmasSettingsTests(SimpleTestCase):
+
+    def test_wrong_pragma(self):
+        for pragmas in [[('journal_mode', 'wal; DROP TABLE projects_project')], [('cache size', '10')]]:
+            wrapper = DatabaseWrapper({'NAME': ':memory:', 'OPTIONS': {'pragmas': pragmas}})
+            with self.assertRaises(ImproperlyConfigured):
+                wrapper.get_pragmas()
+
+    def test_connection_params(self):
+        wrapper = DatabaseWrapper({'NAME': ':memory:', 'OPTIONS': {'pragmas': [('synchronous', 'normal')]}})
+        self.assertNotIn('pragmas', wrapper.get_connection_params())
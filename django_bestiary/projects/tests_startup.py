@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+
+LAZY_MODULES = ['grimoire_elk', 'perceval', 'django.test']
+
+STARTUP = """
+import json, os, sys
+os.environ['DJANGO_SETTINGS_MODULE'] = 'django_bestiary.settings'
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+import projects.bestiary_import, projects.bestiary_export
+print(json.dumps([module for module in %r if module in sys.modules]))
+""" % LAZY_MODULES
+
+
+class StartupTests(SimpleTestCase):
+
+    def test_lazy_imports(self):
+        """ The web app and the command line tools start without the modules only used by some requests """
+
+        output = subprocess.check_output([sys.executable, '-c', STARTUP], cwd=settings.BASE_DIR,
+                                         universal_newlines=True)
+        self.assertListEqual(json.loads(output.splitlines()[-1]), [])
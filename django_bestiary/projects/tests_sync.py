@@ -0,0 +1,167 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+# Bestiary Tests
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+
+import io
+
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+
+from . import merkle
+from .bestiary_export import fetch_projects
+from .models import Ecosystem, Project
+from .sync import HttpRemote, apply_project, sync_ecosystem
+
+
+def sample_projects(nprojects):
+    return {'project%i' % nproject: {
+        'meta': {'title': 'Project %i' % nproject},
+        'git': ['https://github.com/grimoirelab/repo%i' % nrepo for nrepo in range(nproject % 3 + 1)],
+        'github': ['https://github.com/grimoirelab/repo%i' % nproject]
+    } for nproject in range(nprojects)}
+
+
+class ClientRemote(HttpRemote):
+    """ The source ecosystem of this instance, read with the test client """
+
+    def __init__(self, client, source):
+        super().__init__('/projects/')
+        self.client = client
+        self.source = source
+
+    def get(self, path, params):
+        self.requests += 1
+        response = self.client.get(self.url + path, dict(params, ecosystem=self.source))
+        return response.json()
+
+
+class DictRemote(HttpRemote):
+    """ Instance with the projects of a dict """
+
+    def __init__(self, projects):
+        super().__init__('/projects/')
+        self.projects_data = projects
+        self.tree = merkle.MerkleTree(projects)
+
+    def nodes(self, ecosystem, prefixes):
+        self.requests += 1
+        return {prefix: self.tree.node(prefix) for prefix in prefixes}
+
+    def projects(self, ecosystem, names):
+        self.requests += 1
+        return {name: self.projects_data[name] for name in names}
+
+
+class MerkleTreeTests(SimpleTestCase):
+
+    def test_tree(self):
+        projects = sample_projects(40)
+        with mock.patch.object(merkle, 'LEAF_SIZE', 4):
+            tree = merkle.MerkleTree(projects)
+            self.assertIn('children', tree.node(''))
+            self.assertEqual(len(tree.project_hashes('')), 40)
+
+            # The same whatever the order of the repository lines
+            for data in projects.values():
+                data['git'].reverse()
+            self.assertEqual(merkle.MerkleTree(projects).root_hash, tree.root_hash)
+
+            projects['project3']['git'].append('https://github.com/grimoirelab/new')
+            changed = merkle.MerkleTree(projects)
+            self.assertNotEqual(changed.root_hash, tree.root_hash)
+            prefix = changed.keys['project3'][:1]
+            self.assertNotEqual(changed.node(prefix)['hash'], tree.node(prefix)['hash'])
+            self.assertEqual(len([child for child in changed.node('')['children']
+                                  if changed.node(child)['hash'] != tree.node(child)['hash']]), 1)
+
+        self.assertIsNone(tree.node('zz')['hash'])
+
+
+class SyncTests(TestCase):
+
+    def setUp(self):
+        self.source = Ecosystem.objects.create(name='source')
+        for name, data in sample_projects(40).items():
+            apply_project(self.source, name, data)
+        self.remote = ClientRemote(self.client, 'source')
+
+    def assertSynced(self):
+        self.assertEqual(merkle.ecosystem_tree('target').root_hash, merkle.ecosystem_tree('source').root_hash)
+        target = fetch_projects('target')
+        for name, data in fetch_projects('source').items():
+            self.assertDictEqual(merkle.canonical_project(target[name]), merkle.canonical_project(data))
+
+    def sync(self, **kwargs):
+        self.remote.requests = 0
+        return sync_ecosystem(self.remote, 'target', **kwargs)
+
+    @mock.patch.object(merkle, 'LEAF_SIZE', 4)
+    def test_sync(self):
+        changed, removed = self.sync(dry_run=True)
+        self.assertEqual(len(changed), 40)
+        self.assertFalse(Ecosystem.objects.filter(name='target').exists())
+
+        self.sync()
+        self.assertSynced()
+
+        # Nothing to sync: the root is the same
+        self.assertEqual(self.sync(), (set(), set()))
+        self.assertEqual(self.remote.requests, 1)
+
+        self.source.projects.remove(Project.objects.get(name='project8'))
+        apply_project(self.source, 'new', {'git': ['https://github.com/grimoirelab/new']})
+
+        changed, removed = self.sync()
+        self.assertSetEqual(changed, set(['new']))
+        self.assertSetEqual(removed, set(['project8']))
+        # The levels of the tree with changes and the projects
+        self.assertLessEqual(self.remote.requests, 4)
+        self.assertSynced()
+
+    @mock.patch.object(merkle, 'LEAF_SIZE', 4)
+    def test_projects_changed(self):
+        projects = sample_projects(40)
+        sync_ecosystem(DictRemote(projects), 'target')
+
+        projects['project7']['meta']['title'] = 'Renamed'
+        projects['project9']['git'].pop()
+        projects['project9']['gerrit'] = ['review.opendev.org_nova']
+        del projects['project8']
+        remote = DictRemote(projects)
+
+        changed, removed = sync_ecosystem(remote, 'target')
+        self.assertSetEqual(changed, set(['project7', 'project9']))
+        self.assertSetEqual(removed, set(['project8']))
+        self.assertLessEqual(remote.requests, 4)
+
+        self.assertEqual(merkle.ecosystem_tree('target').root_hash, remote.tree.root_hash)
+        self.assertDictEqual(fetch_projects('target')['project9'], merkle.canonical_project(projects['project9']))
+
+    def test_command(self):
+        with self.assertRaises(CommandError):
+            call_command('sync_ecosystems', 'http://127.0.0.1:1/projects/', 'target', stdout=io.StringIO())
@@ -8,11 +8,16 @@ urlpatterns = [
     url(r'^import/$', views.import_from_file),
     url(r'^export/ecosystem=(?P<ecosystem>[\w ]+)', views.export_to_file),
     url(r'^export/$', views.export_to_file),
+    url(r'^changes/$', views.changes_feed),
+    url(r'^merkle/$', views.merkle_nodes),
+    url(r'^merkle/projects/$', views.merkle_projects),
     url(r'^update_ecosystem$', views.update_ecosystem),
     url(r'^remove_ecosystem$', views.remove_ecosystem),
+    url(r'^add_subecosystem$', views.add_subecosystem),
     url(r'^add_project$', views.add_project),
     url(r'^update_project$', views.update_project),
     url(r'^remove_project$', views.remove_project),
+    url(r'^add_subproject$', views.add_subproject),
     url(r'^editor_select_project$', views.editor_select_project),
     url(r'^add_data_source$', views.add_data_source),
     url(r'^select_data_source$', views.select_data_source),
@@ -1,10 +1,10 @@
 import functools
-import json
 
 from datetime import datetime
 from time import time
 
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.template import loader
 
 from django.core.files.storage import default_storage
@@ -16,6 +16,9 @@ from django import shortcuts
 from django.http import Http404
 
 from projects.bestiary_import import load_projects
+from projects import changes, formats, merkle
+from projects.catalog import catalog
+from projects.hierarchy import creates_cycle
 from projects.models import DataSource, Ecosystem, Project, Repository, RepositoryView
 
 from . import forms
@@ -337,6 +340,39 @@ def remove_ecosystem(request):
         return shortcuts.render(request, 'projects/editor.html', build_forms_context())
 
 
+def add_subecosystem(request):
+    """ Add the ecosystem with ecosystem_name to the selected one """
+
+    if request.method == 'POST':
+        form = forms.EcosystemForm(request.POST)
+        if form.is_valid():
+            eco_id = form.cleaned_data['eco_id_state']
+            subeco_name = form.cleaned_data['ecosystem_name']
+
+            try:
+                eco_orm = Ecosystem.objects.get(id=eco_id)
+                subeco_orm = Ecosystem.objects.get(name=subeco_name)
+            except Ecosystem.DoesNotExist:
+                msg = 'Ecosystem does not exist'
+                return shortcuts.render(request, 'projects/editor.html', build_forms_context(EditorState(msg=msg)))
+
+            if creates_cycle(eco_orm, subeco_orm):
+                return return_error('Ecosystem \"%s\" includes \"%s\", it can not be its sub-ecosystem' %
+                                    (subeco_name, eco_orm.name))
+
+            eco_orm.subecos.add(subeco_orm)
+            msg = 'Ecosystem \"%s\" has been added to \"%s\"' % (subeco_name, eco_orm.name)
+            state = EditorState(eco_name=eco_orm.name, eco_id=eco_id, msg=msg)
+            return shortcuts.render(request, 'projects/editor.html', build_forms_context(state))
+        else:
+            # TODO: Show error
+            raise Http404
+    # if a GET (or any other method) we'll create a blank form
+    else:
+        # TODO: Show error
+        return shortcuts.render(request, 'projects/editor.html', build_forms_context())
+
+
 def add_repository_view(request):
     if request.method == 'POST':
         form = forms.RepositoryViewForm(request.POST)
@@ -347,11 +383,7 @@ def add_repository_view(request):
             # Don't support multiselect in projects yet
             project = form.cleaned_data['projects_state']
             # Adding a new repository view
-            try:
-                data_source_orm = DataSource.objects.get(name=data_source)
-            except DataSource.DoesNotExist:
-                data_source_orm = DataSource(name=data_source)
-                data_source_orm.save()
+            data_source_orm, _ = catalog.get_or_create(data_source)
 
             # Try to find a repository already created
             try:
@@ -400,13 +432,13 @@ def update_repository_view(request):
             data_source = form.cleaned_data['data_source']
 
             repository_view_orm = RepositoryView.objects.get(id=repository_view_id)
+            data_source_orm = catalog.get(data_source)
 
             try:
-                repository_orm = Repository.objects.get(name=repository)
-                repository_view_orm.repository = repository_orm
+                # The same repository name could be used in several data sources
+                repository_orm = Repository.objects.get(name=repository, data_source=data_source_orm)
             except Repository.DoesNotExist:
                 # Create a new repository
-                data_source_orm = DataSource.objects.get(name=data_source)
                 repository_orm = Repository(name=repository, data_source=data_source_orm)
                 repository_orm.save()
 
@@ -598,6 +630,41 @@ def add_project(request):
         return shortcuts.render(request, 'projects/editor.html', build_forms_context())
 
 
+def add_subproject(request):
+    """ Add the project with project_name to the selected one """
+
+    if request.method == 'POST':
+        form = forms.ProjectForm(request.POST)
+        if form.is_valid():
+            project_id = form.cleaned_data['project_id_state']
+            subproject_name = form.cleaned_data['project_name']
+            eco_name = form.cleaned_data['eco_name_state']
+
+            try:
+                project_orm = Project.objects.get(id=project_id)
+                subproject_orm = Project.objects.get(name=subproject_name)
+            except Project.DoesNotExist:
+                msg = 'Project does not exist'
+                state = EditorState(eco_name=eco_name, msg=msg)
+                return shortcuts.render(request, 'projects/editor.html', build_forms_context(state))
+
+            if creates_cycle(project_orm, subproject_orm):
+                return return_error('Project \"%s\" includes \"%s\", it can not be its sub-project' %
+                                    (subproject_name, project_orm.name))
+
+            project_orm.subprojects.add(subproject_orm)
+            msg = 'Project \"%s\" has been added to \"%s\"' % (subproject_name, project_orm.name)
+            state = EditorState(eco_name=eco_name, projects=[project_orm.name], project_id=project_id, msg=msg)
+            return shortcuts.render(request, 'projects/editor.html', build_forms_context(state))
+        else:
+            # TODO: Show error
+            raise Http404
+    # if a GET (or any other method) we'll create a blank form
+    else:
+        # TODO: Show error
+        return shortcuts.render(request, 'projects/editor.html', build_forms_context())
+
+
 def find_project_repository_views(project):
 
     data = {"repository_views": []}
@@ -665,13 +732,14 @@ def import_from_file(request):
         myfile = request.FILES["imported_file"]
         ecosystem = request.POST["name"]
         cur_dt = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-        file_name = "%s_%s.json" % (ecosystem, cur_dt)
+        file_format = formats.detect_format(myfile.name)
+        file_name = "%s_%s%s" % (ecosystem, cur_dt, formats.file_extension(file_format))
         fpath = '.imported/' + file_name  # FIXME Define path where all these files must be saved
         save_path = default_storage.save(fpath, ContentFile(myfile.read()))
 
         task_init = time()
         try:
-            (nprojects, nrepos) = load_projects(save_path, ecosystem)
+            (nprojects, nrepos) = load_projects(save_path, ecosystem, file_format)
         except Exception:
             error_msg = "File %s couldn't be imported." % myfile.name
             return return_error(error_msg)
@@ -691,10 +759,19 @@ def export_to_file(request, ecosystem=None):
     if request.method == "POST":
         ecosystem = request.POST["name"]
 
-    file_name = "projects_%s.json" % ecosystem
+    # With ?format= the projects are exported in any of the projects.formats
+    file_format = request.GET.get('format', 'json')
+    if file_format not in formats.all_formats():
+        return HttpResponse(status=400)
+    file_name = "projects_%s%s" % (ecosystem, formats.file_extension(file_format))
+    # With ?recursive=1 sub-ecosystems and sub-projects are flattened in the export
+    recursive = request.GET.get('recursive') in ['1', 'true']
     task_init = time()
     try:
-        projects = fetch_projects(ecosystem)
+        # Read before the projects, the changes after it are applied to them.
+        # The feed has the projects as in the recursive exports only.
+        seq = changes.last_seq(ecosystem) if recursive else None
+        projects = fetch_projects(ecosystem, recursive)
     except (Ecosystem.DoesNotExist, Exception):
         error_msg = "Projects from ecosystem \"%s\" couldn't be exported." % ecosystem
         if request.method == "POST":
@@ -706,12 +783,64 @@ def export_to_file(request, ecosystem=None):
 
     print("Total loading time ... %.2f sec", time() - task_init)
     if projects:
-        projects_json = json.dumps(projects, indent=True, sort_keys=True)
-        response = HttpResponse(projects_json, content_type="application/json")
+        encoding, compressed = formats.split_format(file_format)
+        content_type = "application/gzip" if compressed else formats.CONTENT_TYPES[encoding]
+        response = StreamingHttpResponse(formats.encode_projects(projects, file_format), content_type=content_type)
         response['Content-Disposition'] = 'attachment; filename=' + file_name
+        if seq is not None:
+            response['X-Bestiary-Seq'] = seq
         return response
     else:
         error_msg = "There are no projects to export"
         return return_error(error_msg)
 
     return editor(request)
+
+
+def changes_feed(request):
+    """ Changes of an ecosystem after ?since=, in JSON (see projects.changes).
+    The changes after the X-Bestiary-Seq of a recursive export are applied to it """
+
+    try:
+        since = int(request.GET.get('since', 0))
+        limit = min(int(request.GET.get('limit', settings.CHANGES_PAGE_SIZE)), settings.CHANGES_MAX_PAGE_SIZE)
+        ecosystem = Ecosystem.objects.get(name=request.GET['ecosystem'])
+    except (KeyError, ValueError):
+        return JsonResponse({'error': "ecosystem and an integer since are needed"}, status=400)
+    except Ecosystem.DoesNotExist:
+        return JsonResponse({'error': "Can not find ecosystem %s" % request.GET['ecosystem']}, status=404)
+
+    try:
+        return JsonResponse(changes.fetch_changes(ecosystem, since, max(limit, 1)))
+    except changes.ChangesCompacted as ex:
+        # Gone: the consumer must start again from a full export
+        return JsonResponse({'error': str(ex), 'compacted_seq': ex.seq}, status=410)
+
+
+def merkle_nodes(request):
+    """ Nodes of the Merkle tree of an ecosystem with each ?prefix= (see projects.merkle) """
+
+    try:
+        tree = merkle.ecosystem_tree(request.GET['ecosystem'])
+    except KeyError:
+        return JsonResponse({'error': "ecosystem is needed"}, status=400)
+    except Ecosystem.DoesNotExist:
+        return JsonResponse({'error': "Can not find ecosystem %s" % request.GET['ecosystem']}, status=404)
+
+    prefixes = request.GET.getlist('prefix') or ['']
+    return JsonResponse({'ecosystem': request.GET['ecosystem'],
+                         'nodes': {prefix: tree.node(prefix) for prefix in prefixes}})
+
+
+def merkle_projects(request):
+    """ Projects of an ecosystem with each ?name=, as exported """
+
+    try:
+        ecosystem = Ecosystem.objects.get(name=request.GET['ecosystem'])
+    except KeyError:
+        return JsonResponse({'error': "ecosystem is needed"}, status=400)
+    except Ecosystem.DoesNotExist:
+        return JsonResponse({'error': "Can not find ecosystem %s" % request.GET['ecosystem']}, status=404)
+
+    return JsonResponse({'ecosystem': ecosystem.name,
+                         'projects': merkle.ecosystem_projects(ecosystem, request.GET.getlist('name'))})
@@ -0,0 +1,229 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+""" Benchmark the pathfinder fetchers against local mock servers
+
+For each fetcher and concurrency setting it measures the throughput
+(repositories per second), the requests done per repository and the
+peak memory allocated while fetching. Sample:
+
+    python3 bench_fetchers.py --items 5000 --latency 0.05 --concurrency 1 4 8
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fetch.eclipse import EclipseFetcher
+from fetch.fetcher import Fetcher
+from fetch.gerrit import GerritFetcher, GerritRestFetcher
+from fetch.github import GitHubFetcher
+from fetch.tokens import TokenPool
+from repositories.gerrit import ReposGerritHosts
+
+from mock_servers import (EclipseHandler, GerritHandler, GitHubHandler, MockOptions,
+                          ServerProcess, write_fake_ssh)
+
+
+FETCHERS = ['github', 'gerrit-rest', 'gerrit-ssh', 'eclipse']
+
+
+def get_params():
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Benchmark the fetchers with local mock servers")
+
+    parser.add_argument('-f', '--fetchers', nargs='+', choices=FETCHERS, default=FETCHERS)
+    parser.add_argument('-c', '--concurrency', nargs='+', type=int, default=[1, 4, 8],
+                        help="Concurrency settings to measure")
+    parser.add_argument('--items', type=int, default=1000, help="Repositories per owner or host")
+    parser.add_argument('--owners', type=int, default=4, help="GitHub owners or gerrit hosts")
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to each response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Ratio of failed responses")
+    parser.add_argument('--rate-limit', type=int, default=5000, help="Requests per GitHub token")
+    parser.add_argument('--reset', type=int, default=60, help="Seconds until a GitHub rate limit is reset")
+    parser.add_argument('--tokens', type=int, default=1, help="Number of GitHub tokens")
+    parser.add_argument('--json', help="File to write the results")
+
+    return parser.parse_args()
+
+
+def measure(fetcher, concurrency, server, work, units):
+    """ Run work(unit) for all the units with concurrency threads.
+
+    :returns: the metrics of the run
+    """
+
+    failures = []
+
+    def run_unit(unit):
+        try:
+            return sum(1 for _ in work(unit))
+        except Exception as ex:
+            failures.append(str(ex))
+            return 0
+
+    requests_before = server.stats()['requests'] if server else 0
+
+    tracemalloc.start()
+    task_init = time()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        nrepos = sum(executor.map(run_unit, units))
+    elapsed = time() - task_init
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    nrequests = server.stats()['requests'] - requests_before if server else len(units)
+
+    return {
+        'fetcher': fetcher,
+        'concurrency': concurrency,
+        'repositories': nrepos,
+        'requests': nrequests,
+        'requests_per_repo': nrequests / nrepos if nrepos else 0,
+        'failures': len(failures),
+        'time': elapsed,
+        'repos_per_sec': nrepos / elapsed if elapsed else 0,
+        'peak_memory_kb': peak / 1024
+    }
+
+
+def bench_github(args, options):
+    server = ServerProcess(GitHubHandler, options)
+    owners = ['owner%i' % nowner for nowner in range(args.owners)]
+    results = []
+
+    try:
+        for concurrency in args.concurrency:
+            tokens = TokenPool(['token%i' % ntoken for ntoken in range(args.tokens)], limit=args.rate_limit)
+            fetcher = GitHubFetcher('github.com', tokens, url=server.url)
+            results.append(measure('github', concurrency, server, fetcher.fetch, owners))
+    finally:
+        server.stop()
+
+    return results
+
+
+def bench_gerrit_rest(args, options):
+    server = ServerProcess(GerritHandler, options)
+    results = []
+
+    try:
+        for concurrency in args.concurrency:
+            fetcher = GerritRestFetcher('gerrit.example.com', url=server.url,
+                                        page_size=args.page_size, max_workers=concurrency)
+            results.append(measure('gerrit-rest', concurrency, server,
+                                   lambda unit: fetcher.fetch(), range(1)))
+    finally:
+        server.stop()
+
+    return results
+
+
+def bench_gerrit_ssh(args, options, tmp_dir):
+    ssh_cmd = write_fake_ssh(os.path.join(tmp_dir, 'ssh'), sys.executable, options)
+    hosts = ['gerrit%i.example.com' % nhost for nhost in range(args.owners)]
+    results = []
+
+    for concurrency in args.concurrency:
+        repos = ReposGerritHosts(hosts, 'user', max_workers=concurrency, ssh_cmd=ssh_cmd)
+        results.append(measure('gerrit-ssh', concurrency, None, lambda unit: repos.get_repos(), range(1)))
+
+        # The requests are the ssh commands run
+        with open(ssh_cmd + '.log') as flog:
+            results[-1]['requests'] = len(flog.readlines())
+        os.remove(ssh_cmd + '.log')
+        if results[-1]['repositories']:
+            results[-1]['requests_per_repo'] = results[-1]['requests'] / results[-1]['repositories']
+
+    return results
+
+
+def bench_eclipse(args, options, tmp_dir):
+    server = ServerProcess(EclipseHandler, options)
+    results = []
+
+    try:
+        # The first run downloads the projects, the second one uses the cache
+        for run in ['eclipse', 'eclipse-cached']:
+            fetcher = EclipseFetcher(cache_dir=tmp_dir, url=server.url + '/json/projects/all')
+            results.append(measure(run, 1, server, lambda unit: fetcher.fetch(), range(1)))
+    finally:
+        server.stop()
+
+    return results
+
+
+def main():
+    args = get_params()
+
+    # Failed requests are retried without waiting
+    Fetcher.RETRY_WAIT = 0
+    GerritFetcher.RETRY_WAIT = 0
+
+    options = MockOptions(items=args.items, page_size=args.page_size, latency=args.latency,
+                          error_rate=args.error_rate, rate_limit=args.rate_limit,
+                          reset=args.reset)
+    tmp_dir = tempfile.mkdtemp(prefix='pathfinder-bench-')
+
+    results = []
+    try:
+        if 'github' in args.fetchers:
+            results += bench_github(args, options)
+        if 'gerrit-rest' in args.fetchers:
+            results += bench_gerrit_rest(args, options)
+        if 'gerrit-ssh' in args.fetchers:
+            results += bench_gerrit_ssh(args, options, tmp_dir)
+        if 'eclipse' in args.fetchers:
+            results += bench_eclipse(args, options, tmp_dir)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    print("%-15s %6s %8s %8s %10s %8s %8s %10s %12s" % ("Fetcher", "Conc", "Repos", "Requests", "Req/repo",
+                                                        "Failures", "Time", "Repos/sec", "Peak KB"))
+    for result in results:
+        print("%-15s %6i %8i %8i %10.4f %8i %8.2f %10.1f %12.1f" % (result['fetcher'], result['concurrency'],
+                                                                    result['repositories'], result['requests'],
+                                                                    result['requests_per_repo'],
+                                                                    result['failures'], result['time'],
+                                                                    result['repos_per_sec'],
+                                                                    result['peak_memory_kb']))
+
+    if args.json:
+        with open(args.json, "w") as fjson:
+            json.dump(results, fjson, indent=4, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
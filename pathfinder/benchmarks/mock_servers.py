@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#     Alvaro del Castillo <acs@bitergia.com>
+#
+
+""" Local stand-ins of the GitHub, Eclipse and Gerrit services
+
+The servers generate N pages of synthetic data and can add latency,
+rate limit headers and errors to the responses.
+"""
+
+import json
+import multiprocessing
+import os
+import random
+import socketserver
+import stat
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+from urllib.request import urlopen
+
+
+class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MockOptions():
+    """ Behaviour of a mock server """
+
+    def __init__(self, items=1000, page_size=100, latency=0.0, error_rate=0.0,
+                 rate_limit=5000, reset=60, seed=0):
+        self.items = items
+        self.page_size = page_size
+        self.latency = latency  # seconds added to each response
+        self.error_rate = error_rate  # ratio of responses failing with a 500
+        self.rate_limit = rate_limit  # requests per token before a 403
+        self.reset = reset  # seconds until the rate limit is reset
+        self.random = random.Random(seed)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """ Base handler counting requests and injecting latency and errors """
+
+    def do_GET(self):
+        server = self.server
+
+        if self.path == '/_stats':
+            with server.lock:
+                stats = {'requests': server.nrequests, 'errors': server.nerrors}
+            self.send_json(stats)
+            return
+
+        with server.lock:
+            server.nrequests += 1
+            failing = server.options.random.random() < server.options.error_rate
+
+        if server.options.latency:
+            time.sleep(server.options.latency)
+
+        if failing:
+            with server.lock:
+                server.nerrors += 1
+            self.send_error(500)
+            return
+
+        url = urlparse(self.path)
+        self.handle_get(url.path, dict((key, values[0]) for key, values in parse_qs(url.query).items()))
+
+    def handle_get(self, path, query):
+        raise NotImplementedError
+
+    def send_json(self, data, headers=None, prefix=''):
+        body = (prefix + json.dumps(data)).encode('utf8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class GitHubHandler(MockHandler):
+    """ /orgs/<owner>/repos paginated with Link headers and rate limit """
+
+    def handle_get(self, path, query):
+        tokens = self.server.tokens
+        token = self.headers.get('Authorization', '')
+        now = time.time()
+
+        with self.server.lock:
+            remaining, reset = tokens.get(token, (self.server.options.rate_limit, now + self.server.options.reset))
+            if reset <= now:
+                remaining, reset = self.server.options.rate_limit, now + self.server.options.reset
+            remaining -= 1
+            tokens[token] = (remaining, reset)
+
+        headers = {'X-RateLimit-Limit': str(self.server.options.rate_limit),
+                   'X-RateLimit-Remaining': str(max(remaining, 0)),
+                   'X-RateLimit-Reset': str(int(reset))}
+
+        if remaining < 0:
+            self.send_response(403)
+            for header, value in headers.items():
+                self.send_header(header, value)
+            self.end_headers()
+            return
+
+        parts = path.strip('/').split('/')
+        if len(parts) != 3 or parts[0] != 'orgs' or parts[2] != 'repos':
+            self.send_error(404)
+            return
+
+        owner = parts[1]
+        page = int(query.get('page', 1))
+        per_page = int(query.get('per_page', self.server.options.page_size))
+        first = (page - 1) * per_page
+        last = min(first + per_page, self.server.options.items)
+
+        repos = [synthetic_github_repo(owner, nrepo) for nrepo in range(first, last)]
+
+        if last < self.server.options.items:
+            next_url = 'http://%s:%i%s?per_page=%i&page=%i' % (self.server.server_address + (path, per_page, page + 1))
+            headers['Link'] = '<%s>; rel="next"' % next_url
+
+        self.send_json(repos, headers)
+
+
+class GerritHandler(MockHandler):
+    """ /projects/?n=&S= with the gerrit JSON prefix """
+
+    def handle_get(self, path, query):
+        if path != '/projects/':
+            self.send_error(404)
+            return
+
+        start = int(query.get('S', 0))
+        limit = int(query.get('n', self.server.options.page_size))
+        last = min(start + limit, self.server.options.items)
+
+        projects = dict(('project-%07i' % nproject, {'id': 'project-%07i' % nproject, 'state': 'ACTIVE'})
+                        for nproject in range(start, last))
+        self.send_json(projects, prefix=")]}'\n")
+
+
+class EclipseHandler(MockHandler):
+    """ /json/projects/all with the Eclipse projects """
+
+    def handle_get(self, path, query):
+        if path != '/json/projects/all':
+            self.send_error(404)
+            return
+
+        projects = dict(('project.%05i' % nproject, synthetic_eclipse_project(nproject))
+                        for nproject in range(self.server.options.items))
+        self.send_json({'projects': projects})
+
+
+def synthetic_github_repo(owner, nrepo):
+    """ A repository with the fields of the GitHub API, more or less """
+
+    name = 'repo-%07i' % nrepo
+    repo = {
+        'id': nrepo,
+        'name': name,
+        'full_name': owner + '/' + name,
+        'html_url': 'https://github.com/' + owner + '/' + name,
+        'clone_url': 'https://github.com/' + owner + '/' + name + '.git',
+        'fork': nrepo % 10 == 0,
+        'updated_at': '2017-%02i-%02iT10:00:00Z' % (12 - nrepo % 12, 28 - nrepo % 28),
+        'pushed_at': '2017-01-01T10:00:00Z',
+        'description': 'Synthetic repository %i for benchmarking' % nrepo
+    }
+    # Fill up to the ~100 fields of a real repository
+    for nfield in range(90):
+        repo['field_%02i_url' % nfield] = 'https://api.github.com/repos/%s/%s/field/%i' % (owner, name, nfield)
+
+    return repo
+
+
+def synthetic_eclipse_project(nproject):
+    name = 'project.%05i' % nproject
+    return {
+        'title': 'Project %i' % nproject,
+        'source_repo': [{'url': 'http://git.eclipse.org/c/%s/repo%i.git' % (name, nrepo)} for nrepo in range(3)],
+        'bugzilla': [{'query_url': 'https://bugs.eclipse.org/bugs/buglist.cgi?product=%s' % name}],
+        'dev_list': {'url': 'https://dev.eclipse.org/mailman/listinfo/%s-dev' % name},
+        'gerrit_repo': [{'url': 'https://git.eclipse.org/r/%s/repo0' % name}]
+    }
+
+
+def _build_server(handler, options):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.options = options
+    server.lock = threading.Lock()
+    server.nrequests = 0
+    server.nerrors = 0
+    server.tokens = {}
+    return server
+
+
+def start_server(handler, options):
+    """ Start a mock server in a thread. Stop it with stop_server """
+
+    server = _build_server(handler, options)
+    server.url = 'http://127.0.0.1:%i' % server.server_port
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    return server
+
+
+def stop_server(server):
+    server.shutdown()
+    server.server_close()
+
+
+def _serve(handler, options, conn):
+    server = _build_server(handler, options)
+    conn.send(server.server_port)
+    server.serve_forever()
+
+
+class ServerProcess():
+    """ A mock server running in its own process
+
+    The server allocations and CPU time are not mixed with the ones
+    of the fetchers being measured.
+    """
+
+    def __init__(self, handler, options):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve, args=(handler, options, child_conn))
+        self.process.daemon = True
+        self.process.start()
+        self.url = 'http://127.0.0.1:%i' % parent_conn.recv()
+
+    def stats(self):
+        """ Number of requests served and errors injected """
+
+        with urlopen(self.url + '/_stats') as response:
+            return json.loads(response.read().decode('utf8'))
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join()
+
+
+FAKE_SSH = """#!%(python)s
+import random
+import sys
+import time
+
+with open(sys.argv[0] + '.log', 'a') as flog:
+    flog.write(' '.join(sys.argv[1:]) + '\\n')
+time.sleep(%(latency)f)
+if random.random() < %(error_rate)f:
+    sys.exit(255)
+host = sys.argv[sys.argv.index('gerrit') - 1].split('@')[1]
+sys.stdout.write('{')
+for nproject in range(%(items)i):
+    sys.stdout.write('%%s"%%s/project-%%07i": {"state": "ACTIVE"}' %% (',' if nproject else '', host, nproject))
+sys.stdout.write('}')
+"""
+
+
+def write_fake_ssh(path, python, options):
+    """ Write a fake ssh command printing the projects of a gerrit host """
+
+    with open(path, 'w') as fssh:
+        fssh.write(FAKE_SSH % {'python': python, 'latency': options.latency,
+                               'error_rate': options.error_rate, 'items': options.items})
+    os.chmod(path, stat.S_IRWXU)
+
+    return path
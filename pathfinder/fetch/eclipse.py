@@ -20,7 +20,11 @@
 #     Alvaro del Castillo <acs@bitergia.com>
 #
 
+import json
 import logging
+import os
+import tempfile
+import time
 
 from .fetcher import Fetcher
 
@@ -29,17 +33,62 @@ logger = logging.getLogger(__name__)
 
 
 class EclipseFetcher(Fetcher):
-    """Fetch github repositories"""
+    """Fetch Eclipse projects
+
+    If a cache dir is given, the downloaded projects are stored in it
+    and reused until they are older than max_age seconds. Other files
+    derived from the projects (i.e. indexes) can be stored next to it.
+    """
 
     ECLIPSE_PROJECTS_URL = "http://projects.eclipse.org/json/projects/all"
+    CACHE_FILE = "eclipse-projects.json"
+    CACHE_MAX_AGE = 24 * 3600  # seconds
 
-    def __init__(self):
+    def __init__(self, cache_dir=None, max_age=CACHE_MAX_AGE, url=None):
         super().__init__(None)
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.url = url or self.ECLIPSE_PROJECTS_URL
 
     def fetch(self):
-        logger.info("Getting Eclipse projects (1 min) from  %s ", self.ECLIPSE_PROJECTS_URL)
+        cached = self.load(self.CACHE_FILE)
+        if cached is not None:
+            logger.debug("Using Eclipse projects cached in %s", self.cache_dir)
+            return cached
+
+        logger.info("Getting Eclipse projects (1 min) from  %s ", self.url)
 
-        eclipse_projects_resp = self._call(self.ECLIPSE_PROJECTS_URL)
+        eclipse_projects_resp = self._call(self.url)
         eclipse_projects = eclipse_projects_resp.json()['projects']
 
+        self.save(self.CACHE_FILE, eclipse_projects)
+
         return eclipse_projects
+
+    def cache_path(self, name):
+        return os.path.join(self.cache_dir, name) if self.cache_dir else None
+
+    def load(self, name):
+        """ Load a JSON file from the cache, None if missing or too old """
+
+        path = self.cache_path(name)
+        if not path or not os.path.exists(path):
+            return None
+        if time.time() - os.path.getmtime(path) > self.max_age:
+            logger.debug("Cached %s is too old", path)
+            return None
+
+        with open(path) as fcache:
+            return json.load(fcache)
+
+    def save(self, name, data):
+        """ Store a JSON file in the cache, if there is one """
+
+        path = self.cache_path(name)
+        if not path:
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=self.cache_dir, delete=False) as fcache:
+            json.dump(data, fcache)
+        os.replace(fcache.name, path)
@@ -44,14 +44,14 @@ class Fetcher:
 
         raise NotImplementedError
 
-    def _call(self, url, headers=None, params=None):
+    def _call(self, url, headers=None, params=None, auth=None):
         """ Get data from a remote URL with retry  """
 
         retries = 0
 
         while retries < self.MAX_RETRIES:
             try:
-                response = requests.get(url, headers=headers, params=params)
+                response = requests.get(url, headers=headers, params=params, auth=auth)
                 break
             except requests.exceptions.ConnectionError as ex:
                 logger.error("github url %s failed: %s", url, ex)
@@ -20,62 +20,215 @@
 #     Alvaro del Castillo <acs@bitergia.com>
 #
 
+import io
+import json
 import logging
+import os
 import subprocess
+import tempfile
 import time
 
+from concurrent.futures import ThreadPoolExecutor
+
 from .fetcher import Fetcher
 
 
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 64 * 1024  # characters read at a time from a stream
+WHITESPACE = ' \t\n\r'
+
+
+def iter_json_object(stream, chunk_size=CHUNK_SIZE):
+    """ Generator of the (key, value) items of a JSON object in a text stream.
+
+    The stream is read and decoded incrementally, so only one item is
+    kept in memory at a time instead of the whole object.
+    """
+
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    def expect(chars):
+        nonlocal pos
+        skip_whitespace()
+        if pos >= len(buf) or buf[pos] not in chars:
+            raise ValueError("Expected one of %s at %i in JSON stream" % (chars, pos))
+        pos += 1
+        return buf[pos - 1]
+
+    def decode():
+        nonlocal pos
+        while True:
+            skip_whitespace()
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                # A value ending with the buffer could be truncated
+                if end < len(buf) or eof:
+                    pos = end
+                    return value
+            except ValueError:
+                if eof:
+                    raise
+            fill()
+
+    expect('{')
+    skip_whitespace()
+    if buf[pos:pos + 1] == '}':
+        return
+
+    while True:
+        key = decode()
+        expect(':')
+        yield key, decode()
+        if expect(',}') == '}':
+            return
+
 
 class GerritFetcher(Fetcher):
-    """Fetch gerrit projects"""
+    """Fetch gerrit projects using the ssh API
+
+    All the commands to a host share a multiplexed ssh connection,
+    kept open CONTROL_PERSIST seconds after the last command.
+    """
 
     CMD = 'gerrit'
     CMD_LS_PROJECTS = 'ls-projects'
     PORT = '29418'
     MAX_RETRIES = 3  # max number of retries when a command fails
     RETRY_WAIT = 10  # number of seconds when retrying a ssh command
+    CONTROL_PERSIST = 600  # seconds the master ssh connection is kept open
 
-    def __init__(self, host, user):
+    def __init__(self, host, user, ssh_cmd='ssh', control_dir=None):
         super().__init__(host, user=user)
+        self.ssh_cmd = ssh_cmd
+        self.control_dir = control_dir or os.path.join(tempfile.gettempdir(), 'pathfinder-ssh')
 
     def fetch(self):
-        """ Get the repository list for a data sources for all projects """
+        """ Return a generator of the names of the projects in the host """
+
+        cmd = self._build_cmd(self.CMD_LS_PROJECTS) + ['--format', 'json']
 
-        cmd = self._build_cmd(self.CMD_LS_PROJECTS)
-        stdout = self._execute_cmd(cmd)
-        return stdout
+        retries = 0
+        while True:
+            nprojects = 0
+            parse_error = None
+            with tempfile.TemporaryFile() as ferr:
+                process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=ferr)
+                try:
+                    stream = io.TextIOWrapper(process.stdout, encoding='utf8')
+                    for project, _ in iter_json_object(stream):
+                        nprojects += 1
+                        yield project
+                except ValueError as ex:
+                    # Truncated output, checked with the exit status below
+                    parse_error = ex
+                finally:
+                    process.stdout.close()
+                    process.wait()
+                ferr.seek(0)
+                stderr = ferr.read().decode('utf8', 'replace')
+
+            if process.returncode == 0:
+                if parse_error:
+                    # The projects listed would be taken as all of them
+                    msg = ' '.join(cmd) + " returned invalid JSON: " + str(parse_error)
+                    raise RuntimeError(msg)
+                return
+
+            logger.error("gerrit cmd %s failed: %s", cmd, stderr.strip())
+            retries += 1
+            # Projects already returned can not be returned again
+            if nprojects or retries >= self.MAX_RETRIES:
+                msg = ' '.join(cmd) + " failed " + str(retries) + " times. Giving up!"
+                raise RuntimeError(msg)
+            time.sleep(self.RETRY_WAIT * retries)
 
     def _build_cmd(self, subcmd=None):
         """Buld gerrit command"""
 
+        os.makedirs(self.control_dir, mode=0o700, exist_ok=True)
+
         credentials = self.user + "@" + self.host
-        cmd = ['ssh', '-p', self.PORT, credentials, self.CMD]
+        cmd = [self.ssh_cmd, '-p', self.PORT,
+               '-o', 'ControlMaster=auto',
+               '-o', 'ControlPath=' + os.path.join(self.control_dir, '%r@%h:%p'),
+               '-o', 'ControlPersist=' + str(self.CONTROL_PERSIST),
+               credentials, self.CMD]
 
         if subcmd:
             cmd.append(subcmd)
         return cmd
 
-    def _execute_cmd(self, cmd):
-        """Execute gerrit command with retry if it fails"""
 
-        stdout = None
-        retries = 0
+class GerritRestFetcher(Fetcher):
+    """Fetch gerrit projects using the REST API
 
-        while retries < self.MAX_RETRIES:
-            try:
-                stdout = subprocess.check_output(cmd, stderr=subprocess.STDOUT)
-                break
-            except subprocess.CalledProcessError as ex:
-                logger.error("gerrit cmd %s failed: %s", cmd, ex)
-                time.sleep(self.RETRY_WAIT * retries)
-                retries += 1
-
-        if stdout is None:
-            msg = ' '.join(cmd) + " failed " + str(self.MAX_RETRIES) + " times. Giving up!"
-            raise RuntimeError(msg)
-
-        return stdout.decode("utf8")
+    Pages of projects are requested in parallel, MAX_WORKERS at a time,
+    until a page is not complete.
+    """
+
+    PAGE_SIZE = 500
+    MAX_WORKERS = 4
+    MAGIC_PREFIX = ")]}'"  # Prepended by gerrit to the JSON responses
+
+    def __init__(self, host, user=None, password=None, url=None,
+                 page_size=PAGE_SIZE, max_workers=MAX_WORKERS):
+        super().__init__(host, user=user, password=password)
+        self.url = url or 'https://' + host
+        self.page_size = page_size
+        self.max_workers = max_workers
+
+    def fetch(self):
+        """ Return a generator of the names of the projects in the host """
+
+        start = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                starts = [start + npage * self.page_size for npage in range(self.max_workers)]
+                pages = executor.map(self._fetch_page, starts)
+
+                for page in pages:
+                    for project in page:
+                        yield project
+                    if len(page) < self.page_size:
+                        return
+
+                start = starts[-1] + self.page_size
+
+    def _fetch_page(self, start):
+        """ Fetch the names of the projects in a page """
+
+        auth = None
+        url = self.url + '/projects/'
+        if self.user:
+            # Authenticated requests are done under /a/
+            auth = (self.user, self.password)
+            url = self.url + '/a/projects/'
+
+        response = self._call(url, params={'n': self.page_size, 'S': start}, auth=auth)
+
+        raw = response.text
+        if raw.startswith(self.MAGIC_PREFIX):
+            raw = raw[len(self.MAGIC_PREFIX):]
+
+        return list(json.loads(raw).keys())
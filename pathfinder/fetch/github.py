@@ -25,6 +25,7 @@ import logging
 import requests
 
 from .fetcher import Fetcher
+from .tokens import TokenPool
 
 
 logger = logging.getLogger(__name__)
@@ -37,23 +38,50 @@ class GitHubFetcher(Fetcher):
     MAX_RETRIES = 3  # max number of retries when a request fails
     RETRY_WAIT = 10  # number of seconds when retrying HTTP request
 
-    def __init__(self, host, api_token):
+    def __init__(self, host, api_token, url=None):
+        """ api_token could be a token, a list of tokens or a TokenPool.
+            A TokenPool can be shared by several fetchers.
+            url is the API base URL, for GitHub Enterprise or testing.
+        """
         super().__init__(host, api_token=api_token)
+        self.url = url or self.GITHUB_API_URL
+
+        if isinstance(api_token, TokenPool):
+            self.tokens = api_token
+        elif isinstance(api_token, str):
+            self.tokens = TokenPool([api_token])
+        else:
+            self.tokens = TokenPool(api_token)
 
-    def fetch(self, owner):
-        return [data for data in self.__fetch(owner)]
+    def fetch(self, owner, since=None):
+        """ Return a generator of the owner repositories raw data.
 
-    def __fetch(self, owner):
-        headers = {'Authorization': 'token ' + self.api_token}
+        Repositories are returned as the pages arrive, so only one page
+        of raw data is kept in memory at a time.
+
+        :param owner: GitHub organization or user
+        :param since: if set, only the repositories updated from this
+            ISO 8601 date are returned
+        """
+        return self.__fetch(owner, since)
+
+    def __fetch(self, owner, since=None):
         params = {
             'per_page': 100  # Maximum limit by the API
         }
 
-        url = self.__get_owner_repos_url(owner, headers, params)
+        if since:
+            # Most recently updated first, so the listing can be stopped
+            # at the first repository not updated since the last time
+            params.update({'sort': 'updated', 'direction': 'desc'})
+
+        url = self.__get_owner_repos_url(owner, params)
 
         while True:
-            response = self._call(url, headers, params)
+            response = self._call_api(url, params)
             for repository in response.json():
+                if since and repository['updated_at'] < since:
+                    return
                 yield repository
 
             if response.links and 'next' in response.links:
@@ -61,20 +89,45 @@ class GitHubFetcher(Fetcher):
             else:
                 break
 
-    def __get_owner_repos_url(self, owner, headers, params):
+    def _call_api(self, url, params=None):
+        """ Call the API with the token of the pool with more headroom.
+
+        Requests rejected because the token rate limit is exhausted
+        are retried with other token.
+        """
+
+        while True:
+            token = self.tokens.acquire()
+            headers = {'Authorization': 'token ' + token}
+
+            try:
+                response = self._call(url, headers, params)
+            except requests.exceptions.HTTPError as ex:
+                self.tokens.update(token, ex.response.headers)
+                if ex.response.status_code == 403 and \
+                   ex.response.headers.get('X-RateLimit-Remaining') == '0':
+                    logger.debug("Rate limit exhausted for a token, retrying %s", url)
+                    continue
+                raise
+
+            self.tokens.update(token, response.headers)
+
+            return response
+
+    def __get_owner_repos_url(self, owner, params):
         """ The owner could be a org or a user.
             It waits if need to have rate limit.
         """
-        url_org = self.GITHUB_API_URL + "/orgs/" + owner + "/repos"
-        url_user = self.GITHUB_API_URL + "/users/" + owner + "/repos"
+        url_org = self.url + "/orgs/" + owner + "/repos"
+        url_user = self.url + "/users/" + owner + "/repos"
 
         url_owner = url_org  # Use org by default
 
         try:
-            res = self._call(url_owner, headers, params)
+            res = self._call_api(url_owner, params)
         except requests.exceptions.HTTPError:
             # owner is not an org, try with a user
-            res = self._call(url_user, headers, params)
+            res = self._call_api(url_user, params)
             res.raise_for_status()
             url_owner = url_user
 
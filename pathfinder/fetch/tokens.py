@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# Authors:
+#     Santiago Dueñas <sduenas@bitergia.com>
+#     Alvaro del Castillo <acs@bitergia.com>
+#
+
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class TokenUsage():
+    """ Rate limit status and usage of an API token """
+
+    __slots__ = ['token', 'limit', 'remaining', 'reset', 'requests']
+
+    def __init__(self, token, limit):
+        self.token = token
+        self.limit = limit
+        self.remaining = limit
+        self.reset = None
+        self.requests = 0
+
+
+class TokenPool():
+    """ Pool of API tokens scheduled by their rate limit headroom
+
+    Each request is sent with the token with more requests remaining,
+    according to the rate limit headers of its last response. When all
+    the tokens are exhausted the callers wait until the first reset.
+    The pool is thread safe, so it can be shared by several fetchers.
+    """
+
+    RATE_LIMIT = 5000  # requests per hour for authenticated users
+    RESET_MARGIN = 1  # seconds to wait after a reset time
+    UNKNOWN_RESET_WAIT = 60  # seconds to wait when the reset time is unknown
+
+    def __init__(self, tokens, limit=RATE_LIMIT):
+        if not tokens:
+            raise ValueError("At least one token is needed")
+
+        self.usage = [TokenUsage(token, limit) for token in tokens]
+        self.waiting_time = 0  # seconds waited for rate limit resets
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.usage)
+
+    def acquire(self):
+        """ Return the token with more remaining requests.
+
+        If all the tokens are exhausted it waits until the first
+        token rate limit is reset.
+        """
+
+        while True:
+            with self._lock:
+                now = time.time()
+                for usage in self.usage:
+                    if usage.reset and usage.reset <= now:
+                        usage.remaining = usage.limit
+                        usage.reset = None
+
+                usage = max(self.usage, key=lambda usage: usage.remaining)
+                if usage.remaining > 0:
+                    # Counted before the response arrives so concurrent
+                    # callers are spread among the tokens
+                    usage.remaining -= 1
+                    usage.requests += 1
+                    return usage.token
+
+                for usage in self.usage:
+                    if not usage.reset:
+                        usage.reset = now + self.UNKNOWN_RESET_WAIT
+                reset = min([usage.reset for usage in self.usage])
+
+                wait = max(reset - now, 0) + self.RESET_MARGIN
+                self.waiting_time += wait
+
+            logger.warning("All tokens exhausted, waiting %i sec for a rate limit reset", wait)
+            time.sleep(wait)
+
+    def update(self, token, headers):
+        """ Update a token rate limit with the headers of a response """
+
+        remaining = headers.get('X-RateLimit-Remaining')
+        if remaining is None:
+            return
+
+        with self._lock:
+            usage = self.__find(token)
+            usage.remaining = int(remaining)
+            if 'X-RateLimit-Limit' in headers:
+                usage.limit = int(headers['X-RateLimit-Limit'])
+            if 'X-RateLimit-Reset' in headers:
+                usage.reset = int(headers['X-RateLimit-Reset'])
+
+        logger.debug("Token %s: %i requests remaining", self.__mask(token), usage.remaining)
+
+    def metrics(self):
+        """ Return the usage of every token, with the tokens masked """
+
+        with self._lock:
+            return [{'token': self.__mask(usage.token),
+                     'requests': usage.requests,
+                     'remaining': usage.remaining,
+                     'limit': usage.limit,
+                     'reset': usage.reset} for usage in self.usage]
+
+    def __find(self, token):
+        for usage in self.usage:
+            if usage.token == token:
+                return usage
+        raise KeyError(self.__mask(token))
+
+    @staticmethod
+    def __mask(token):
+        return token[:4] + '...'
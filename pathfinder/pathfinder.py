@@ -27,15 +27,18 @@ import logging
 import os
 import sys
 
+from fetch.tokens import TokenPool
 from repositories.eclipse import ReposEclipse
-from repositories.gerrit import ReposGerrit
+from repositories.gerrit import ReposGerrit, ReposGerritHosts
 from repositories.github import ReposGitHub
+from repositories.sync import Checkpoints, checkpoint_key, diff_repos
 
 import django
 os.environ['DJANGO_SETTINGS_MODULE'] = 'django_bestiary.settings'
 django.setup()
 
-from projects.models import DataSource, Project, Repository, RepositoryView
+from projects.ingest import ingest_repositories, unlink_repositories
+from projects.models import DataSource, Project
 
 
 logger = logging.getLogger(__name__)
@@ -62,11 +65,20 @@ def get_params():
                         help='Data source to get repositories from',
                         default='github')
     parser.add_argument('-g', '--debug', action='store_true')
-    parser.add_argument('-t', '--token', help="Auth token")
+    parser.add_argument('-t', '--token', nargs='+',
+                        help="Auth tokens. Requests are spread among them by rate limit")
     parser.add_argument('-o', '--owner', help='GitHub owner to get repos from')
-    parser.add_argument('--host', help="repositories server host")
+    parser.add_argument('--host', nargs='+', help="repositories server hosts")
+    parser.add_argument('--cache-dir',
+                        help="Dir to cache the Eclipse projects and their index")
+    parser.add_argument('--rest', action='store_true',
+                        help="Use the gerrit REST API instead of ssh")
     parser.add_argument('-u', '--user', help="User for accessing the repositories host")
     parser.add_argument('-p', '--project', help="Import repositories to project in Bestiary")
+    parser.add_argument('-s', '--sync', dest='checkpoints_file',
+                        help="Sync only the changes since the checkpoint stored in this file")
+    parser.add_argument('--full', action='store_true',
+                        help="In sync mode, list all the repositories to detect the removed ones")
 
     args = parser.parse_args()
 
@@ -78,66 +90,107 @@ def get_params():
         parser.error("github backend needs token and owner.")
         sys.exit(1)
 
-    if args.backend == 'gerrit' and (not args.host or not args.user):
-        parser.error("gerrit backend needs host and user.")
+    if args.backend == 'gerrit' and (not args.host or not (args.user or args.rest)):
+        parser.error("gerrit backend needs host and user (optional with --rest).")
         sys.exit(1)
 
     return args
 
 
+def build_repos(backend, data_source=None, owner=None, tokens=None, hosts=None,
+                user=None, rest=False, cache_dir=None):
+    """ Build the Repos for a backend with its params """
+
+    if backend == 'github':
+        repos = ReposGitHub("github.com", owner, tokens)
+    elif backend == 'eclipse':
+        repos = ReposEclipse(data_source, cache_dir=cache_dir)
+    elif backend == 'gerrit':
+        if isinstance(hosts, str):
+            hosts = [hosts]
+        if len(hosts) > 1:
+            repos = ReposGerritHosts(hosts, user, rest=rest)
+        else:
+            repos = ReposGerrit(hosts[0], user, rest=rest)
+    else:
+        raise ValueError("Backend %s not supported" % backend)
+
+    return repos
+
+
+def print_report(report):
+    print("Repositories inserted", report.repositories_inserted)
+    print("Repositories existing", report.repositories_existing)
+    print("Repository views inserted", report.views_inserted)
+    print("Repository views existing", report.views_existing)
+    print("Repository views added to project", report.views_linked)
+
+
+def sync(repos, checkpoints_file, full, data_source, project=None):
+    """ Apply to Bestiary the repositories changes since the last sync """
+
+    checkpoints = Checkpoints(checkpoints_file)
+    key = checkpoint_key(repos)
+
+    diff = diff_repos(repos, checkpoints.get(key), full=full)
+    logger.info("%s: %i repositories added, %i removed (%s)", key,
+                len(diff.added), len(diff.removed),
+                "incremental" if diff.incremental else "full")
+
+    if project:
+        print_report(ingest_repositories(diff.added, data_source, project=project))
+        nremoved = unlink_repositories(diff.removed, data_source, project)
+        print("Repository views removed from project", nremoved)
+    else:
+        for repo_id in diff.added:
+            print("+", repo_id)
+        for repo_id in diff.removed:
+            print("-", repo_id)
+
+    # Only once the changes are applied the checkpoint is moved forward
+    checkpoints.set(key, diff.checkpoint)
+    checkpoints.dump()
+
+
 if __name__ == '__main__':
 
     args = get_params()
 
     config_logging(args.debug)
 
+    tokens = TokenPool(args.token) if args.token else None
+
     # Retrieve all the repositories
-    if args.backend == 'github':
-        repos = ReposGitHub("github.com", args.owner, args.token)
-    elif args.backend == 'eclipse':
-        repos = ReposEclipse(args.data_source)
-    elif args.backend == 'gerrit':
-        repos = ReposGerrit(args.host, args.user)
-    else:
-        logger.error("Backend %s not supported", args.backend)
+    try:
+        repos = build_repos(args.backend, data_source=args.data_source, owner=args.owner,
+                            tokens=tokens, hosts=args.host, user=args.user, rest=args.rest,
+                            cache_dir=args.cache_dir)
+    except ValueError as ex:
+        logger.error(ex)
         sys.exit(1)
 
-    project_orm = None
-    if args.project:
-        # Try to find the project in bestiary
-        try:
-            project_orm = Project.objects.get(name=args.project)
-            logger.debug('%s found in Bestiary', project_orm)
-            logger.debug('Adding repositories to project %s', project_orm)
-        except Project.DoesNotExist:
-            logger.error("Can not find project %s", args.project)
-            logger.error("The project must already exists in Beastiary")
-            sys.exit(1)
-
-    for repo in repos.get_ids():
-        if not args.project:
-            print(repo)
-        else:
-            try:
-                ds_orm = DataSource.objects.get(name=args.data_source)
-            except DataSource.DoesNotExist:
-                logger.error("The data source %s does not exists in Bestiary", args.data_source)
-                sys.exit(1)
-            try:
-                rep = Repository(name=repo, data_source=ds_orm)
-                rep.save()
-            except django.db.utils.IntegrityError:
-                logger.debug('Repository already exists %s', repo)
-                rep = Repository.objects.get(name=repo, data_source=ds_orm)
-            try:
-                # Don't support filters yet
-                rep_view = RepositoryView(rep=rep, filters='')
-                rep_view.save()
-            except django.db.utils.IntegrityError:
-                logger.debug('Repository View already exists %s', repo)
-                rep_view = RepositoryView.objects.get(rep=rep, filters='')
-
-            project_orm.rep_views.add(rep_view)
-
-    if args.project:
-        project_orm.save()
+    # The project must exist before adding repositories to it
+    if args.project and not Project.objects.filter(name=args.project).exists():
+        logger.error("Can not find project %s", args.project)
+        logger.error("The project must already exists in Beastiary")
+        sys.exit(1)
+
+    # Repositories are only stored for existing data sources
+    if (args.project or args.checkpoints_file) and \
+            not DataSource.objects.filter(name=args.data_source).exists():
+        logger.error("The data source %s does not exists in Bestiary", args.data_source)
+        sys.exit(1)
+
+    if args.checkpoints_file:
+        sync(repos, args.checkpoints_file, args.full, args.data_source, args.project)
+    elif not args.project:
+        for repo_id in repos.get_ids():
+            print(repo_id)
+    else:
+        logger.debug('Adding repositories to project %s', args.project)
+        print_report(ingest_repositories(repos.get_ids(), args.data_source, project=args.project))
+
+    if tokens:
+        for usage in tokens.metrics():
+            logger.debug("Token %s: %i requests, %i remaining", usage['token'],
+                         usage['requests'], usage['remaining'])
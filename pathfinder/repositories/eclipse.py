@@ -23,25 +23,53 @@
 #
 
 import logging
+import os
 
-
-from VizGrimoireUtils.eclipse.eclipse_projects_lib import (
-    get_repos_list,
-    get_project_repos)
-
-from .repositories import Repos
+from .repositories import Repos, RepoRecord
 from fetch.eclipse import EclipseFetcher
 
 logger = logging.getLogger(__name__)
 
 
+def build_index(eclipse_projects, data_sources):
+    """ Index the repositories of the Eclipse projects by data source.
+
+    The projects are scanned just once for all the data sources.
+
+    :returns: a dict with the repositories of each data source and
+        the repositories of each data source in each project
+    """
+
+    from VizGrimoireUtils.eclipse.eclipse_projects_lib import get_project_repos
+
+    index = {
+        'data_sources': {data_source: [] for data_source in data_sources},
+        'projects': {}
+    }
+
+    for project in eclipse_projects:
+        index['projects'][project] = {}
+        for data_source in data_sources:
+            repos = get_project_repos(project, eclipse_projects, data_source)
+            index['projects'][project][data_source] = repos
+            index['data_sources'][data_source] += repos
+
+    return index
+
+
 class ReposEclipse(Repos):
-    """ Get the list of repositories from Eclipse projects remote JSON file """
+    """ Get the list of repositories from Eclipse projects remote JSON file
+
+    The repositories are looked up in an index built once per download
+    of the projects. With a cache dir, both the download and the index
+    are stored in it so later runs can skip downloading and indexing.
+    """
 
     ECLIPSE_PROJECTS_URL = "http://projects.eclipse.org/json/projects/all"
     ECLIPSE_DATA_SOURCES = ['its', 'mls', 'scm', 'scr']
+    INDEX_FILE = "eclipse-projects-index.json"
 
-    def __init__(self, data_source='git'):
+    def __init__(self, data_source='git', cache_dir=None):
         self.data_source = data_source
         if data_source == 'git':
             self.data_source = 'scm'
@@ -50,23 +78,32 @@ class ReposEclipse(Repos):
         if self.data_source not in self.ECLIPSE_DATA_SOURCES:
             raise RuntimeError("Data source does not exists in Eclipse", data_source)
 
-        self.eclipse_projects = EclipseFetcher().fetch()
+        self.index = self.__load_index(EclipseFetcher(cache_dir=cache_dir))
+
+    def __load_index(self, fetcher):
+        index = fetcher.load(self.INDEX_FILE)
 
-    def get_ids(self):
-        repo_list = self.get_repos()
-        repo_ids_list = [self.get_id(repo) for repo in repo_list]
+        if index is not None:
+            # The index must not be older than the projects it indexes
+            projects_path = fetcher.cache_path(fetcher.CACHE_FILE)
+            index_path = fetcher.cache_path(self.INDEX_FILE)
+            if not os.path.exists(projects_path) or \
+               os.path.getmtime(projects_path) <= os.path.getmtime(index_path):
+                logger.debug("Using Eclipse projects index cached in %s", fetcher.cache_dir)
+                return index
 
-        return repo_ids_list
+        index = build_index(fetcher.fetch(), self.ECLIPSE_DATA_SOURCES)
+        fetcher.save(self.INDEX_FILE, index)
 
-    def get_id(self, repo):
-        return repo
+        return index
 
     def get_repos(self):
         """ Get the repository list for a data sources for all projects """
-        return get_repos_list(self.eclipse_projects, self.data_source)
+        for repo in self.index['data_sources'][self.data_source]:
+            yield RepoRecord(repo, repo, False, None)
 
     def get_projects(self):
-        return list(self.eclipse_projects.keys())
+        return list(self.index['projects'].keys())
 
     def get_project_repos_id(self, project):
-        return get_project_repos(project, self.eclipse_projects, self.data_source)
+        return self.index['projects'][project][self.data_source]
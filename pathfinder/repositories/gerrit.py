@@ -23,32 +23,112 @@
 #
 
 import logging
+import queue
+import threading
 
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
-from .repositories import Repos
-from fetch.gerrit import GerritFetcher
+from .repositories import Repos, RepoRecord
+from fetch.gerrit import GerritFetcher, GerritRestFetcher
 
 logger = logging.getLogger(__name__)
 
+# Queued by a host after its records, with the exception if it failed
+HostDone = namedtuple('HostDone', ['host', 'nrepos', 'error'])
+
 
 class ReposGerrit(Repos):
-    """ Get the list of repositories from Gerrit """
+    """ Get the list of repositories from Gerrit
+
+    The projects are listed with the ssh API by default, or with
+    the REST API if rest is enabled (i.e. when ssh is not available).
+    """
+
+    def __init__(self, host, user, rest=False, url=None, password=None, ssh_cmd='ssh'):
+        super().__init__(host, user=user, password=password)
+        self.rest = rest
+        self.url = url
+        self.ssh_cmd = ssh_cmd
+
+    def get_repos(self):
+        """ Get the repository list for a data sources for all projects """
+
+        if self.rest:
+            fetcher = GerritRestFetcher(self.host, user=self.user, password=self.password, url=self.url)
+        else:
+            fetcher = GerritFetcher(self.host, self.user, ssh_cmd=self.ssh_cmd)
+
+        for project in fetcher.fetch():
+            repo = 'https://' + self.host + '/r/' + project
+            yield RepoRecord(repo, repo, False, None)
+
 
-    def __init__(self, host, user):
-        super().__init__(host, user=user)
+class ReposGerritHosts(Repos):
+    """ Get the list of repositories from several Gerrit hosts concurrently
 
-    def get_ids(self):
-        repo_list = self.get_repos()
-        repo_ids_list = [self.get_id(repo) for repo in repo_list]
+    The records of the hosts are passed to the consumer through a bounded
+    queue: at most queue_size records are kept in memory whatever the size
+    of the hosts, at the price of the fetchers waiting while the consumer
+    is busy (i.e. ingesting a batch).
+    """
 
-        return repo_ids_list
+    MAX_WORKERS = 8
+    QUEUE_SIZE = 1000  # records waiting to be consumed before the hosts are blocked
 
-    def get_id(self, repo):
-        return repo
+    def __init__(self, hosts, user, max_workers=MAX_WORKERS, queue_size=QUEUE_SIZE, **kwargs):
+        super().__init__(",".join(hosts), user=user)
+        self.hosts = [ReposGerrit(host, user, **kwargs) for host in hosts]
+        self.max_workers = max_workers
+        self.queue_size = queue_size
 
     def get_repos(self):
-        """ Get the repository list for a data sources for all projects """
-        projects_raw = GerritFetcher(self.host, self.user).fetch()
-        projects = projects_raw.split("\n")
-        repos = ['https://' + self.host + '/r/' + project for project in projects]
-        return repos
+        """ Get the repositories of all the hosts, as they are fetched """
+
+        records = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for repos in self.hosts:
+                executor.submit(self._fetch_host, repos, records, stop)
+
+            try:
+                running = len(self.hosts)
+                while running:
+                    record = records.get()
+                    if isinstance(record, HostDone):
+                        running -= 1
+                        if record.error:
+                            raise record.error
+                        logger.debug("%i repositories found in %s", record.nrepos, record.host)
+                    else:
+                        yield record
+            finally:
+                # The fetchers still running are stopped if the consumer
+                # fails, stops early or a host fails
+                stop.set()
+
+    @staticmethod
+    def _fetch_host(repos, records, stop):
+        nrepos = 0
+        error = None
+        try:
+            for record in repos.get_repos():
+                if not _put(records, record, stop):
+                    return
+                nrepos += 1
+        except Exception as ex:
+            error = ex
+        _put(records, HostDone(repos.host, nrepos, error), stop)
+
+
+def _put(records, record, stop):
+    """ Queue a record waiting for room, unless the consumer is stopped """
+
+    while not stop.is_set():
+        try:
+            records.put(record, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
@@ -25,7 +25,7 @@
 import logging
 
 
-from .repositories import Repos
+from .repositories import Repos, RepoRecord
 from fetch.github import GitHubFetcher
 
 logger = logging.getLogger(__name__)
@@ -34,24 +34,21 @@ logger = logging.getLogger(__name__)
 class ReposGitHub(Repos):
     """ Get the list of repositories from a GitHub owner """
 
+    incremental = True
+
     def __init__(self, host, owner, api_token):
         super().__init__(host, user=owner, api_token=api_token)
 
-    def get_ids(self):
-        repo_list = self.get_repos()
-        repo_ids_list = [self.get_id(repo) for repo in repo_list]
-
-        return repo_ids_list
-
-    def get_id(self, repo):
-        return repo['html_url']
+    def get_repos(self):
+        """ Get the repositories of the owner as they are fetched """
 
-    def get_is_fork(self, repo):
-        return repo['fork']
+        return self.get_updated_repos(None)
 
-    def get_repos(self):
-        """ Get the repository list for all the owners """
+    def get_updated_repos(self, since):
+        """ Get the repositories of the owner updated from since """
 
-        repos = GitHubFetcher(self.host, api_token=self.api_token).fetch(self.user)
+        fetcher = GitHubFetcher(self.host, api_token=self.api_token)
 
-        return repos
+        for repo in fetcher.fetch(self.user, since=since):
+            yield RepoRecord(repo['html_url'], repo['clone_url'],
+                             repo['fork'], repo['updated_at'])
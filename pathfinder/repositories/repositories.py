@@ -25,10 +25,22 @@
 
 import logging
 
+from collections import namedtuple
+
 logger = logging.getLogger(__name__)
 
 
+# Compact record with the only repository fields used by pathfinder.
+# The raw data returned by the services (~100 fields per repository
+# in GitHub) is discarded as soon as the record is built.
+RepoRecord = namedtuple('RepoRecord', ['id', 'url', 'fork', 'updated_at'])
+
+
 class Repos():
+
+    # Whether the backend can list only the repositories updated recently
+    incremental = False
+
     def __init__(self, host, user=None, password=None, api_token=None, data_source=None):
         self.host = host
         self.user = user
@@ -37,20 +49,28 @@ class Repos():
         self.data_source = data_source
 
     def get_repos(self, data_source=None):
-        """ Return a generator of repositories """
+        """ Return a generator of RepoRecord """
         raise NotImplementedError
 
+    def get_updated_repos(self, since):
+        """ Return a generator of RepoRecord updated from since.
+
+        Backends that are not incremental return all the repositories.
+        """
+        return self.get_repos()
+
     def get_ids(self):
         """ Return a generator of repositories ids """
-        raise NotImplementedError
+        for repository in self.get_repos():
+            yield self.get_id(repository)
 
     def get_id(self, repository):
         """ Return the id for a repository """
-        raise NotImplementedError
+        return repository.id
 
     def is_fork(self, repository):
         """ Return if a repository is a fork """
-        return False
+        return repository.fork
 
     def get_projects(self):
         """ Return a list with the projects available """
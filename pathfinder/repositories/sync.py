@@ -0,0 +1,142 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from collections import namedtuple
+from datetime import datetime
+
+
+logger = logging.getLogger(__name__)
+
+
+# Repositories added and removed since the last sync. The new checkpoint
+# must be stored once the changes have been applied.
+ReposDiff = namedtuple('ReposDiff', ['added', 'removed', 'incremental', 'checkpoint'])
+
+
+class Checkpoints():
+    """ Per source sync checkpoints stored in a JSON file
+
+    Each checkpoint includes the last run time, the newest update date
+    seen in the repositories, the hash of the repositories list and the
+    list itself, needed to find out the removed repositories.
+    """
+
+    def __init__(self, checkpoints_file):
+        self.checkpoints_file = checkpoints_file
+        self.checkpoints = {}
+        if os.path.exists(self.checkpoints_file):
+            with open(self.checkpoints_file, "r") as fcheckpoints:
+                self.checkpoints = json.load(fcheckpoints)
+
+    def get(self, key):
+        return self.checkpoints.get(key)
+
+    def set(self, key, checkpoint):
+        self.checkpoints[key] = checkpoint
+
+    def dump(self):
+        # Write to a temporal file and rename it so the checkpoints
+        # are never left half written
+        dirname = os.path.dirname(os.path.abspath(self.checkpoints_file))
+        with tempfile.NamedTemporaryFile("w", dir=dirname, delete=False) as fcheckpoints:
+            json.dump(self.checkpoints, fcheckpoints, sort_keys=True, indent=4)
+        os.replace(fcheckpoints.name, self.checkpoints_file)
+
+        logger.debug("Checkpoints file updated %s", self.checkpoints_file)
+
+
+def checkpoint_key(repos):
+    """ Key identifying the source of a Repos in the checkpoints """
+
+    fields = [repos.__class__.__name__, repos.host, repos.user, repos.data_source]
+    return ":".join([field for field in fields if field])
+
+
+def repos_hash(repos_ids):
+    """ Hash of a repositories list, independent of its order """
+
+    repos_sha = hashlib.sha1()
+    for repo_id in sorted(repos_ids):
+        repos_sha.update(repo_id.encode('utf-8'))
+        repos_sha.update(b'\n')
+    return repos_sha.hexdigest()
+
+
+def diff_repos(repos, checkpoint=None, full=False):
+    """ Find the repositories added and removed since a checkpoint.
+
+    Incremental backends only ask for the repositories updated since
+    the newest update in the checkpoint, so removed repositories are
+    only detected in full runs. In full runs the repositories hash is
+    compared first so unchanged sources are solved without diffing.
+
+    :param repos: Repos to get the repositories from
+    :param checkpoint: checkpoint of the last sync, None if there is none
+    :param full: ignore the checkpoint and list all the repositories
+    :returns: a ReposDiff with the changes and the new checkpoint
+    """
+
+    known = set(checkpoint['repos']) if checkpoint else set()
+    last_updated = checkpoint.get('last_updated') if checkpoint else None
+    incremental = repos.incremental and bool(last_updated) and not full
+
+    if incremental:
+        records = repos.get_updated_repos(last_updated)
+    else:
+        records = repos.get_repos()
+
+    current = set()
+    for record in records:
+        current.add(record.id)
+        if record.updated_at and (not last_updated or record.updated_at > last_updated):
+            last_updated = record.updated_at
+
+    if incremental:
+        added = current - known
+        removed = set()
+        current |= known
+        current_hash = repos_hash(current)
+    else:
+        current_hash = repos_hash(current)
+        if checkpoint and current_hash == checkpoint['hash']:
+            logger.debug("No changes in the repositories since %s", checkpoint['last_run'])
+            added = removed = set()
+        else:
+            added = current - known
+            removed = known - current
+
+    new_checkpoint = {
+        'last_run': datetime.utcnow().isoformat(),
+        'last_updated': last_updated,
+        'hash': current_hash,
+        'repos': sorted(current)
+    }
+
+    return ReposDiff(sorted(added), sorted(removed), incremental, new_checkpoint)
@@ -0,0 +1,235 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+#
+#
+# Copyright (C) 2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA 02111-1307, USA.
+#
+# Authors:
+#   Alvaro del Castillo San Felix <acs@bitergia.com>
+#
+
+""" Run many discovery jobs described in a config file in one process
+
+Discovery is done by a pool of threads, and the repositories found are
+streamed, in batches, to the main thread which is the only one writing
+to Bestiary, so there is no contention in the database.
+
+Config file sample:
+
+{
+    "workers": 4,
+    "github_tokens": ["XXXXXX", "YYYYYY"],
+    "checkpoints": "checkpoints.json",
+    "jobs": [
+        {"backend": "github", "owner": "grimoirelab",
+         "project": "grimoirelab", "data_source": "github"},
+        {"backend": "gerrit", "host": "git.eclipse.org", "user": "gerrit_user",
+         "project": "eclipse", "data_source": "gerrit"},
+        {"backend": "eclipse", "eclipse_data_source": "scm", "cache_dir": "/tmp/eclipse",
+         "project": "eclipse", "data_source": "git"}
+    ]
+}
+
+With "checkpoints" the jobs are run in sync mode (see pathfinder.py --sync).
+The checkpoints file is written after each job, once its repositories are
+written to Bestiary, so the jobs already done are kept if the run fails.
+"""
+
+import argparse
+import json
+import logging
+import queue
+import sys
+
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+from fetch.tokens import TokenPool
+from repositories.sync import Checkpoints, checkpoint_key, diff_repos
+
+from pathfinder import build_repos, config_logging
+
+from projects.ingest import batches, ingest_repositories, unlink_repositories
+from projects.models import Project
+
+
+logger = logging.getLogger(__name__)
+
+WORKERS = 4
+QUEUE_SIZE = 100  # batches waiting to be written before the workers are blocked
+
+ADD = 'add'
+REMOVE = 'remove'
+DONE = 'done'
+
+
+def get_params():
+    """Parse command line arguments"""
+
+    parser = argparse.ArgumentParser(description="Run the discovery jobs in a config file")
+
+    parser.add_argument('-c', '--config', required=True, help="JSON file with the jobs")
+    parser.add_argument('-g', '--debug', action='store_true')
+    parser.add_argument('-r', '--report', help="JSON file to write the jobs timing report")
+    parser.add_argument('-w', '--workers', type=int, help="Number of discovery threads")
+    parser.add_argument('--full', action='store_true',
+                        help="In sync mode, list all the repositories to detect the removed ones")
+
+    return parser.parse_args()
+
+
+def job_name(job):
+    fields = [job['backend'], job.get('owner'), job.get('host'), job.get('eclipse_data_source'),
+              job.get('project')]
+    return ":".join([str(field) for field in fields if field])
+
+
+def discover(njob, job, results, tokens, checkpoints, full):
+    """ Discover the repositories of a job and queue them to be ingested.
+
+    The new checkpoint of the job in sync mode is queued with DONE.
+    """
+
+    task_init = time()
+
+    repos = build_repos(job['backend'],
+                        data_source=job.get('eclipse_data_source', job['data_source']),
+                        owner=job.get('owner'), tokens=tokens,
+                        hosts=job.get('host'), user=job.get('user'),
+                        rest=job.get('rest', False), cache_dir=job.get('cache_dir'))
+
+    checkpoint = None
+
+    if checkpoints:
+        key = checkpoint_key(repos)
+        diff = diff_repos(repos, checkpoints.get(key), full=full)
+        results.put((njob, ADD, diff.added))
+        results.put((njob, REMOVE, diff.removed))
+        checkpoint = (key, diff.checkpoint)
+    else:
+        for batch in batches(repos.get_ids()):
+            results.put((njob, ADD, batch))
+
+    results.put((njob, DONE, (time() - task_init, checkpoint)))
+
+
+def write(job, action, repos_ids, report):
+    """ Write in Bestiary a batch of repositories of a job """
+
+    task_init = time()
+
+    if action == ADD:
+        ingested = ingest_repositories(repos_ids, job['data_source'], project=job['project'])
+        for field, value in ingested._asdict().items():
+            report[field] += value
+        report['repositories'] += len(repos_ids)
+    else:
+        report['views_unlinked'] += unlink_repositories(repos_ids, job['data_source'], job['project'])
+
+    report['ingestion_time'] += time() - task_init
+
+
+def run(config, workers=None, full=False):
+    """ Run all the jobs in a config, returning a report for each one """
+
+    jobs = config['jobs']
+    workers = workers or config.get('workers', WORKERS)
+
+    tokens = TokenPool(config['github_tokens']) if config.get('github_tokens') else None
+    checkpoints = Checkpoints(config['checkpoints']) if config.get('checkpoints') else None
+
+    reports = []
+    for job in jobs:
+        report = dict.fromkeys(['repositories', 'repositories_inserted', 'repositories_existing',
+                                'views_inserted', 'views_existing', 'views_linked',
+                                'views_unlinked', 'discovery_time', 'ingestion_time'], 0)
+        report.update({'job': job_name(job), 'status': 'ok'})
+        reports.append(report)
+
+        if not Project.objects.filter(name=job['project']).exists():
+            report['status'] = "Project %s not found in Bestiary" % job['project']
+
+    pending = [njob for njob, report in enumerate(reports) if report['status'] == 'ok']
+    results = queue.Queue(maxsize=QUEUE_SIZE)
+    task_init = time()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(discover, njob, jobs[njob], results, tokens, checkpoints, full): njob
+                   for njob in pending}
+
+        running = set(pending)
+        while running:
+            try:
+                njob, action, data = results.get(timeout=1)
+            except queue.Empty:
+                # Jobs failed before finishing don't queue DONE
+                for future, njob in futures.items():
+                    if njob in running and future.done() and future.exception():
+                        reports[njob]['status'] = "Error: %s" % future.exception()
+                        running.discard(njob)
+                continue
+
+            if action == DONE:
+                reports[njob]['discovery_time'], checkpoint = data
+                running.discard(njob)
+                if checkpoint and reports[njob]['status'] == 'ok':
+                    checkpoints.set(*checkpoint)
+                    checkpoints.dump()
+            elif reports[njob]['status'] == 'ok':
+                try:
+                    write(jobs[njob], action, data, reports[njob])
+                except Exception as ex:
+                    logger.error("Can't write %s repositories: %s", reports[njob]['job'], ex)
+                    reports[njob]['status'] = "Error: %s" % ex
+
+    logger.info("%i jobs run in %.2f sec", len(jobs), time() - task_init)
+    if tokens:
+        for usage in tokens.metrics():
+            logger.info("Token %s: %i requests, %i remaining", usage['token'],
+                        usage['requests'], usage['remaining'])
+
+    return reports
+
+
+def main():
+    args = get_params()
+
+    config_logging(args.debug)
+
+    with open(args.config) as fconfig:
+        config = json.load(fconfig)
+
+    reports = run(config, workers=args.workers, full=args.full)
+
+    print("%-40s %8s %8s %8s %8s %10s %10s  %s" % ("Job", "Repos", "Inserted", "Linked", "Unlinked",
+                                                   "Discovery", "Ingestion", "Status"))
+    for report in reports:
+        print("%-40s %8i %8i %8i %8i %10.2f %10.2f  %s" % (report['job'][:40], report['repositories'],
+                                                           report['repositories_inserted'],
+                                                           report['views_linked'], report['views_unlinked'],
+                                                           report['discovery_time'], report['ingestion_time'],
+                                                           report['status']))
+
+    if args.report:
+        with open(args.report, "w") as freport:
+            json.dump(reports, freport, indent=4, sort_keys=True)
+
+    sys.exit(any([report['status'] != 'ok' for report in reports]))
+
+
+if __name__ == '__main__':
+    main()
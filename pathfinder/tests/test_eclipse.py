@@ -20,7 +20,11 @@
 #     Alvaro del Castillo <acs@bitergia.com>
 #
 
+import json
+import os
+import shutil
 import sys
+import tempfile
 import unittest
 
 import httpretty
@@ -104,7 +108,7 @@ class ReposEclipseTest(unittest.TestCase):
 
         for ds in self.repos_ds:
             repos = ReposEclipse(ds)
-            repos_list = repos.get_repos()
+            repos_list = list(repos.get_repos())
             self.assertEqual(len(repos_list), self.repos_ds[ds])
 
     @httpretty.activate
@@ -113,7 +117,7 @@ class ReposEclipseTest(unittest.TestCase):
 
         for ds in self.repos_ds:
             repos = ReposEclipse(ds)
-            repos_ids_list = repos.get_ids()
+            repos_ids_list = list(repos.get_ids())
             self.assertEqual(len(repos_ids_list), self.repos_ds[ds])
 
     @httpretty.activate
@@ -128,5 +132,51 @@ class ReposEclipseTest(unittest.TestCase):
             self.assertEqual(len(repos_ds), self.repos_ds_webtools[ds])
 
 
+class ReposEclipseCacheTest(unittest.TestCase):
+    """ReposEclipse cached index tests"""
+
+    index = {
+        "data_sources": {
+            "its": ["https://bugs.eclipse.org/bugs/buglist.cgi?product=WTP"],
+            "mls": [],
+            "scm": ["http://git.eclipse.org/gitroot/jgit/jgit.git",
+                    "http://git.eclipse.org/gitroot/webtools/webtools.git"],
+            "scr": []
+        },
+        "projects": {
+            "technology.jgit": {
+                "its": [], "mls": [], "scr": [],
+                "scm": ["http://git.eclipse.org/gitroot/jgit/jgit.git"]
+            },
+            "webtools": {
+                "mls": [], "scr": [],
+                "its": ["https://bugs.eclipse.org/bugs/buglist.cgi?product=WTP"],
+                "scm": ["http://git.eclipse.org/gitroot/webtools/webtools.git"]
+            }
+        }
+    }
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix='pathfinder_')
+        index_path = os.path.join(self.cache_dir, ReposEclipse.INDEX_FILE)
+        with open(index_path, 'w') as findex:
+            json.dump(self.index, findex)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    @httpretty.activate(allow_net_connect=False)
+    def test_cached_index(self):
+        """Test whether a cached index is used without downloading the projects"""
+
+        repos = ReposEclipse("git", cache_dir=self.cache_dir)
+
+        self.assertEqual(len(httpretty.latest_requests()), 0)
+        self.assertListEqual(list(repos.get_ids()), self.index['data_sources']['scm'])
+        self.assertListEqual(repos.get_projects(), ['technology.jgit', 'webtools'])
+        self.assertListEqual(repos.get_project_repos_id('webtools'),
+                             ["http://git.eclipse.org/gitroot/webtools/webtools.git"])
+
+
 if __name__ == "__main__":
     unittest.main(warnings='ignore')
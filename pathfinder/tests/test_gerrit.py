@@ -20,20 +20,80 @@
 #     Alvaro del Castillo <acs@bitergia.com>
 #
 
+import io
+import json
+import os
+import shutil
+import stat
 import sys
+import tempfile
+import threading
 import unittest
 
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
 # Hack to make sure that tests import the right packages
 # due to setuptools behaviour
 sys.path.insert(0, '..')
 
-from repositories.gerrit import ReposGerrit
+from fetch.gerrit import GerritFetcher, GerritRestFetcher, iter_json_object
+from repositories.gerrit import ReposGerrit, ReposGerritHosts
 
 GERRIT_USER = 'adelcastillo'
 GERRIT_HOST = 'git.eclipse.org'
 
 TOTAL_REPOS = 1053
 
+# Fake ssh command: logs its arguments and prints the projects of the host
+FAKE_SSH = """#!%s
+import json
+import sys
+
+host = sys.argv[sys.argv.index('gerrit') - 1].split('@')[1]
+with open(sys.argv[0] + '.log', 'a') as flog:
+    flog.write(' '.join(sys.argv[1:]) + '\\n')
+if host == 'broken':
+    sys.stderr.write('Connection refused')
+    sys.exit(255)
+if host == 'truncated':
+    sys.stdout.write('{"a": {"id": "a"}, "b": {"i')
+    sys.exit(0)
+projects = dict((host + '/project-' + str(i), {'state': 'ACTIVE'}) for i in range(%i))
+print(json.dumps(projects, indent=2))
+"""
+FAKE_SSH_PROJECTS = 150
+
+REST_PROJECTS = ['project-%04i' % i for i in range(1203)]
+
+
+class GerritRestHandler(BaseHTTPRequestHandler):
+    """Local stand-in of the gerrit REST API"""
+
+    requests = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.requests.append(self.path)
+
+        if url.path != '/projects/':
+            self.send_error(404)
+            return
+
+        start = int(query['S'][0])
+        limit = int(query['n'][0])
+        projects = dict((name, {'state': 'ACTIVE'}) for name in REST_PROJECTS[start:start + limit])
+        body = ")]}'\n" + json.dumps(projects)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body.encode('utf8'))
+
+    def log_message(self, *args):
+        pass
+
 
 class ReposEclipseTest(unittest.TestCase):
 
@@ -49,11 +109,142 @@ class ReposEclipseTest(unittest.TestCase):
 
     def test_get_repos(self):
         repos = ReposGerrit(GERRIT_HOST, GERRIT_USER)
-        repos_list = repos.get_repos()
+        repos_list = list(repos.get_repos())
         print(repos_list)
         # This number changes. We must read from a cache
         self.assertEqual(len(repos_list), TOTAL_REPOS)
 
 
+class JSONStreamTest(unittest.TestCase):
+    """iter_json_object tests"""
+
+    def test_items(self):
+        data = {'a': {'id': 'a', 'state': 'ACTIVE'}, 'b/c': {}, 'd': [1, 2], 'e': 10, 'f': None}
+        raw = json.dumps(data, indent=4)
+
+        # Small chunks so items are split between reads
+        for chunk_size in [1, 3, 7, 1024]:
+            items = list(iter_json_object(io.StringIO(raw), chunk_size=chunk_size))
+            self.assertListEqual(items, list(data.items()))
+
+        self.assertListEqual(list(iter_json_object(io.StringIO(' { } '))), [])
+
+    def test_truncated(self):
+        items = iter_json_object(io.StringIO('{"a": {"id": "a"}, "b": {"i'), chunk_size=4)
+        self.assertTupleEqual(next(items), ('a', {'id': 'a'}))
+        with self.assertRaises(ValueError):
+            next(items)
+
+
+class GerritFetcherTest(unittest.TestCase):
+    """Gerrit ssh fetcher tests using a fake ssh command"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='pathfinder_')
+        self.ssh_cmd = os.path.join(self.tmp_path, 'ssh')
+        with open(self.ssh_cmd, 'w') as fssh:
+            fssh.write(FAKE_SSH % (sys.executable, FAKE_SSH_PROJECTS))
+        os.chmod(self.ssh_cmd, stat.S_IRWXU)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def read_ssh_log(self):
+        with open(self.ssh_cmd + '.log') as flog:
+            return flog.read().splitlines()
+
+    def test_fetch(self):
+        control_dir = os.path.join(self.tmp_path, 'control')
+        fetcher = GerritFetcher('gerrit.example.com', 'user', ssh_cmd=self.ssh_cmd,
+                                control_dir=control_dir)
+        projects = list(fetcher.fetch())
+
+        self.assertEqual(len(projects), FAKE_SSH_PROJECTS)
+        self.assertEqual(projects[0], 'gerrit.example.com/project-0')
+
+        # The connection is multiplexed
+        cmd = self.read_ssh_log()[0]
+        self.assertIn('-o ControlMaster=auto', cmd)
+        self.assertIn('-o ControlPath=' + control_dir + '/%r@%h:%p', cmd)
+        self.assertTrue(cmd.endswith('user@gerrit.example.com gerrit ls-projects --format json'))
+        self.assertTrue(os.path.isdir(control_dir))
+
+    def test_fetch_error(self):
+        fetcher = GerritFetcher('broken', 'user', ssh_cmd=self.ssh_cmd)
+        fetcher.RETRY_WAIT = 0
+
+        with self.assertRaises(RuntimeError):
+            list(fetcher.fetch())
+        self.assertEqual(len(self.read_ssh_log()), GerritFetcher.MAX_RETRIES)
+
+    def test_fetch_invalid(self):
+        fetcher = GerritFetcher('truncated', 'user', ssh_cmd=self.ssh_cmd)
+
+        # The exit status is 0, but the projects listed are not all of them
+        projects = []
+        with self.assertRaises(RuntimeError):
+            for project in fetcher.fetch():
+                projects.append(project)
+        self.assertListEqual(projects, ['a'])
+
+    def test_hosts(self):
+        hosts = ['gerrit%i.example.com' % i for i in range(5)]
+        repos = ReposGerritHosts(hosts, 'user', max_workers=3, ssh_cmd=self.ssh_cmd)
+        self.assertEqual(repos.host, ','.join(hosts))
+
+        repos_list = list(repos.get_repos())
+        self.assertEqual(len(repos_list), len(hosts) * FAKE_SSH_PROJECTS)
+        self.assertSetEqual(set(repo.id.split('/')[2] for repo in repos_list), set(hosts))
+        self.assertIn('https://gerrit3.example.com/r/gerrit3.example.com/project-7',
+                      [repo.id for repo in repos_list])
+
+    def test_hosts_stream(self):
+        hosts = ['gerrit%i.example.com' % i for i in range(5)]
+        repos = ReposGerritHosts(hosts, 'user', max_workers=3, queue_size=1, ssh_cmd=self.ssh_cmd)
+
+        # The fetchers waiting for room in the queue are stopped
+        records = repos.get_repos()
+        self.assertTrue(next(records).id.startswith('https://gerrit'))
+        records.close()
+
+    def test_hosts_error(self):
+        hosts = ['gerrit0.example.com', 'truncated']
+        repos = ReposGerritHosts(hosts, 'user', ssh_cmd=self.ssh_cmd)
+
+        with self.assertRaises(RuntimeError):
+            list(repos.get_repos())
+
+
+class GerritRestFetcherTest(unittest.TestCase):
+    """Gerrit REST fetcher tests using a local HTTP server"""
+
+    def setUp(self):
+        GerritRestHandler.requests = []
+        self.server = HTTPServer(('127.0.0.1', 0), GerritRestHandler)
+        self.url = 'http://127.0.0.1:%i' % self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_fetch(self):
+        fetcher = GerritRestFetcher('gerrit.example.com', url=self.url, page_size=100, max_workers=4)
+        projects = list(fetcher.fetch())
+
+        self.assertListEqual(projects, REST_PROJECTS)
+        # 13 pages fetched in waves of 4 pages
+        self.assertEqual(len(GerritRestHandler.requests), 16)
+
+    def test_get_repos(self):
+        repos = ReposGerrit('gerrit.example.com', None, rest=True, url=self.url)
+        repos_list = list(repos.get_repos())
+
+        self.assertEqual(len(repos_list), len(REST_PROJECTS))
+        self.assertEqual(repos_list[0].id, 'https://gerrit.example.com/r/project-0000')
+
+
 if __name__ == "__main__":
     unittest.main(warnings='ignore')
@@ -117,9 +117,30 @@ class ReposGitHubTest(unittest.TestCase):
         total_repos = 12
 
         repos = ReposGitHub(self.host, owner=self.owner, api_token=self.api_token)
-        repos_list = repos.get_repos()
+        repos_list = list(repos.get_repos())
         self.assertEqual(len(repos_list), total_repos)
 
+        repo = repos_list[0]
+        self.assertEqual(repo.id, 'https://github.com/grimoirelab/sortinghat')
+        self.assertEqual(repo.url, 'https://github.com/grimoirelab/sortinghat.git')
+        self.assertEqual(repo.updated_at, '2017-03-29T14:14:04Z')
+        self.assertFalse(repos.is_fork(repo))
+
+        forks = [repos.get_id(repo) for repo in repos_list if repos.is_fork(repo)]
+        self.assertListEqual(forks, ['https://github.com/grimoirelab/kibiter'])
+
+    @httpretty.activate
+    def test_get_ids(self):
+        http_requests = setup_http_server()
+
+        repos = ReposGitHub(self.host, owner=self.owner, api_token=self.api_token)
+        repos_ids = repos.get_ids()
+
+        # Ids are generated as the pages arrive, not collected in a list
+        self.assertNotIsInstance(repos_ids, list)
+        self.assertEqual(next(repos_ids), 'https://github.com/grimoirelab/sortinghat')
+        self.assertEqual(len(list(repos_ids)), 11)
+
 
 if __name__ == "__main__":
     unittest.main(warnings='ignore')
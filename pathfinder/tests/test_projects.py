@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+# Authors:
+#     Alvaro del Castillo <acs@bitergia.com>
+#
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+# Hack to make sure that tests import the right packages
+# due to setuptools behaviour
+sys.path.insert(0, '..')
+
+from utils.projects import INDEX_FILE, Projects, shard_projects
+
+
+PROJECTS = {
+    "grimoirelab": {
+        "github": ["https://github.com/grimoirelab/perceval"],
+        "git": ["https://github.com/grimoirelab/perceval.git"]
+    },
+    "chaoss": {
+        "github": ["https://github.com/chaoss/metrics"]
+    }
+}
+
+
+class ProjectsTest(unittest.TestCase):
+    """Projects store tests"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='pathfinder_')
+        self.projects_file = os.path.join(self.tmp_path, 'projects.json')
+        with open(self.projects_file, 'w') as fprojects:
+            json.dump(PROJECTS, fprojects)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def test_update(self):
+        """Test whether repositories are stored sorted and without duplicates"""
+
+        projects = Projects(self.projects_file)
+        projects.update_projects_repos([
+            ('grimoirelab', 'github', ['https://github.com/grimoirelab/sortinghat',
+                                       'https://github.com/grimoirelab/arthur',
+                                       'https://github.com/grimoirelab/sortinghat']),
+            ('chaoss', 'github', ['https://github.com/chaoss/metrics'])
+        ])
+        projects.dump()
+
+        self.assertListEqual(os.listdir(self.tmp_path), ['projects.json'])
+        projects = Projects(self.projects_file)
+        self.assertListEqual(projects.get_project_repos('grimoirelab', 'github'),
+                             ['https://github.com/grimoirelab/arthur',
+                              'https://github.com/grimoirelab/sortinghat'])
+        self.assertListEqual(sorted(projects.get_projects()), ['chaoss', 'grimoirelab'])
+
+        with self.assertRaises(RuntimeError):
+            projects.update_project_repos('unknown', 'github', [])
+
+    def test_atomic_dump(self):
+        """Test whether the projects file is kept when the dump fails"""
+
+        projects = Projects(self.projects_file)
+        projects.update_project_repos('chaoss', 'github', ['https://github.com/chaoss/grimoirelab'])
+
+        with unittest.mock.patch('utils.projects.json.dump', side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                projects.dump()
+
+        self.assertListEqual(os.listdir(self.tmp_path), ['projects.json'])
+        with open(self.projects_file) as fprojects:
+            self.assertDictEqual(json.load(fprojects), PROJECTS)
+
+    def test_sharded(self):
+        """Test whether only the shards of the projects updated are written"""
+
+        projects_dir = os.path.join(self.tmp_path, 'projects')
+        shard_projects(self.projects_file, projects_dir)
+        self.assertListEqual(sorted(os.listdir(projects_dir)),
+                             ['chaoss.json', 'grimoirelab.json', INDEX_FILE])
+
+        projects = Projects(projects_dir)
+        self.assertListEqual(sorted(projects.get_projects()), ['chaoss', 'grimoirelab'])
+        self.assertListEqual(sorted(projects.get_project_data_sources('grimoirelab')), ['git', 'github'])
+
+        mtimes = {shard: os.stat(os.path.join(projects_dir, shard)).st_mtime_ns
+                  for shard in os.listdir(projects_dir)}
+        projects.update_project_repos('chaoss', 'github', ['https://github.com/chaoss/grimoirelab'])
+        projects.dump()
+
+        self.assertNotEqual(os.stat(os.path.join(projects_dir, 'chaoss.json')).st_mtime_ns, mtimes['chaoss.json'])
+        self.assertEqual(os.stat(os.path.join(projects_dir, 'grimoirelab.json')).st_mtime_ns,
+                         mtimes['grimoirelab.json'])
+
+        projects = Projects(projects_dir)
+        self.assertListEqual(projects.get_project_repos('chaoss', 'github'),
+                             ['https://github.com/chaoss/grimoirelab'])
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
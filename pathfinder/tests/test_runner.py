@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+# Authors:
+#     Alvaro del Castillo <acs@bitergia.com>
+#
+
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+import unittest.mock
+
+# Hack to make sure that tests import the right packages
+# due to setuptools behaviour
+sys.path.insert(0, '..')
+sys.path.insert(0, os.path.join('..', '..', 'django_bestiary'))
+
+import runner
+
+from projects.ingest import IngestReport
+from repositories.repositories import Repos, RepoRecord
+
+
+BESTIARY_PROJECTS = ['grimoirelab', 'chaoss']
+
+
+class ReposList(Repos):
+    """ Repos of a host with a fixed list of repositories """
+
+    def __init__(self, host, repos_ids, barrier=None):
+        super().__init__(host)
+        self.repos_ids = repos_ids
+        self.barrier = barrier
+
+    def get_repos(self):
+        if self.barrier:
+            # Only passed if the jobs are run at the same time
+            self.barrier.wait()
+        for repo_id in self.repos_ids:
+            yield RepoRecord(repo_id, repo_id, False, None)
+
+
+class ReposError(Repos):
+
+    def get_repos(self):
+        raise RuntimeError("Connection refused")
+
+
+class RunnerTest(unittest.TestCase):
+    """Runner tests with fake repositories and Bestiary writes"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='pathfinder_')
+        self.checkpoints_file = os.path.join(self.tmp_path, 'checkpoints.json')
+
+        self.repos = {
+            'grimoirelab': ReposList('github.com', ['https://github.com/grimoirelab/perceval',
+                                                    'https://github.com/grimoirelab/arthur']),
+            'chaoss': ReposList('gitlab.com', ['https://gitlab.com/chaoss/metrics']),
+            'broken': ReposError('broken.com')
+        }
+        self.written = []
+
+        patches = [
+            unittest.mock.patch('runner.build_repos', side_effect=self.build_repos),
+            unittest.mock.patch('runner.ingest_repositories', side_effect=self.ingest_repositories),
+            unittest.mock.patch('runner.unlink_repositories', side_effect=self.unlink_repositories),
+            unittest.mock.patch('runner.Project')
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        runner.Project.objects.filter.side_effect = self.filter_projects
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def build_repos(self, backend, owner=None, **kwargs):
+        return self.repos[owner]
+
+    def ingest_repositories(self, repos_ids, data_source, project=None):
+        self.written.append(('add', project, sorted(repos_ids), self.read_checkpoints()))
+        if project == 'chaoss' and 'https://gitlab.com/chaoss/fail' in repos_ids:
+            raise RuntimeError("Database is locked")
+        return IngestReport(len(repos_ids), 0, len(repos_ids), 0, len(repos_ids))
+
+    def unlink_repositories(self, repos_ids, data_source, project):
+        self.written.append(('remove', project, sorted(repos_ids), self.read_checkpoints()))
+        return len(repos_ids)
+
+    @staticmethod
+    def filter_projects(name):
+        projects = unittest.mock.Mock()
+        projects.exists.return_value = name in BESTIARY_PROJECTS
+        return projects
+
+    def read_checkpoints(self):
+        if not os.path.exists(self.checkpoints_file):
+            return []
+        with open(self.checkpoints_file) as fcheckpoints:
+            return sorted(json.load(fcheckpoints))
+
+    @staticmethod
+    def job(owner, project=None):
+        return {'backend': 'github', 'owner': owner, 'project': project or owner, 'data_source': 'github'}
+
+    def test_report(self):
+        config = {'jobs': [self.job('grimoirelab'), self.job('chaoss')]}
+        reports = runner.run(config, workers=2)
+
+        self.assertListEqual([report['job'] for report in reports],
+                             ['github:grimoirelab:grimoirelab', 'github:chaoss:chaoss'])
+        self.assertListEqual([report['status'] for report in reports], ['ok', 'ok'])
+        self.assertListEqual([report['repositories'] for report in reports], [2, 1])
+        self.assertListEqual([report['repositories_inserted'] for report in reports], [2, 1])
+        self.assertListEqual([report['views_linked'] for report in reports], [2, 1])
+        for report in reports:
+            self.assertGreaterEqual(report['discovery_time'], 0)
+            self.assertGreater(report['ingestion_time'], 0)
+
+    def test_errors(self):
+        config = {'jobs': [self.job('grimoirelab'), self.job('broken', project='grimoirelab'),
+                           self.job('chaoss', project='missing')]}
+        reports = runner.run(config, workers=2)
+
+        self.assertEqual(reports[0]['status'], 'ok')
+        self.assertEqual(reports[1]['status'], 'Error: Connection refused')
+        self.assertEqual(reports[2]['status'], 'Project missing not found in Bestiary')
+        # Nothing is discovered for missing projects
+        self.assertListEqual([written[1] for written in self.written], ['grimoirelab'])
+
+    def test_exit_code(self):
+        config_file = os.path.join(self.tmp_path, 'config.json')
+        report_file = os.path.join(self.tmp_path, 'report.json')
+
+        for jobs, exit_code in [([self.job('chaoss')], 0), ([self.job('chaoss'), self.job('broken')], 1)]:
+            with open(config_file, 'w') as fconfig:
+                json.dump({'jobs': jobs}, fconfig)
+            argv = ['runner.py', '-c', config_file, '-r', report_file]
+            with unittest.mock.patch('sys.argv', argv), unittest.mock.patch('sys.stdout'):
+                with self.assertRaises(SystemExit) as context:
+                    runner.main()
+            self.assertEqual(context.exception.code, exit_code)
+
+            with open(report_file) as freport:
+                self.assertEqual(len(json.load(freport)), len(jobs))
+
+    def test_concurrency(self):
+        # Both jobs wait for the other one before listing their repositories
+        barrier = threading.Barrier(2, timeout=10)
+        for owner in ['grimoirelab', 'chaoss']:
+            self.repos[owner].barrier = barrier
+
+        config = {'jobs': [self.job('grimoirelab'), self.job('chaoss')]}
+        reports = runner.run(config, workers=2)
+        self.assertListEqual([report['status'] for report in reports], ['ok', 'ok'])
+
+    def test_checkpoints(self):
+        config = {'jobs': [self.job('grimoirelab'), self.job('chaoss')],
+                  'checkpoints': self.checkpoints_file}
+        keys = ['ReposList:github.com', 'ReposList:gitlab.com']
+
+        # One worker, so the jobs are done in order
+        runner.run(config, workers=1)
+        self.assertListEqual(self.written, [
+            ('add', 'grimoirelab', sorted(self.repos['grimoirelab'].repos_ids), []),
+            ('remove', 'grimoirelab', [], []),
+            ('add', 'chaoss', self.repos['chaoss'].repos_ids, keys[:1]),
+            ('remove', 'chaoss', [], keys[:1])])
+        self.assertListEqual(self.read_checkpoints(), keys)
+
+        # The checkpoint of a job failing to write is not updated
+        self.written = []
+        self.repos['grimoirelab'].repos_ids.append('https://github.com/grimoirelab/sortinghat')
+        self.repos['chaoss'].repos_ids.append('https://gitlab.com/chaoss/fail')
+        reports = runner.run(config, workers=1)
+        self.assertEqual(reports[1]['status'], 'Error: Database is locked')
+        with open(self.checkpoints_file) as fcheckpoints:
+            checkpoints = json.load(fcheckpoints)
+        self.assertIn('https://github.com/grimoirelab/sortinghat', checkpoints[keys[0]]['repos'])
+        self.assertListEqual(checkpoints[keys[1]]['repos'], ['https://gitlab.com/chaoss/metrics'])
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+# Authors:
+#     Alvaro del Castillo <acs@bitergia.com>
+#
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import httpretty
+
+# Hack to make sure that tests import the right packages
+# due to setuptools behaviour
+sys.path.insert(0, '..')
+
+from repositories.github import ReposGitHub
+from repositories.repositories import Repos, RepoRecord
+from repositories.sync import Checkpoints, checkpoint_key, diff_repos
+
+from test_github import setup_http_server
+
+
+class ReposList(Repos):
+    """ Not incremental Repos with a fixed list of repositories """
+
+    def __init__(self, repos_ids):
+        super().__init__('localhost')
+        self.repos_ids = repos_ids
+
+    def get_repos(self):
+        for repo_id in self.repos_ids:
+            yield RepoRecord(repo_id, repo_id, False, None)
+
+
+class SyncTest(unittest.TestCase):
+    """Incremental sync tests"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='pathfinder_')
+        self.checkpoints_file = os.path.join(self.tmp_path, 'checkpoints.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def test_full_diff(self):
+        repos = ReposList(['a', 'b', 'c'])
+        diff = diff_repos(repos)
+        self.assertListEqual(diff.added, ['a', 'b', 'c'])
+        self.assertListEqual(diff.removed, [])
+        self.assertFalse(diff.incremental)
+
+        repos = ReposList(['c', 'd', 'a'])
+        diff = diff_repos(repos, diff.checkpoint)
+        self.assertListEqual(diff.added, ['d'])
+        self.assertListEqual(diff.removed, ['b'])
+        self.assertListEqual(diff.checkpoint['repos'], ['a', 'c', 'd'])
+
+        # The order of the repositories does not change the hash
+        repos = ReposList(['d', 'c', 'a'])
+        checkpoint = diff.checkpoint
+        diff = diff_repos(repos, checkpoint)
+        self.assertListEqual(diff.added, [])
+        self.assertListEqual(diff.removed, [])
+        self.assertEqual(diff.checkpoint['hash'], checkpoint['hash'])
+
+    def test_checkpoints(self):
+        repos = ReposList(['a', 'b'])
+        key = checkpoint_key(repos)
+        self.assertEqual(key, 'ReposList:localhost')
+
+        checkpoints = Checkpoints(self.checkpoints_file)
+        self.assertIsNone(checkpoints.get(key))
+
+        diff = diff_repos(repos, checkpoints.get(key))
+        checkpoints.set(key, diff.checkpoint)
+        checkpoints.dump()
+
+        checkpoints = Checkpoints(self.checkpoints_file)
+        self.assertDictEqual(checkpoints.get(key), diff.checkpoint)
+        self.assertListEqual(os.listdir(self.tmp_path), ['checkpoints.json'])
+
+    @httpretty.activate
+    def test_incremental_github(self):
+        http_requests = setup_http_server()
+
+        repos = ReposGitHub('github.com', 'grimoirelab', 'github_token')
+        checkpoint = {
+            'last_run': '2017-03-29T14:00:00',
+            'last_updated': '2017-03-29T14:13:40Z',
+            'hash': '',
+            'repos': ['https://github.com/grimoirelab/sortinghat',
+                      'https://github.com/grimoirelab/GrimoireELK']
+        }
+
+        diff = diff_repos(repos, checkpoint)
+        self.assertTrue(diff.incremental)
+        self.assertListEqual(diff.added, ['https://github.com/grimoirelab/perceval'])
+        self.assertListEqual(diff.removed, [])
+        self.assertEqual(diff.checkpoint['last_updated'], '2017-04-04T19:45:07Z')
+        self.assertEqual(len(diff.checkpoint['repos']), 3)
+
+        # Repositories are asked sorted by update
+        self.assertDictEqual(http_requests[-1].querystring,
+                             {'per_page': ['100'], 'sort': ['updated'], 'direction': ['desc']})
+
+        diff = diff_repos(repos, checkpoint, full=True)
+        self.assertFalse(diff.incremental)
+        self.assertEqual(len(diff.added), 10)
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+# Authors:
+#     Alvaro del Castillo <acs@bitergia.com>
+#
+
+import sys
+import time
+import unittest
+import unittest.mock
+
+import httpretty
+
+# Hack to make sure that tests import the right packages
+# due to setuptools behaviour
+sys.path.insert(0, '..')
+
+from fetch.tokens import TokenPool
+from repositories.github import ReposGitHub
+
+from test_github import GITHUB_ORG_URL, read_file
+
+
+class TokenPoolTest(unittest.TestCase):
+    """TokenPool tests"""
+
+    def test_initialization(self):
+        tokens = TokenPool(['aaaa1', 'bbbb2'])
+        self.assertEqual(len(tokens), 2)
+
+        with self.assertRaises(ValueError):
+            TokenPool([])
+
+    def test_headroom(self):
+        """Test whether the token with more remaining requests is used"""
+
+        tokens = TokenPool(['aaaa1', 'bbbb2', 'cccc3'])
+        reset = int(time.time()) + 3600
+
+        tokens.update('aaaa1', {'X-RateLimit-Remaining': '10', 'X-RateLimit-Reset': str(reset)})
+        tokens.update('bbbb2', {'X-RateLimit-Remaining': '300', 'X-RateLimit-Reset': str(reset)})
+        tokens.update('cccc3', {'X-RateLimit-Remaining': '20', 'X-RateLimit-Reset': str(reset)})
+
+        self.assertEqual(tokens.acquire(), 'bbbb2')
+
+        tokens.update('bbbb2', {'X-RateLimit-Remaining': '5', 'X-RateLimit-Reset': str(reset)})
+        self.assertEqual(tokens.acquire(), 'cccc3')
+
+        # Responses without rate limit headers are ignored
+        tokens.update('cccc3', {})
+
+        metrics = tokens.metrics()
+        self.assertListEqual([usage['token'] for usage in metrics], ['aaaa...', 'bbbb...', 'cccc...'])
+        self.assertListEqual([usage['requests'] for usage in metrics], [0, 1, 1])
+        self.assertListEqual([usage['remaining'] for usage in metrics], [10, 5, 19])
+
+    def test_reset(self):
+        """Test whether the remaining requests are restored after a reset"""
+
+        tokens = TokenPool(['aaaa1'])
+        tokens.update('aaaa1', {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '3600'})
+
+        self.assertEqual(tokens.acquire(), 'aaaa1')
+        self.assertEqual(tokens.metrics()[0]['remaining'], TokenPool.RATE_LIMIT - 1)
+
+    @unittest.mock.patch('fetch.tokens.time.sleep')
+    def test_exhausted(self, mock_sleep):
+        """Test whether it waits for a reset when all the tokens are exhausted"""
+
+        tokens = TokenPool(['aaaa1', 'bbbb2'])
+        now = time.time()
+
+        tokens.update('aaaa1', {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(int(now) + 100)})
+        tokens.update('bbbb2', {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(int(now) + 50)})
+
+        def reset(wait):
+            tokens.update('bbbb2', {'X-RateLimit-Remaining': '5000', 'X-RateLimit-Reset': str(int(now) + 3600)})
+        mock_sleep.side_effect = reset
+
+        self.assertEqual(tokens.acquire(), 'bbbb2')
+        self.assertEqual(mock_sleep.call_count, 1)
+        self.assertAlmostEqual(mock_sleep.call_args[0][0], 50 + TokenPool.RESET_MARGIN, delta=2)
+        self.assertGreater(tokens.waiting_time, 0)
+
+    @httpretty.activate
+    def test_github_rate_limited(self):
+        """Test whether GitHub requests rejected by rate limit are retried with other token"""
+
+        org_repos = read_file('data/org_repos.json')
+
+        def request_callback(method, uri, headers):
+            token = httpretty.last_request().headers['Authorization']
+            if token == 'token aaaa1':
+                headers["X-RateLimit-Remaining"] = '0'
+                headers["X-RateLimit-Reset"] = str(int(time.time()) + 3600)
+                return (403, headers, '')
+            headers["X-RateLimit-Remaining"] = '4000'
+            headers["X-RateLimit-Reset"] = str(int(time.time()) + 3600)
+            return (200, headers, org_repos)
+
+        httpretty.register_uri(httpretty.GET, GITHUB_ORG_URL,
+                               responses=[httpretty.Response(body=request_callback)])
+
+        tokens = TokenPool(['aaaa1', 'bbbb2'])
+        repos = ReposGitHub('github.com', 'grimoirelab', tokens)
+        self.assertEqual(len(list(repos.get_repos())), 12)
+
+        metrics = tokens.metrics()
+        self.assertEqual(metrics[0]['remaining'], 0)
+        self.assertEqual(metrics[1]['requests'], 2)
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
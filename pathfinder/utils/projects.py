@@ -22,34 +22,114 @@
 #   Alvaro del Castillo San Felix <acs@bitergia.com>
 #
 
+""" Store of the projects repositories
+
+The projects could be stored in a single JSON file or, for big ones,
+in a directory with a JSON file per project and an index:
+
+    projects/index.json  {"projects": {"grimoirelab": "grimoirelab.json", ...}}
+    projects/grimoirelab.json  {"github": ["https://github.com/..."], ...}
+
+In the sharded layout only the projects updated are written. In both
+layouts the files are written atomically (temp file plus rename), and
+the repositories of a data source are kept sorted so consecutive runs
+produce small diffs.
+"""
+
 import json
 import logging
+import os
 import shutil
+import tempfile
+
+from urllib.parse import quote
 
 logger = logging.getLogger(__name__)
 
+INDEX_FILE = 'index.json'
+
+
+def write_json(path, data):
+    """ Write atomically a JSON file: readers see the old or the new one """
+
+    dir_name = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile("w", dir=dir_name, delete=False) as fjson:
+        try:
+            json.dump(data, fjson, sort_keys=True, indent=4)
+        except Exception:
+            os.remove(fjson.name)
+            raise
+    if os.path.exists(path):
+        shutil.copymode(path, fjson.name)
+    os.replace(fjson.name, path)
+
+
+def shard_name(project):
+    return quote(project, safe='') + '.json'
+
+
+def shard_projects(projects_file, projects_dir):
+    """ Convert a projects file to the sharded layout """
+
+    with open(projects_file) as fprojects:
+        projects = json.load(fprojects)
+
+    os.makedirs(projects_dir, exist_ok=True)
+    for project, data_sources in projects.items():
+        write_json(os.path.join(projects_dir, shard_name(project)), data_sources)
+
+    index = {'projects': {project: shard_name(project) for project in projects}}
+    write_json(os.path.join(projects_dir, INDEX_FILE), index)
+
 
 class Projects():
     def __init__(self, projects_file):
+        """ projects_file could be a JSON file or a directory with the sharded layout """
+
         self.projects_file = projects_file
-        with open(self.projects_file, "r") as fprojects:
-            self.projects = json.load(fprojects)
+        self.sharded = os.path.isdir(projects_file)
+        self.updated = set()  # projects to be written in the next dump
+
+        if self.sharded:
+            with open(os.path.join(projects_file, INDEX_FILE)) as findex:
+                self.shards = json.load(findex)['projects']
+            # Shards are loaded when the project is used
+            self.projects = dict.fromkeys(self.shards)
+        else:
+            with open(self.projects_file, "r") as fprojects:
+                self.projects = json.load(fprojects)
 
     def __check_project(self, project):
         if project not in self.projects:
             msg_error = "Can't find %s in %s" % (project, self.projects.keys())
             raise RuntimeError(msg_error)
 
+        if self.projects[project] is None:
+            with open(os.path.join(self.projects_file, self.shards[project])) as fshard:
+                self.projects[project] = json.load(fshard)
+
     def update_project_repos(self, project, data_source, repos):
+        """ Set the repositories of a project data source, sorted and without duplicates """
+
         self.__check_project(project)
 
-        self.projects[project][data_source] = repos
-        self.projects[project][data_source] = list(set(self.projects[project][data_source]))
+        self.projects[project][data_source] = sorted(set(repos))
+        self.updated.add(project)
+
+    def update_projects_repos(self, updates):
+        """ Update several projects at once.
+
+        :param updates: iterable of (project, data_source, repos)
+        """
+
+        for project, data_source, repos in updates:
+            self.update_project_repos(project, data_source, repos)
 
     def set_project_repos(self, project, data_source, repos):
         self.__check_project(project)
 
         self.projects[project][data_source] = repos
+        self.updated.add(project)
 
     def get_project_repos(self, project, data_source):
         self.__check_project(project)
@@ -64,10 +144,27 @@ class Projects():
 
         return self.projects[project].keys()
 
-    def dump(self):
-        # Backup the projects file
-        shutil.copy(self.projects_file, self.projects_file + ".bak")
-        with open(self.projects_file, "w") as fprojects:
-            json.dump(self.projects, fprojects, sort_keys=True, indent=4)
-
-        logging.info("Projects file updated %s", self.projects_file)
+    def dump(self, backup=False):
+        """ Write the updated projects.
+
+        :param backup: copy the projects file to .bak before writing it.
+            Not needed to recover from a failed dump as writes are atomic.
+        """
+
+        if not self.updated:
+            logger.debug("No projects updated in %s", self.projects_file)
+            return
+
+        if self.sharded:
+            for project in sorted(self.updated):
+                shard = os.path.join(self.projects_file, self.shards[project])
+                if backup:
+                    shutil.copy(shard, shard + ".bak")
+                write_json(shard, self.projects[project])
+        else:
+            if backup:
+                shutil.copy(self.projects_file, self.projects_file + ".bak")
+            write_json(self.projects_file, self.projects)
+
+        logger.info("Projects file updated %s (%i projects)", self.projects_file, len(self.updated))
+        self.updated = set()
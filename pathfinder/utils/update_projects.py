@@ -61,7 +61,7 @@ def get_params():
     parser.add_argument('-p', '--project', dest='project',
                         help='Project repos to be updated')
     parser.add_argument('--projects-file', dest='projects_file',
-                        help='Projects file to be updated')
+                        help='Projects file, or sharded projects dir, to be updated')
     parser.add_argument('-f', '--forks', dest='forks', action='store_true',
                         help='Include forked repos')
 
@@ -88,18 +88,19 @@ if __name__ == '__main__':
     projects = Projects(args.projects_file)
 
     # Retrieve all the repositories
-    repos = ReposGitHub(args.owners, args.token)
     repos_list = []
-    for repo in repos.get_repos():
-        if not args.forks and repos.is_fork(repo):
-            logger.debug("Not adding fork %s", repos.get_id(repo))
-            continue
-
-        if args.blacklist and repos.get_id(repo) in args.blacklist:
-            logger.debug("Not adding blacklisted repo %s", repos.get_id(repo))
-            continue
-
-        repos_list.append(repos.get_id(repo))
+    for owner in args.owners:
+        repos = ReposGitHub("github.com", owner, args.token)
+        for repo in repos.get_repos():
+            if not args.forks and repos.is_fork(repo):
+                logger.debug("Not adding fork %s", repos.get_id(repo))
+                continue
+
+            if args.blacklist and repos.get_id(repo) in args.blacklist:
+                logger.debug("Not adding blacklisted repo %s", repos.get_id(repo))
+                continue
+
+            repos_list.append(repos.get_id(repo))
 
     # Adding additional repos
     if args.repos: